@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the JSON codecs (see codec.py): load and save throughput of JSONL
+files, and encoding of transactions with the generic object serializer
+versus the specialized transaction serializer.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_codec.py [NUM_TRNS]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib import codec
+from finmanlib.datafile import JsonlFile
+
+import ledgergen
+
+
+def timed(func, *args, **kwargs):
+    t = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+def load(filenames):
+    return [JsonlFile(filename) for filename in filenames]
+
+
+def save(jsonl_files):
+    with open(os.devnull, 'w') as fh:
+        for jsonl_file in jsonl_files:
+            jsonl_file._write(fh)
+
+
+def encode_trns(jsonl_files, specialized: bool):
+    json_codec = codec.get_codec()
+    for jsonl_file in jsonl_files:
+        for trns_set in jsonl_file.trns_sets:
+            for trn in trns_set.trns:
+                if specialized:
+                    json_codec.dumps_trn(trn)
+                else:
+                    json_codec.dumps_obj(trn, 'Trn')
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+        size = sum(os.path.getsize(filename) for filename in files["jsonl_files"])
+
+        print(f"Transactions: {num_trns} ({size / 1e6:.1f} MB)")
+        print(f"{'codec':<26}{'load':>14}{'save':>14}{'generic enc.':>14}{'Trn enc.':>14}")
+        for name in codec.CODEC_NAMES:
+            try:
+                codec.set_codec(name)
+            except ValueError as e:
+                print(f"{name:<26}({e})")
+                continue
+            t_load, jsonl_files = timed(load, files["jsonl_files"])
+            t_save, _ = timed(save, jsonl_files)
+            t_generic, _ = timed(encode_trns, jsonl_files, False)
+            t_trn, _ = timed(encode_trns, jsonl_files, True)
+            print(f"{codec.get_codec().name:<26}"
+                  f"{size / t_load / 1e6:9.1f} MB/s{size / t_save / 1e6:9.1f} MB/s"
+                  f"{t_generic:13.3f}s{t_trn:13.3f}s")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of compressed JSONL files (see open_jsonl()): file sizes, and time
+for writing and loading, uncompressed versus gzip and Zstandard (if module
+zstandard is installed).
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_compress.py [NUM_TRNS]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.datafile import JsonlFile, open_jsonl, zstandard
+
+import ledgergen
+
+
+SUFFIXES = ["", ".gz"] + ([".zst"] if zstandard is not None else [])
+
+
+def timed(func, *args, **kwargs):
+    t = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+def write(jsonl_file: JsonlFile, filename: str):
+    with open_jsonl(filename, 'w') as fh:
+        jsonl_file._write(fh)
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_files=1, num_csv_trns=10)
+        jsonl_file = JsonlFile(files["jsonl_files"][0])
+
+        print(f"Transactions: {num_trns}")
+        if zstandard is None:
+            print("(module zstandard is not installed)")
+        print(f"{'format':<10}{'size':>12}{'ratio':>8}{'write':>10}{'load':>10}{'load lazy':>11}")
+        size_plain = None
+        for suffix in SUFFIXES:
+            filename = os.path.join(data_dir, "ledger.jsonl" + suffix)
+            t_write, _ = timed(write, jsonl_file, filename)
+            t_load, _ = timed(JsonlFile, filename)
+            t_lazy, _ = timed(JsonlFile, filename, lazy=True)
+            size = os.path.getsize(filename)
+            size_plain = size_plain or size
+            print(f"{suffix or 'plain':<10}{size / 1e6:9.2f} MB{size_plain / size:7.1f}x"
+                  f"{t_write:9.3f}s{t_load:9.3f}s{t_lazy:10.3f}s")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
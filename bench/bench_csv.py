@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the CSV parsing in CsvFmt: the former split()-based parsing of
+lines versus the parsing by the stdlib csv module.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_csv.py [NUM_LINES]
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from finmanlib.csv import CsvFmt
+
+
+CSV_FMT = {
+    "name": "Bench",
+    "separator": ";",
+    "num_header_lines": 1,
+    "line_with_column_names": 1,
+    "fmt_date": "MM/DD/YYYY",
+    "fmt_value": "x,xxx.yy",
+    "columns": {
+        "date": "Booking day",
+        "addressee": "Addressee",
+        "value": "Value",
+    }
+}
+
+
+def create_csv(fh, num_lines: int):
+    """
+    Write a CSV file with num_lines transaction lines of random data.
+    """
+    rnd = random.Random(4711)
+    fh.write('"Booking day";"Addressee";"Subject";"Account number";"Value";"Details";\n')
+    for _ in range(num_lines):
+        fh.write(f'"{rnd.randint(1, 12):02}/{rnd.randint(1, 28):02}/2001";'
+                 f'"Addressee {rnd.randint(1, 500)}";'
+                 f'"Subject {rnd.randint(1, 10**6)}, with some text";'
+                 f'"DE{rnd.randint(10**9, 10**10)}";'
+                 f'"{rnd.uniform(-9999, 9999):,.2f}";'
+                 f'"Details {rnd.randint(1, 10**6)}";\n')
+
+
+def rows_split(csv_fmt: CsvFmt, text: str, col_map: dict) -> list:
+    """
+    The former way of parsing: split lines at the separator, then unquote.
+    """
+    rows = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line:
+            values = line.split(csv_fmt.separator)
+            rows.append([csv_fmt.unquote(values[idx]) for idx in col_map.values()])
+    return rows
+
+
+def rows_reader(csv_fmt: CsvFmt, text: str, col_map: dict) -> list:
+    """
+    The current way of parsing: the csv module's reader.
+    """
+    rows = []
+    for row in csv_fmt._csv_reader(io.StringIO(text, newline="")):
+        if row:
+            rows.append([row[idx] for idx in col_map.values()])
+    return rows
+
+
+def timed(func, *args):
+    t = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t, result
+
+
+def main():
+    num_lines = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    csv_fmt = CsvFmt(**CSV_FMT)
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as fh:
+        create_csv(fh, num_lines)
+        filename = fh.name
+    try:
+        _, lines_header, text = csv_fmt._read_sourcefile(filename)
+        col_map = csv_fmt._column_mapping(lines_header)
+
+        t_split, rows1 = timed(rows_split, csv_fmt, text, col_map)
+        t_reader, rows2 = timed(rows_reader, csv_fmt, text, col_map)
+        t_total, trns_set = timed(csv_fmt.process_csv, filename)
+        assert rows1 == rows2, "Parsing results differ"
+    finally:
+        os.remove(filename)
+
+    print(f"Lines:                  {num_lines}")
+    print(f"split() + unquote():    {t_split:.3f} s")
+    print(f"csv.reader:             {t_reader:.3f} s ({t_split / t_reader:.2f}x)")
+    print(f"process_csv() total:    {t_total:.3f} s ({len(trns_set.trns)} transactions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of editing many transactions (e.g. by 'cat-auto'): setting the
+categories and remarks one transaction at a time (Trn.set_cat(),
+Trn.set_remark()) versus as one edit (FinmanData.set_cats(),
+FinmanData.set_remarks()).
+
+Autosaving is started (without saving during the benchmark) and the
+selection cache holds some entries, as in the REPL.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_edit.py [NUM_TRNS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.datafile import FinmanData
+from finmanlib.selection import Selection
+
+import ledgergen
+
+
+FILTERS = ("", "cat=~Cat1", "value<-100", "desc=~rent")
+
+
+def edit_single(finman_data, trns, cats):
+    for trn, cat in zip(trns, cats):
+        trn.set_cat(cat, cat_auto=True)
+    for trn in trns:
+        trn.set_remark("edited")
+
+
+def edit_bulk(finman_data, trns, cats):
+    finman_data.set_cats(zip(trns, cats), cat_auto=True)
+    finman_data.set_remarks((trn, "edited") for trn in trns)
+
+
+def timed_edit(edit, files, lazy: bool):
+    finman_data = FinmanData(files["jsonl_files"], lazy=lazy)
+    finman_data.start_autosave(delay=3600)
+    for filter_str in FILTERS:
+        Selection(finman_data, filter_str)
+    trns = Selection(finman_data).trns
+    cats = [f"Bench ▶ {trn.get_field('cat')}" for trn in trns]
+
+    t = time.perf_counter()
+    edit(finman_data, trns, cats)
+    t = time.perf_counter() - t
+
+    assert finman_data.rollups.check(finman_data.jsonl_files) == []
+    num_edits = finman_data.autosaver.get_num_pending_edits()
+    finman_data.stop_autosave(flush=False)
+    return t, num_edits
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 100_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+
+        print(f"Transactions: {num_trns} (categories and remarks of all transactions)")
+        print(f"{'mode':<10}{'single':>10}{'bulk':>10}{'speedup':>9}")
+        for lazy in (False, True):
+            t_single, edits_single = timed_edit(edit_single, files, lazy)
+            t_bulk, edits_bulk = timed_edit(edit_bulk, files, lazy)
+            assert edits_single == edits_bulk
+            print(f"{'lazy' if lazy else 'eager':<10}{t_single:9.3f}s{t_bulk:9.3f}s"
+                  f"{t_single / t_bulk:8.1f}x")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
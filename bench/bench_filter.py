@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of filter expressions (see TrnFilter): evaluation of the compiled
+and planned expression versus a naive evaluation of the expression tree (in
+the order written, without skipping of transaction sets), lookup of
+selective '=' conditions by index versus scan, and automatic category
+assignment with one OR filter per category versus one filter per condition.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_filter.py [NUM_TRNS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.categories import Categories
+from finmanlib.datafile import FinmanData, COL_VALUE
+from finmanlib.selection import FilterPlan, Selection, TrnFilter
+
+import ledgergen
+
+
+FILTERS = (
+    "addr=~Miete|value<-500",
+    "kind=~lastschrift|value<-100|date>=2003-01-01",
+    "desc=~rent, addr=~miete, addr=~strom, kind=Gutschrift",
+    "!(kind=Lastschrift, kind=Dauerauftrag)|date<2002-01-01",
+    "(addr=~1, addr=~2)|!cat=~Cat1|value>0",
+    "desc~/^(rent|miete)\\b/i, value=-100..-50|date=2001-01-01..2001-06-30",
+)
+
+
+def match_naive(expr, trn) -> bool:
+    """
+    Evaluate the expression tree for the given transaction, in the order
+    written.
+    """
+    if expr is None:
+        return True
+    if isinstance(expr, TrnFilter.FilterExpr):
+        if expr.op == 'and':
+            for operand in expr.operands:
+                if not match_naive(operand, trn):
+                    return False
+            return True
+        elif expr.op == 'or':
+            for operand in expr.operands:
+                if match_naive(operand, trn):
+                    return True
+            return False
+        return not match_naive(expr.operands[0], trn)
+
+    fc = TrnFilter._get_comparable_cond(expr)
+    if fc.op == 'contains':
+        return fc.value in (trn.get_field(fc.field) or "").upper()
+    elif fc.op == 'regex':
+        return fc.value.search(trn.get_field(fc.field) or "") is not None
+    value = trn.value_cents() if fc.field == COL_VALUE else trn.get_field(fc.field)
+    if fc.op == 'between':
+        return fc.value[0] <= value <= fc.value[1]
+    elif fc.op == '=':
+        return value == fc.value
+    elif fc.op == '<':
+        return value < fc.value
+    elif fc.op == '<=':
+        return value <= fc.value
+    elif fc.op == '>':
+        return value > fc.value
+    return value >= fc.value
+
+
+def filter_naive(finman_data, filter_str: str):
+    expr = TrnFilter(finman_data, filter_str).expr
+    return [trn for jsonl_file in finman_data.jsonl_files
+                for trns_set in jsonl_file.trns_sets
+                    for trn in trns_set.trns if match_naive(expr, trn)]
+
+
+def filter_planned(finman_data, filter_str: str):
+    finman_data.selection_cache.clear()
+    return Selection(finman_data, filter_str).trns
+
+
+def assign_cats(finman_data, categories, trns, single_plan: bool):
+    if single_plan:
+        return categories.get_auto_assignments(finman_data, trns)
+
+    # One filter per condition, as before filter expressions.
+    filters = {cat: [TrnFilter(finman_data, cond) for cond in conds]
+               for cat, conds in categories.cats.items()}
+    return [[cat for cat, trn_filters in filters.items()
+                 if any(trn_filter.match(trn) for trn_filter in trn_filters)]
+            for trn in trns]
+
+
+def timed(func, *args, **kwargs):
+    t = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+        finman_data = FinmanData(files["jsonl_files"])
+
+        print(f"Transactions: {num_trns}")
+        print(f"{'filter':<56}{'naive':>10}{'planned':>10}{'speedup':>9}{'matches':>9}")
+        for filter_str in FILTERS:
+            t_naive, trns_naive = timed(filter_naive, finman_data, filter_str)
+            t_planned, trns_planned = timed(filter_planned, finman_data, filter_str)
+            assert trns_naive == trns_planned, filter_str
+            print(f"{filter_str[:55]:<56}{t_naive:9.3f}s{t_planned:9.3f}s"
+                  f"{t_naive / t_planned:8.1f}x{len(trns_planned):>9}")
+
+        # A value of a pooled field matching few transactions.
+        addrs = sorted({trn.get_field("addressee") for trn in Selection(finman_data).trns})
+        filter_str = f"addr={addrs[len(addrs) // 2]}|date>=2000-01-01"
+        max_selectivity = FilterPlan.INDEX_MAX_SELECTIVITY
+        FilterPlan.INDEX_MAX_SELECTIVITY = 0.0
+        t_scan, trns_scan = timed(filter_planned, finman_data, filter_str)
+        FilterPlan.INDEX_MAX_SELECTIVITY = max_selectivity
+        t_build, _ = timed(finman_data.stats.get_index, "addressee")
+        t_index, trns_index = timed(filter_planned, finman_data, filter_str)
+        assert trns_scan == trns_index
+        print()
+        print(f"Index lookup ({filter_str}, {len(trns_index)} matches):")
+        print(f"    scan:               {t_scan:7.4f}s")
+        print(f"    index lookup:       {t_index:7.4f}s ({t_scan / t_index:.0f}x; "
+              f"building the index: {t_build:.3f}s)")
+
+        categories = Categories(files["cats_file"])
+        trns = Selection(finman_data).trns[:20_000]
+        t_separate, _ = timed(assign_cats, finman_data, categories, trns, single_plan=False)
+        t_single, _ = timed(assign_cats, finman_data, categories, trns, single_plan=True)
+        print()
+        print(f"Category assignment ({len(categories.cats)} categories, {len(trns)} transactions):")
+        print(f"    filter per condition:   {t_separate:7.3f}s")
+        print(f"    OR filter per category: {t_single:7.3f}s ({t_separate / t_single:.1f}x)")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the string pool (see StringPool): memory usage of the loaded
+transactions with and without pooled strings, and '=' filters on pooled
+fields.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_intern.py [NUM_TRNS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.datafile import FinmanData
+from finmanlib.memory import fmt_bytes
+from finmanlib.selection import Selection
+
+import ledgergen
+
+
+FILTERS = ("cat=Cat3 ▶ Sub2", "addr=Miete AG 86", "addr=Nobody")
+
+
+def timed(func, *args, **kwargs):
+    t = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+
+        print(f"Transactions: {num_trns}")
+        print(f"{'':<12}{'load':>9}{'columns':>12}{'notes':>12}{'pool':>12}{'total':>12}"
+              + "".join(f"{flt[:16]:>18}" for flt in FILTERS))
+        for pooled in (False, True):
+            t_load, finman_data = timed(FinmanData, files["jsonl_files"], pool_strings=pooled)
+            report = finman_data.get_memory_report()
+            trns = report['trns']
+            pool = report['caches']['string pool']
+            total = trns['objects'] + trns['columns'] + trns['notes'] + pool
+            line = f"{'pooled' if pooled else 'not pooled':<12}{t_load:8.3f}s" \
+                   f"{fmt_bytes(trns['columns']):>12}{fmt_bytes(trns['notes']):>12}" \
+                   f"{fmt_bytes(pool):>12}{fmt_bytes(total):>12}"
+            for flt in FILTERS:
+                t_filter, selection = timed(Selection, finman_data, flt)
+                line += f"{t_filter:11.4f}s {len(selection.trns):>5}"
+            print(line)
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of loading JSONL files: eager loading (all transactions decoded)
+versus lazy loading (transactions decoded on demand, see LazyTrn), followed by
+a filter on pre-extracted fields only (first access: including the deferred
+work, see LazyTrn and TrnsSet.get_field_range(); then another such filter),
+and a filter on another field.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_load.py [NUM_TRNS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.datafile import FinmanData
+from finmanlib.selection import Selection
+
+import ledgergen
+
+
+FILTER_HOT = "date>=2001-03-01|date<2001-04-01|value<-100"
+FILTER_HOT_AGAIN = "date>=2001-05-01|date<2001-06-01|value<-100"
+FILTER_OTHER = "desc=~rechnung"
+
+
+def timed(func, *args, **kwargs):
+    t = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t, result
+
+
+def count_decoded(finman_data: FinmanData) -> int:
+    return sum(trn.is_decoded() for jsonl_file in finman_data.jsonl_files
+                                for trns_set in jsonl_file.trns_sets
+                                for trn in trns_set.trns)
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+
+        print(f"Transactions: {num_trns}")
+        print(f"{'':<10}{'load':>10}{'hot filter':>12}{'again':>10}{'other filter':>14}{'decoded':>10}")
+        selected = {}
+        for lazy in (False, True):
+            t_load, finman_data = timed(FinmanData, files["jsonl_files"], lazy=lazy)
+            t_hot, sel_hot = timed(Selection, finman_data, FILTER_HOT)
+            t_hot_again, _ = timed(Selection, finman_data, FILTER_HOT_AGAIN)
+            num_decoded = count_decoded(finman_data)
+            t_other, sel_other = timed(Selection, finman_data, FILTER_OTHER)
+            selected[lazy] = ([trn._id for trn in sel_hot.trns],
+                              [trn._id for trn in sel_other.trns])
+            print(f"{'lazy' if lazy else 'eager':<10}{t_load:9.3f}s{t_hot:11.3f}s"
+                  f"{t_hot_again:9.3f}s{t_other:13.3f}s{num_decoded:10}")
+        assert selected[False] == selected[True], "Selections differ"
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of filtering in worker processes (see Selection._scan_parallel()):
+time of selections with expensive conditions by the number of workers.
+
+The worker processes are started, and the field projections determined,
+before timing (as when filtering repeatedly in the REPL).
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_parallel.py [NUM_TRNS] [MAX_WORKERS]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from finmanlib.datafile import FinmanData
+from finmanlib.selection import Selection
+
+import ledgergen
+
+
+FILTERS = (
+    "desc=~rent|date>=2001-06-01",
+    "addr=~miete, desc=~strom, kind=~gutschrift",
+    "desc~/^(rent|miete)\\b/i, addr~/e\\.V\\. 1\\d$/",
+)
+
+
+def timed_selection(finman_data, filter_str: str, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        finman_data.selection_cache.clear()
+        t = time.perf_counter()
+        trns = Selection(finman_data, filter_str).trns
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    return best, trns
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 1_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) >= 3 else max(4, os.cpu_count() or 1)
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+        finman_data = FinmanData(files["jsonl_files"], parallel_min_trns=0)
+
+        workers = [n for n in (1, 2, 4, 8, 16) if n <= max_workers]
+        print(f"Transactions: {num_trns}, CPUs: {os.cpu_count()}")
+        print(f"{'filter':<48}" + "".join(f"{f'{n} w.':>9}" for n in workers) + f"{'matches':>9}")
+        for filter_str in FILTERS:
+            times = []
+            matches = None
+            for n in workers:
+                finman_data.num_workers = n
+                timed_selection(finman_data, filter_str, repeat=1)     # start workers
+                t, trns = timed_selection(finman_data, filter_str)
+                assert matches is None or trns == matches, filter_str
+                matches = trns
+                times.append(t)
+            print(f"{filter_str[:47]:<48}" + "".join(f"{t:8.3f}s" for t in times) +
+                  f"{len(matches):>9}")
+            print(f"{'    speedup':<48}" + "".join(f"{times[0] / t:8.1f}x" for t in times))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
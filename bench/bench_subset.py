@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of subsets of selections (see Selection.get_subset()): memory
+allocated (peak, as traced by tracemalloc) and time of views of the
+selection (TrnsView) versus copies of the transaction lists, for taking
+subsets and for determining the column widths of tables (see
+ColumnFormatter).
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_subset.py [NUM_TRNS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from finmanlib.datafile import FinmanData
+from finmanlib.selection import ColumnFormatter, Ranges, Selection
+
+import ledgergen
+
+
+SUBSETS = (None, "1-", "1-1000,5000-", "10-20,100-200")
+FIELDS_STR = "date|kind|addr|value|cat"
+
+
+def get_subset_copy(sel, subset_str):
+    """
+    Get the subset as a list of the transactions (copies of slices of the
+    selection).
+    """
+    if subset_str is None:
+        return sel.trns[:]
+    trns = []
+    for rng_min, rng_max in Ranges.get(subset_str, len(sel.trns)):
+        trns += sel.trns[rng_min - 1:rng_max]
+    return trns
+
+
+def get_formats_copy(trns, field_names, column_headings, max_widths):
+    """
+    Determine the column widths with a list of the values per column.
+    """
+    widths = []
+    for field_name, column_heading in zip(field_names, column_headings):
+        values = [column_heading] + [trn.get_field(field_name) for trn in trns]
+        lengths = [(1 if type(value) is bool else len(value)) for value in values]
+        widths.append(max(lengths))
+    return widths
+
+
+def get_formats_view(trns, field_names, column_headings, max_widths):
+    return [fmt.width for fmt in
+            ColumnFormatter._get_formats(trns, field_names, column_headings, max_widths)]
+
+
+def traced(func, *args):
+    """
+    Call the function twice: return the time of the first call, the peak
+    memory allocated while running the second (as tracing slows down
+    execution), and the result.
+    """
+    t = time.perf_counter()
+    func(*args)
+    t = time.perf_counter() - t
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return t, peak, result
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 200_000
+    data_dir = tempfile.mkdtemp(prefix="finman-bench-")
+    try:
+        files = ledgergen.generate(data_dir, num_trns, num_csv_trns=10)
+        finman_data = FinmanData(files["jsonl_files"])
+        sel = Selection(finman_data)
+        field_names, column_headings, max_widths = sel._eval_fields_str(FIELDS_STR)
+
+        print(f"Transactions: {len(sel.trns)}")
+        print(f"{'subset':<16}{'':<14}{'copy':>18}{'view':>18}")
+        for subset_str in SUBSETS:
+            name = str(subset_str)
+
+            # Taking the subset and iterating over it.
+            iterate = lambda get_subset: sum(1 for _ in get_subset(sel, subset_str))
+            t_copy, mem_copy, n_copy = traced(iterate, get_subset_copy)
+            t_view, mem_view, n_view = traced(iterate, type(sel).get_subset)
+            assert n_copy == n_view
+            print(f"{name:<16}{'iterate':<14}{mem_copy / 1024:10.0f} KiB{t_copy:7.3f}s"
+                  f"{mem_view / 1024:10.0f} KiB{t_view:7.3f}s")
+
+            # Column widths of a table of the subset.
+            format_args = (field_names, column_headings, max_widths)
+            t_copy, mem_copy, widths_copy = traced(
+                    lambda: get_formats_copy(get_subset_copy(sel, subset_str), *format_args))
+            t_view, mem_view, widths_view = traced(
+                    lambda: get_formats_view(sel.get_subset(subset_str), *format_args))
+            assert widths_copy == widths_view, (widths_copy, widths_view)
+            print(f"{'':<16}{'column widths':<14}{mem_copy / 1024:10.0f} KiB{t_copy:7.3f}s"
+                  f"{mem_view / 1024:10.0f} KiB{t_view:7.3f}s")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
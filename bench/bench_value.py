@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of summing up the values of transactions: parsing the value strings
+as Decimal on each access versus the cached cents of Trn.value_cents().
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/bench_value.py [NUM_TRNS]
+"""
+
+from decimal import Decimal
+import random
+import sys
+import time
+
+from finmanlib.datafile import Trn, COL_VALUE
+
+
+def create_trns(num_trns: int) -> list:
+    rnd = random.Random(4711)
+    trns = []
+    for idx in range(num_trns):
+        trn = Trn(str(idx))
+        trn.columns = {COL_VALUE: f"{rnd.uniform(-9999, 9999):+.2f}"}
+        trns.append(trn)
+    return trns
+
+
+def timed(func, *args):
+    t = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t, result
+
+
+def sum_decimal(trns) -> Decimal:
+    return sum(Decimal(trn.columns[COL_VALUE]) for trn in trns)
+
+
+def sum_cents(trns) -> int:
+    return sum(trn.value_cents() for trn in trns)
+
+
+def main():
+    num_trns = int(sys.argv[1]) if len(sys.argv) >= 2 else 1_000_000
+    trns = create_trns(num_trns)
+
+    t_decimal, sum1 = timed(sum_decimal, trns)
+    t_first, sum2 = timed(sum_cents, trns)
+    t_cached, sum3 = timed(sum_cents, trns)
+    assert sum1 * 100 == sum2 == sum3, "Sums differ"
+
+    print(f"Transactions:               {num_trns}")
+    print(f"Decimal() on each access:   {t_decimal:.3f} s")
+    print(f"value_cents(), first call:  {t_first:.3f} s")
+    print(f"value_cents(), cached:      {t_cached:.3f} s ({t_decimal / t_cached:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+"""
+Seeded generator of synthetic Finman ledgers, for benchmarks.
+
+Creates JSONL transaction files (with multiple transaction sets each), CSV
+files in the format of CSV_FMT, and a categories file with many conditions.
+Files are written line by line, so that large ledgers (millions of
+transactions) do not need to be kept in memory.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/ledgergen.py OUT_DIR [NUM_TRNS] [NUM_FILES]
+"""
+
+from datetime import date, timedelta
+import json
+import os
+import random
+import sys
+from typing import Iterator, Tuple
+
+
+CSV_FMT = {
+    "name": "Synthetic",
+    "separator": ";",
+    "num_header_lines": 4,
+    "line_with_column_names": 4,
+    "fmt_date": "DD.MM.YYYY",
+    "fmt_value": "x.xxx,yy",
+    "values_in_header": {
+        "bank_account": [1, 2],
+        "date_start": [2, 2],
+        "date_end": [2, 4],
+        "value_start": [3, 2, 1]
+    },
+    "columns": {
+        "date": "Buchungstag",
+        "kind": "Buchungstext",
+        "addressee": "Auftraggeber / Begünstigter",
+        "description": "Verwendungszweck",
+        "account": "Kontonummer",
+        "value": "Betrag (EUR)"
+    }
+}
+
+KINDS = ("Lastschrift", "Gutschrift", "Überweisung", "Kartenzahlung", "Dauerauftrag")
+WORDS = ("Rechnung", "Miete", "Vertrag", "Kunde", "Beitrag", "Abo", "Bestellung",
+         "Erstattung", "Gehalt", "Versicherung", "Strom", "Einkauf", "Karte", "Gebühr")
+
+
+class LedgerGenerator:
+    """
+    Generator of synthetic transactions with realistic field distributions:
+
+    - Addressees follow a Zipf-like distribution over a fixed pool, so few
+      addressees (supermarkets, employer, landlord) occur very often.
+    - Every addressee has a typical value (log-normally distributed) and
+      kind; values vary around it. Most transactions are expenses.
+    - Dates are spread uniformly over the time range, sorted within a set.
+    - About 60% of the transactions already have a category.
+    """
+
+    def __init__(self, seed: int = 4711, num_addressees: int = 2000,
+                 date_start: date = date(2000, 1, 1)):
+        self.rnd = random.Random(seed)
+        self.date_start = date_start
+        self.addressees = [self._get_addressee(idx) for idx in range(num_addressees)]
+        self.weights = [1.0 / (idx + 1) for idx in range(num_addressees)]
+        self.cats = [f"Cat{idx // 10} ▶ Sub{idx % 10}" for idx in range(200)]
+
+
+    def _get_addressee(self, idx: int) -> Tuple[str, str, str, int]:
+        """
+        Get (name, account, kind, typical value in cents) of an addressee.
+        """
+        rnd = self.rnd
+        name = f"{rnd.choice(WORDS)} {rnd.choice(('GmbH', 'AG', 'KG', 'e.V.', ''))} {idx}".replace("  ", " ")
+        account = f"DE{rnd.randint(10**19, 10**20 - 1)}"
+        value = int(rnd.lognormvariate(3.5, 1.2) * 100)
+        if rnd.random() < 0.1:
+            kind = "Gutschrift"
+        else:
+            kind = rnd.choice(KINDS)
+            value = -value
+        return name, account, kind, value
+
+
+    def trns(self, num_trns: int, date_from: date, num_days: int) -> Iterator[dict]:
+        """
+        Generate num_trns transactions (as dicts of columns and notes) within
+        the given date range, ordered by date.
+        """
+        rnd = self.rnd
+        days = sorted(rnd.randrange(num_days) for _ in range(num_trns))
+        addressees = rnd.choices(range(len(self.addressees)), self.weights, k=num_trns)
+        for line_num, (day, addr_idx) in enumerate(zip(days, addressees), start=5):
+            name, account, kind, value = self.addressees[addr_idx]
+            value = max(min(int(value * rnd.uniform(0.5, 1.5)), 999_999), -999_999) or 1
+            cat = self.cats[addr_idx % len(self.cats)] if rnd.random() < 0.6 else ""
+            yield {
+                "line_num_in_csv": line_num,
+                "date": date_from + timedelta(days=day),
+                "kind": kind,
+                "addressee": name,
+                "description": f"{rnd.choice(WORDS)} {rnd.randint(1, 10**6)} {rnd.choice(WORDS)}",
+                "account": account,
+                "value": value,
+                "cat": cat,
+            }
+
+
+    def get_cat_conds(self, num_conds: int) -> dict:
+        """
+        Get categories dict (as in a categories file) with num_conds
+        conditions in total, matching the addressees of the categories.
+        """
+        cats = {}
+        for idx in range(num_conds):
+            addr_idx = idx % len(self.addressees)
+            name, account, kind, value = self.addressees[addr_idx]
+            cat = self.cats[addr_idx % len(self.cats)]
+            top, sub = cat.split(" ▶ ")
+            conds = cats.setdefault(top, {}).setdefault(sub, [])
+            if idx % 3 == 0:
+                conds.append(f"account={account}")
+            else:
+                conds.append(f"addr=~{name.split()[-1]}|kind={kind}")
+        return cats
+
+
+
+def fmt_value(cents: int) -> str:
+    return f"{cents / 100:+.2f}"
+
+
+def write_jsonl(fh, gen: LedgerGenerator, num_trns: int, num_sets: int, set_idx0: int):
+    """
+    Write a JSONL file with num_trns transactions in num_sets sets; each set
+    covers one quarter.
+    """
+    balance = 100_000
+    for set_idx in range(set_idx0, set_idx0 + num_sets):
+        n = num_trns // num_sets + (1 if set_idx - set_idx0 < num_trns % num_sets else 0)
+        date_from = gen.date_start + timedelta(days=91 * set_idx)
+        date_to = date_from + timedelta(days=90)
+        trns = list(gen.trns(n, date_from, 91))
+        diff = sum(trn["value"] for trn in trns)
+
+        src = {
+            "type": "SourceFileInfo", "conversion_date": None,
+            "filename": f"synthetic_{set_idx:04}.csv", "filesize": None, "sha1": None,
+            "csv_fmt": CSV_FMT["name"], "currency": "EUR", "columns": CSV_FMT["columns"],
+            "header_lines": [], "header_values": {}, "num_lines": n + 4, "num_trns": n,
+        }
+        header = {
+            "type": "TrnsSetHeader", "bank_account": "DE0000",
+            "date_start": str(date_from), "date_end": str(date_to),
+            "date_first": str(trns[0]["date"]) if trns else None,
+            "date_last": str(trns[-1]["date"]) if trns else None,
+            "value_start": fmt_value(balance), "value_end": fmt_value(balance + diff),
+            "value_diff": fmt_value(diff),
+        }
+        balance += diff
+        fh.write(json.dumps(src) + "\n")
+        fh.write(json.dumps(header) + "\n")
+        for trn in trns:
+            fh.write(json.dumps({
+                "type": "Trn",
+                "line_num_in_csv": trn["line_num_in_csv"],
+                "columns": {
+                    "date": str(trn["date"]),
+                    "kind": trn["kind"],
+                    "addressee": trn["addressee"],
+                    "description": trn["description"],
+                    "account": trn["account"],
+                    "value": fmt_value(trn["value"]),
+                },
+                "notes": {
+                    "cat": trn["cat"],
+                    "cat_auto": False if trn["cat"] else None,
+                    "remark": "",
+                },
+            }) + "\n")
+        fh.write("\n")
+
+
+def write_csv(fh, gen: LedgerGenerator, num_trns: int):
+    """
+    Write a CSV file (in the format CSV_FMT) with num_trns transactions.
+    """
+    date_from = gen.date_start
+    date_to = date_from + timedelta(days=90)
+    fh.write(f'"Kontonummer:";"DE0000 / Girokonto";\n')
+    fh.write(f'"Von:";"{date_from:%d.%m.%Y}";"bis:";"{date_to:%d.%m.%Y}";\n')
+    fh.write(f'"Kontostand:";"1.000,00 EUR";\n')
+    fh.write(";".join(f'"{col}"' for col in CSV_FMT["columns"].values()) + ";\n")
+    for trn in gen.trns(num_trns, date_from, 91):
+        value = f"{trn['value'] / 100:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+        fh.write(f'"{trn["date"]:%d.%m.%Y}";"{trn["kind"]}";"{trn["addressee"]}";'
+                 f'"{trn["description"]}";"{trn["account"]}";"{value}";\n')
+
+
+def generate(out_dir: str, num_trns: int, num_files: int = 4, sets_per_file: int = 8,
+             num_csv_trns: int = None, num_conds: int = 500, seed: int = 4711) -> dict:
+    """
+    Generate a synthetic ledger in out_dir.
+
+    Return dict with the names of the created files.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    gen = LedgerGenerator(seed)
+
+    jsonl_files = []
+    for file_idx in range(num_files):
+        n = num_trns // num_files + (1 if file_idx < num_trns % num_files else 0)
+        filename = os.path.join(out_dir, f"ledger_{file_idx + 1:03}.jsonl")
+        with open(filename, 'w') as fh:
+            write_jsonl(fh, gen, n, sets_per_file, file_idx * sets_per_file)
+        jsonl_files.append(filename)
+
+    csv_file = os.path.join(out_dir, "ledger.csv")
+    with open(csv_file, 'w') as fh:
+        write_csv(fh, gen, num_csv_trns or min(num_trns, 100_000))
+
+    csv_fmt_file = os.path.join(out_dir, "csv_fmt.json")
+    with open(csv_fmt_file, 'w') as fh:
+        json.dump(CSV_FMT, fh, indent=4)
+
+    cats_file = os.path.join(out_dir, "categories.json")
+    with open(cats_file, 'w') as fh:
+        json.dump(gen.get_cat_conds(num_conds), fh, indent=4, ensure_ascii=False)
+
+    return {
+        "jsonl_files": jsonl_files,
+        "csv_file": csv_file,
+        "csv_fmt_file": csv_fmt_file,
+        "cats_file": cats_file,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    out_dir = sys.argv[1]
+    num_trns = int(sys.argv[2]) if len(sys.argv) >= 3 else 10_000
+    num_files = int(sys.argv[3]) if len(sys.argv) >= 4 else 4
+    files = generate(out_dir, num_trns, num_files)
+    print(json.dumps(files, indent=4))
+
+
+if __name__ == "__main__":
+    main()
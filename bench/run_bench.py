@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite for the core paths of Finman, run on a synthetic ledger
+(see ledgergen.py).
+
+The results are printed and written as JSON, so that runs can be compared
+across versions.
+
+Usage (from the repository root):
+    PYTHONPATH=./src python3 bench/run_bench.py [options]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from finmanlib.categories import Categories
+from finmanlib.csv import CsvFmt
+from finmanlib.datafile import FinmanData
+from finmanlib.selection import Selection
+
+import ledgergen
+
+
+FIELDS_STR = "date|addr:30|desc:40|value|_is_mod|cat|remark:40"
+FIELDS_CSV = "date|addr|desc|value|cat|remark"
+
+
+class BenchContext:
+    """
+    Files and objects shared by the benchmarks.
+    """
+
+    def __init__(self, files: dict, args: argparse.Namespace):
+        self.files = files
+        self.args = args
+        self.finman_data = None
+        self.selection = None
+        self.categories = Categories(files["cats_file"])
+        self.devnull = open(os.devnull, 'w')
+
+
+BENCHMARKS: List[tuple] = []
+
+def benchmark(name: str):
+    """
+    Register a benchmark function, which gets a BenchContext.
+    """
+    def register(func: Callable):
+        BENCHMARKS.append((name, func))
+        return func
+    return register
+
+
+@benchmark("load")
+def bench_load(ctx: BenchContext):
+    ctx.finman_data = FinmanData(ctx.files["jsonl_files"])
+
+@benchmark("load_lazy")
+def bench_load_lazy(ctx: BenchContext):
+    FinmanData(ctx.files["jsonl_files"], lazy=True)
+
+@benchmark("filter_all")
+def bench_filter_all(ctx: BenchContext):
+    ctx.selection = Selection(ctx.finman_data, "")
+
+@benchmark("filter_contains")
+def bench_filter_contains(ctx: BenchContext):
+    Selection(ctx.finman_data, "desc=~rechnung")
+
+@benchmark("filter_month")
+def bench_filter_month(ctx: BenchContext):
+    Selection(ctx.finman_data, "date>=2001-03-01|date<2001-04-01")
+
+@benchmark("filter_value")
+def bench_filter_value(ctx: BenchContext):
+    Selection(ctx.finman_data, "value<-100|kind=Lastschrift")
+
+@benchmark("sort")
+def bench_sort(ctx: BenchContext):
+    Selection(ctx.finman_data, "", sort_str="addr|value")
+
+@benchmark("print_trns_table")
+def bench_print_table(ctx: BenchContext):
+    ctx.selection.print_trns_table(FIELDS_STR, index_col=True, output_width=200, fh=ctx.devnull)
+
+@benchmark("print_trns_csv")
+def bench_print_csv(ctx: BenchContext):
+    ctx.selection.print_trns_csv(FIELDS_CSV, fh=ctx.devnull)
+
+@benchmark("get_auto_assignments")
+def bench_cat_auto(ctx: BenchContext):
+    ctx.categories.get_auto_assignments(ctx.finman_data,
+                                        ctx.selection.trns[:ctx.args.cat_trns])
+
+@benchmark("save")
+def bench_save(ctx: BenchContext):
+    for jsonl_file in ctx.finman_data.jsonl_files:
+        jsonl_file.trns_sets[0].trns[0]._is_modified = True
+    ctx.finman_data.save()
+
+@benchmark("process_csv")
+def bench_process_csv(ctx: BenchContext):
+    with open(ctx.files["csv_fmt_file"]) as fh:
+        CsvFmt(**json.load(fh)).process_csv(ctx.files["csv_file"])
+
+
+def get_version() -> str:
+    """
+    Get the version (git commit) of the benchmarked code.
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(ctx: BenchContext, names: List[str], repeat: int) -> Dict[str, dict]:
+    results = {}
+    for name, func in BENCHMARKS:
+        if names and name not in names:
+            continue
+        times = []
+        for _ in range(repeat):
+            t_start = time.perf_counter()
+            func(ctx)
+            times.append(time.perf_counter() - t_start)
+        results[name] = {
+            "best": min(times),
+            "mean": sum(times) / len(times),
+            "runs": times,
+        }
+        print(f"    {name:<24}{min(times):10.4f} s")
+    return results
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run Finman benchmarks")
+    parser.add_argument('--trns', type=int, default=100_000,
+            help="number of transactions (default: %(default)s)")
+    parser.add_argument('--files', type=int, default=4,
+            help="number of JSONL files (default: %(default)s)")
+    parser.add_argument('--sets', type=int, default=8,
+            help="number of transaction sets per file (default: %(default)s)")
+    parser.add_argument('--conds', type=int, default=500,
+            help="number of category conditions (default: %(default)s)")
+    parser.add_argument('--cat-trns', type=int, default=2_000,
+            help="number of transactions for get_auto_assignments (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=4711,
+            help="seed of the generator (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3,
+            help="number of runs per benchmark (default: %(default)s)")
+    parser.add_argument('--output', default="bench_results.json",
+            help="JSON output file (default: %(default)s)")
+    parser.add_argument('--compare', metavar='FILE',
+            help="JSON output file of a previous run to compare with")
+    parser.add_argument('--data-dir',
+            help="directory for generated data (default: temporary directory)")
+    parser.add_argument('names', nargs='*', metavar='NAME',
+            help="benchmarks to run (default: all)")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="finman-bench-")
+
+    try:
+        print(f"Generating {args.trns} transactions in {data_dir} ...")
+        t_start = time.perf_counter()
+        files = ledgergen.generate(data_dir, args.trns, args.files, args.sets,
+                                   num_conds=args.conds, seed=args.seed)
+        print(f"    generated in {time.perf_counter() - t_start:.1f} s")
+
+        print("Running benchmarks:")
+        ctx = BenchContext(files, args)
+        names = args.names
+        if names:
+            names = ["load", "filter_all", *names]
+        results = run(ctx, names, args.repeat)
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir)
+
+    output = {
+        "version": get_version(),
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'data_dir', 'names', 'compare')},
+        "results": results,
+    }
+    with open(args.output, 'w') as fh:
+        json.dump(output, fh, indent=4)
+    print(f"Results written to {args.output}.")
+
+    if args.compare:
+        compare(args.compare, output)
+
+
+def compare(filename: str, output: dict):
+    """
+    Print the speedup of the current run relative to a previous run.
+    """
+    with open(filename) as fh:
+        prev = json.load(fh)
+    print(f"Comparison with {filename} (version {prev.get('version')}):")
+    for name, result in output["results"].items():
+        if name in prev.get("results", {}):
+            t_prev = prev["results"][name]["best"]
+            print(f"    {name:<24}{t_prev:10.4f} s → {result['best']:10.4f} s"
+                  f"  ({t_prev / result['best']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
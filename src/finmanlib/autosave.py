@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the periodic saving of modified Finman data in a
+background thread.
+
+Edits are coalesced: a save starts only after no further edit has been made
+for some delay (but at the latest after a maximum delay), and writes each
+modified file once, however many of its transactions have been changed.
+"""
+
+import logging
+import threading
+import time
+
+from finmanlib.instrument import instr
+
+
+
+class Autosaver:
+    """
+    Saves the modified files of a FinmanData object in a background thread.
+
+    The FinmanData object reports each edit via notify_edit().  A save starts
+    'delay' seconds after the last edit, or 'max_delay' seconds after the
+    first unsaved edit, whichever comes first.
+    """
+
+    def __init__(self, finman_data: 'FinmanData', delay: float = 2.0, max_delay: float = 30.0):
+        self.finman_data        = finman_data
+        self.delay              = delay
+        self.max_delay          = max(delay, max_delay)
+
+        # Statistics.
+        self.num_saves          = 0
+        self.num_files_saved    = 0
+        self.num_edits_saved    = 0
+        self.last_save_time     = None     # seconds
+        self.last_error         = None
+
+        self._cond              = threading.Condition()
+        self._num_pending_edits = 0
+        self._first_edit_time   = None
+        self._last_edit_time    = None
+        self._stopped           = False
+        self._thread            = threading.Thread(target=self._run, name="finman-autosave",
+                                                   daemon=True)
+        self._thread.start()
+
+
+    def __repr__(self):
+        return f"<Autosaver: delay {self.delay:g} s, {self.num_saves} saves, " \
+               f"{self.num_edits_saved} edits saved, {self._num_pending_edits} pending>"
+
+
+    def get_num_pending_edits(self) -> int:
+        return self._num_pending_edits
+
+
+    def notify_edit(self, num_edits: int = 1):
+        """
+        Record an edit; called by FinmanData for each modified transaction,
+        or once for many transactions modified at once (num_edits).
+        """
+        with self._cond:
+            now = time.monotonic()
+            if self._first_edit_time is None:
+                self._first_edit_time = now
+            self._last_edit_time = now
+            self._num_pending_edits += num_edits
+            self._cond.notify()
+
+
+    def flush(self):
+        """
+        Save pending edits now (in the calling thread); saving in background
+        continues.
+        """
+        with self._cond:
+            num_edits = self._num_pending_edits
+            self._num_pending_edits = 0
+            self._first_edit_time = None
+            self._last_edit_time = None
+        if num_edits > 0:
+            self._save(num_edits)
+
+
+    def stop(self, flush: bool = True):
+        """
+        Stop the background thread; if 'flush' is set, pending edits are
+        saved before.
+        """
+        with self._cond:
+            self._stopped = True
+            if not flush:
+                self._num_pending_edits = 0
+            self._cond.notify()
+        self._thread.join()
+
+
+    def _get_due_time(self) -> float:
+        return min(self._last_edit_time + self.delay,
+                   self._first_edit_time + self.max_delay)
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and self._num_pending_edits == 0:
+                    self._cond.wait()
+                while not self._stopped and self._num_pending_edits > 0:
+                    timeout = self._get_due_time() - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._num_pending_edits == 0:
+                    if self._stopped:
+                        return
+                    continue    # saved meanwhile by flush()
+                num_edits = self._num_pending_edits
+                self._num_pending_edits = 0
+                self._first_edit_time = None
+                self._last_edit_time = None
+                stopped = self._stopped
+
+            self._save(num_edits)
+            if stopped:
+                return
+
+
+    def _save(self, num_edits: int):
+        t_start = time.perf_counter()
+        try:
+            num_files = self.finman_data.save()
+        except Exception as e:
+            # The transactions remain modified; they are saved with the next edit.
+            self.last_error = e
+            logging.warning(f"Autosave failed: {e}")
+            return
+
+        self.last_save_time = time.perf_counter() - t_start
+        self.last_error = None
+        self.num_saves += 1
+        self.num_files_saved += num_files
+        self.num_edits_saved += num_edits
+        instr.add_time("autosave", self.last_save_time)
+        instr.count("autosave coalesced edits", num_edits)
+        instr.count("autosave files", num_files)
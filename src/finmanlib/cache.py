@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the cache of selection results (see Selection), so that
+switching back and forth between a few filters does not filter and sort all
+transactions again each time.
+
+Entries are invalidated selectively: each entry records the fields its
+filter conditions and sort order depend on, and edits of transactions report
+the fields they modified.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Set
+
+
+
+class SelectionCache:
+    """
+    LRU cache of selection results (lists of transactions), bounded by the
+    number of entries and the total number of transactions referenced.
+    A budget of 0 entries disables the cache.
+    """
+
+    def __init__(self, max_entries: int = 16, max_trns: int = 1_000_000):
+        self.max_entries    = max_entries
+        self.max_trns       = max_trns
+        self.num_trns       = 0
+        self.hits           = 0
+        self.misses         = 0
+        self._entries: OrderedDict = OrderedDict()     # key -> (trns, fields)
+
+
+    def __repr__(self):
+        return f"<SelectionCache: {len(self._entries)}/{self.max_entries} entries, " \
+               f"{self.num_trns} transactions, {self.hits} hits, {self.misses} misses>"
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def get(self, key: Hashable) -> Optional[List]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+
+    def put(self, key: Hashable, trns: List, fields: Iterable[str]):
+        """
+        Store the result for the given key; it depends on the given fields.
+        """
+        if len(trns) > self.max_trns or self.max_entries <= 0:
+            return
+        self._remove(key)
+        self._entries[key] = (trns, frozenset(fields))
+        self.num_trns += len(trns)
+        while len(self._entries) > self.max_entries or self.num_trns > self.max_trns:
+            self._remove(next(iter(self._entries)))
+
+
+    def invalidate(self, fields: Set[str]):
+        """
+        Remove all entries which depend on any of the given fields.
+        """
+        for key in [key for key, (_, entry_fields) in self._entries.items()
+                        if not entry_fields.isdisjoint(fields)]:
+            self._remove(key)
+
+
+    def clear(self):
+        self._entries.clear()
+        self.num_trns = 0
+
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.num_trns -= len(entry[0])
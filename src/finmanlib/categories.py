@@ -12,7 +12,8 @@ import json
 import logging
 from typing import List, Callable
 
-from finmanlib.datafile import Trn, FinmanData
+from finmanlib.datafile import Trn, FinmanData, SEPARATOR_CATS
+from finmanlib.instrument import instr
 from finmanlib.selection import TrnFilter
 
 
@@ -31,7 +32,7 @@ class Categories:
     """
     A selection of transactions.
     """
-    SEPARATOR_CATS = ' ▶ '
+    SEPARATOR_CATS = SEPARATOR_CATS
 
     def __init__(self, cats_file: str):
         self.cats_file = cats_file
@@ -99,14 +100,23 @@ class Categories:
     def get_auto_assignments(self,
             finman_data: FinmanData,
             trns: List[Trn]) -> CatAutoAssignment:
+        with instr.timer("cat auto assignment"):
+            return self._get_auto_assignments(finman_data, trns)
+
+
+    def _get_auto_assignments(self,
+            finman_data: FinmanData,
+            trns: List[Trn]) -> CatAutoAssignment:
 
         # TBD: adjust var names?
 
-        # Prepare Filter objects.
-        filter_dict: Dict[str, List[TrnFilter]] = {}
+        # Prepare one filter per category, matching any of its conditions;
+        # filters which cannot match are left out.
+        filter_dict: Dict[str, TrnFilter] = {}
         for cat, conds in self.cats.items():
-            if len(conds) > 0:
-                filter_dict[cat] = [TrnFilter(finman_data, filter_str=cond) for cond in conds]
+            trn_filter = TrnFilter.any_of(finman_data, conds)
+            if trn_filter.can_match():
+                filter_dict[cat] = trn_filter
                 
         # Prepare result variables.
         num_total = len(trns)
@@ -116,12 +126,13 @@ class Categories:
         prev_man = {}
         multi = {}
 
+        instr.count("transactions scanned", len(trns))
         for trn in trns:
 
             # Determine (from filters) all new categories for this transaction.
             new_cats = []
-            for cat, trn_filters in filter_dict.items():
-                if any(trn_filter.match(trn) for trn_filter in trn_filters):
+            for cat, trn_filter in filter_dict.items():
+                if trn_filter.match(trn):
                     new_cats.append(cat)
 
             # Store results for new category.
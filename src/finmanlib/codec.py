@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the JSON codec used for reading and writing JSONL files.
+
+- Decoding uses orjson, if it is installed (it is considerably faster), and
+  the json module of the standard library otherwise.
+- Encoding uses the json module by default, since the output of orjson is
+  formatted differently (no blanks after separators, no escaping of non-ASCII
+  characters), which would change all lines of saved files.  Select codec
+  'orjson' to use it for encoding as well.
+
+The codec is selected with the environment variable FINMAN_JSON_CODEC
+('auto', 'json' or 'orjson'; default: 'auto'), or with set_codec().
+"""
+
+import json
+import logging
+import os
+from typing import Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+
+class JsonCodec:
+    """
+    JSON codec based on the json module of the standard library.
+    """
+    name = "json"
+
+    # Public attributes of a Trn object, in the order of Trn.__init__().
+    TRN_FIELDS = ['line_num_in_csv', 'columns', 'notes']
+
+    def __init__(self):
+        # A pre-built encoder avoids the argument handling of json.dumps().
+        self._encode = json.JSONEncoder().encode
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} '{self.name}'>"
+
+
+    def loads(self, s: Union[str, bytes]):
+        return json.loads(s)
+
+
+    def dumps(self, obj) -> str:
+        return self._encode(obj)
+
+
+    def dumps_obj(self, obj, type_name: str) -> str:
+        """
+        Encode the public attributes of an object, with a type marker added.
+        """
+        pub_dict = {key: value for key, value in vars(obj).items() if not key.startswith('_')}
+        return self.dumps({'type': type_name, **pub_dict})
+
+
+    def dumps_trn(self, trn) -> str:
+        """
+        Encode a transaction; same output as dumps_obj(trn, 'Trn').
+
+        The envelope of transactions with the usual attributes is built
+        directly, without collecting the public attributes.
+        """
+        d = trn.__dict__
+        if [key for key in d if key[0] != '_'] != self.TRN_FIELDS:
+            return self.dumps_obj(trn, 'Trn')
+        return self.dumps({
+            'type': 'Trn',
+            'line_num_in_csv': d['line_num_in_csv'],
+            'columns': d['columns'],
+            'notes': d['notes'],
+        })
+
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    JSON codec based on orjson for decoding, and optionally for encoding.
+    """
+
+    def __init__(self, encode: bool):
+        super().__init__()
+        self.encode = encode
+        self.name = "orjson" if encode else "orjson (decoding only)"
+
+
+    def loads(self, s: Union[str, bytes]):
+        return orjson.loads(s)
+
+
+    def dumps(self, obj) -> str:
+        if self.encode:
+            return orjson.dumps(obj).decode()
+        return self._encode(obj)
+
+
+
+CODEC_NAMES = ('auto', 'json', 'orjson')
+
+def make_codec(name: str = 'auto') -> JsonCodec:
+    """
+    Create the JSON codec of the given name (see CODEC_NAMES).
+    """
+    if name == 'auto':
+        return JsonCodec() if orjson is None else OrjsonCodec(encode=False)
+    elif name == 'json':
+        return JsonCodec()
+    elif name == 'orjson':
+        if orjson is None:
+            raise ValueError("JSON codec 'orjson' is not installed")
+        return OrjsonCodec(encode=True)
+    else:
+        raise ValueError(f"Invalid JSON codec '{name}' (expected one of {', '.join(CODEC_NAMES)})")
+
+
+def get_codec() -> JsonCodec:
+    """
+    Get the currently selected JSON codec.
+    """
+    return _codec
+
+
+def set_codec(name: str):
+    """
+    Select the JSON codec of the given name (see CODEC_NAMES).
+    """
+    global _codec
+    _codec = make_codec(name)
+
+
+try:
+    _codec = make_codec(os.getenv("FINMAN_JSON_CODEC", "auto"))
+except ValueError as e:
+    logging.warning(f"{e}; using default JSON codec.")
+    _codec = make_codec()
@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
 
+import csv
 import datetime
 import hashlib
-from typing import List, Tuple, Dict
+import io
+from typing import List, Tuple, Dict, Iterator, Optional
 
-from finmanlib.datafile import Trn, TrnsSet, SourceFileInfo, TrnsSetHeader
+from finmanlib.datafile import Trn, TrnsSet, SourceFileInfo, TrnsSetHeader, \
+    StringPool, value_to_cents, cents_to_str
 
 
 
 class CsvFmt:
     """
     Format description of one kind of CSV source file.
+
+    Attribute 'values_in_header' maps names of TrnsSetHeader attributes
+    (e.g. 'bank_account', 'date_start', 'value_end') to their position within
+    the header lines of the CSV file, given as [line, field] or
+    [line, field, word] (all counting from 1); 'word' selects a
+    whitespace-separated part of the field. A position of null means that the
+    value is not contained in the header.
     """
 
     def __init__(self, **kwargs):
@@ -19,12 +29,14 @@ class CsvFmt:
         self.comment                = ""
         self.encoding               = "utf-8"
         self.separator              = ";"
+        self.quotechar              = '"'
         self.currency               = "EUR"
         self.num_header_lines       = 0
         self.line_with_column_names = 0
         self.fmt_date               = "YYYY-MM-DD"
         self.fmt_value              = "x,xxx.yy"
         self.columns                = {}
+        self.values_in_header       = {}
         
         # Store provided information.
         for key, value in kwargs.items():
@@ -35,6 +47,11 @@ class CsvFmt:
         self.fmt_date = self.fmt_date.upper().replace('.', '/').replace('-', '/')
         self.fmt_value = self.fmt_value.lower()
 
+        # Check names of header values.
+        header_attrs = vars(TrnsSetHeader())
+        for key in self.values_in_header:
+            assert key in header_attrs, f"Wrong header value in CsvFmt: '{key}'"
+
 
     @staticmethod
     def unquote(s: str) -> str:
@@ -55,19 +72,28 @@ class CsvFmt:
     def conv_date(s: str, fmt_date: str) -> str:
         """
         Convert a given date to standard format.
+
+        Day and month may be given without leading zeros (e.g. '7/5/1999').
         """
-        assert len(s) == 10, f"Invalid length of date string '{s}'"
+        if len(s) == 10:
+            parts = s[0:2], s[3:5], s[6:10]
+            if fmt_date == "YYYY/MM/DD":
+                parts = s[0:4], s[5:7], s[8:10]
+        else:
+            parts = s.replace('.', '/').replace('-', '/').split('/')
+            assert len(parts) == 3, f"Invalid date string '{s}'"
 
         if fmt_date == "DD/MM/YYYY":
-            dd, mm, yyyy = s[0:2], s[3:5], s[6:10]
+            dd, mm, yyyy = parts
         elif fmt_date == "MM/DD/YYYY":
-            mm, dd, yyyy = s[0:2], s[3:5], s[6:10]
+            mm, dd, yyyy = parts
         elif fmt_date == "YYYY/MM/DD":
-            yyyy, mm, dd = s[0:4], s[5:7], s[8:10]
+            yyyy, mm, dd = parts
         else:
             assert False, f"Invalid date format: '{fmt_date}'"
+        assert len(yyyy) == 4, f"Invalid date string '{s}'"
 
-        return f"{yyyy}-{mm}-{dd}"
+        return f"{yyyy}-{mm:0>2}-{dd:0>2}"
 
 
     @staticmethod
@@ -89,33 +115,104 @@ class CsvFmt:
         return f"{float(s):+.2f}"
 
 
+    def _csv_reader(self, fh) -> Iterator[List[str]]:
+        """
+        Get a reader (from the stdlib csv module) for the given text stream or
+        list of lines, configured according to this format.
+        """
+        if self.quotechar:
+            return csv.reader(fh, delimiter=self.separator,
+                    quotechar=self.quotechar, quoting=csv.QUOTE_MINIMAL)
+        else:
+            return csv.reader(fh, delimiter=self.separator,
+                    quoting=csv.QUOTE_NONE)
+
+
     def _column_mapping(self, lines_header: List[str]) -> Dict[str, int]:
         """
         Obtain a name-to-column-index mapping,
         from the column-header line in the CSV file.
         """
         csv_col_headers_line = lines_header[self.line_with_column_names - 1]
-        csv_col_headers = [self.unquote(hdr) for hdr in csv_col_headers_line.split(self.separator)]
-        csv_col_headers = [self.unquote(hdr) for hdr in csv_col_headers_line.split(self.separator)]
-        csv_hdr_to_idx = {hdr: idx for idx, hdr in enumerate(csv_col_headers)}
+        csv_col_headers = next(self._csv_reader([csv_col_headers_line]), [])
+        csv_hdr_to_idx = {self.unquote(hdr): idx for idx, hdr in enumerate(csv_col_headers)}
         attr_name_to_idx = {attr_name: csv_hdr_to_idx[csv_hdr]
                 for attr_name, csv_hdr in self.columns.items()}
         return attr_name_to_idx
 
 
-    def _conv_trn(self, line_num_in_csv: int, line: str, col_map: Dict[str, int]) -> Trn:
+    def _header_values(self, lines_header: List[str]) -> Dict[str, str]:
+        """
+        Obtain the values given in 'values_in_header' from the header lines,
+        as raw strings.
         """
-        Obtain a Trn object from the data contained in the given line from the
-        CSV file.
+        header_values = {}
+        for name, pos in self.values_in_header.items():
+            if not pos:
+                continue
+            try:
+                line = lines_header[pos[0] - 1]
+                value = next(self._csv_reader([line]))[pos[1] - 1].strip()
+                if len(pos) >= 3:
+                    value = value.split()[pos[2] - 1]
+            except (IndexError, StopIteration):
+                raise ValueError(f"No header value '{name}' at position {pos}")
+            header_values[name] = value
+        return header_values
+
+
+    def _conv_header(self, header_values: Dict[str, str]) -> TrnsSetHeader:
+        """
+        Obtain a TrnsSetHeader object from the raw header values.
+        """
+        header = TrnsSetHeader()
+        for name, value in header_values.items():
+            if name.startswith('date_'):
+                value = self.conv_date(value, self.fmt_date)
+            elif name.startswith('value_'):
+                value = self.conv_value(value, self.fmt_value)
+            setattr(header, name, value)
+        return header
+
+
+    @staticmethod
+    def _complete_header(header: TrnsSetHeader,
+            date_first: Optional[str],
+            date_last: Optional[str],
+            value_diff: int):
+        """
+        Complete the header with the summary of the transactions.
+
+        A missing start or end value is derived from the other one. The
+        difference value_diff is given in cents.
+        """
+        header.date_first = date_first
+        header.date_last = date_last
+        header.value_diff = cents_to_str(value_diff)
+        if header.value_start is None and header.value_end is not None:
+            header.value_start = cents_to_str(value_to_cents(header.value_end) - value_diff)
+        elif header.value_end is None and header.value_start is not None:
+            header.value_end = cents_to_str(value_to_cents(header.value_start) + value_diff)
+
+
+    def _conv_trn(self, line_num_in_csv: int, row: List[str], col_map: Dict[str, int],
+                  string_pool: StringPool) -> Trn:
+        """
+        Obtain a Trn object from the data contained in the given row (i.e. the
+        list of fields of one line) from the CSV file.
+
+        Only the fields given in col_map are taken from the row.  All values
+        except 'value' are pooled.
         """
-        column_values = line.split(self.separator)
         columns = {}
         for col_name, col_idx in col_map.items():
-            col_value = self.unquote(column_values[col_idx])
+            col_value = row[col_idx]
             if col_name == 'date':
-                col_value = self.conv_date(col_value, self.fmt_date)
+                col_value = string_pool.intern(self.conv_date(col_value, self.fmt_date))
             elif col_name == 'value':
                 col_value = self.conv_value(col_value, self.fmt_value)
+            else:
+                col_value = string_pool.intern(col_value)
             columns[col_name] = col_value
 
         trn = Trn()
@@ -124,13 +221,28 @@ class CsvFmt:
         return trn
 
 
-    def _read_sourcefile(self, filename: str) -> Tuple[SourceFileInfo, List[str]]:
+    def _read_sourcefile(self, filename: str) -> Tuple[SourceFileInfo, List[str], str]:
         """
         Obtain CSV file and SourceFile descriptor.
+
+        Return the SourceFileInfo, the header lines and the remaining text
+        (containing the transaction lines) of the CSV file.
         """
         with open(filename, 'rb') as fh:
             blob = fh.read()
-        lines = str(blob, encoding=self.encoding).split("\n")
+        text = str(blob, encoding=self.encoding)
+
+        # Split off the header lines; the remaining text is left to the CSV
+        # reader, as quoted fields may contain line breaks.
+        pos = 0
+        lines_header = []
+        for _ in range(self.num_header_lines):
+            pos_next = text.find("\n", pos)
+            if pos_next < 0:
+                pos_next = len(text)
+            lines_header.append(text[pos:pos_next].rstrip("\r"))
+            pos = min(pos_next + 1, len(text))
+        text_trns = text[pos:]
 
         n = datetime.datetime.now()
         src = SourceFileInfo()
@@ -143,35 +255,58 @@ class CsvFmt:
         src.csv_fmt = self.name
         src.currency = self.currency
         src.columns = self.columns
-        src.num_lines = len(lines)
+        src.num_lines = text.count("\n") + 1
         src.num_trns = 0
-        src.header_lines = lines[:self.num_header_lines]
+        src.header_lines = lines_header
+        src.header_values = self._header_values(lines_header)
 
-        return src, lines
+        return src, lines_header, text_trns
 
 
-    def process_csv(self, filename: str) -> TrnsSet:
+    def process_csv(self, filename: str, string_pool: Optional[StringPool] = None) -> TrnsSet:
         """
         Create a transaction set from the given CSV file.
+
+        The strings of the transactions are pooled in the given StringPool
+        (or in a new one).
         """
+        if string_pool is None:
+            string_pool = StringPool()
+
         # Obtain lines from CSV files.
-        src, lines = self._read_sourcefile(filename)
+        src, lines_header, text_trns = self._read_sourcefile(filename)
         num = self.num_header_lines
-        lines_header = lines[:num]
-        lines_trns = lines[num:]
 
-        # Create set of Trn objects.
+        # Create set of Trn objects; empty lines are skipped.
+        # In the same pass, determine the summary for the TrnsSetHeader.
         col_map = self._column_mapping(lines_header)
-        trns = [self._conv_trn(line_num_in_csv, line.strip(), col_map)
-                    for line_num_in_csv, line in enumerate(lines_trns, start=num+1)]
+        reader = self._csv_reader(io.StringIO(text_trns, newline=""))
+        trns = []
+        date_first = None
+        date_last = None
+        value_diff = 0
+        line_num = 1        # first line of the next row (rows may span lines)
+        for row in reader:
+            if row:
+                trn = self._conv_trn(num + line_num, row, col_map, string_pool)
+                trns.append(trn)
+
+                date = trn.columns.get('date')
+                if date is not None:
+                    if date_first is None or date < date_first:
+                        date_first = date
+                    if date_last is None or date > date_last:
+                        date_last = date
+                if 'value' in trn.columns:
+                    value_diff += trn.value_cents()
+            line_num = reader.line_num + 1
         src.num_trns = len(trns)
 
         # Create TrnsSet object.
-        # (For the moment, the TrnsSetHeader object is not filled; needs to be
-        #  adjusted manually.)
         trns_set = TrnsSet()
         trns_set.src = src
-        trns_set.header = TrnsSetHeader()
+        trns_set.header = self._conv_header(src.header_values)
+        self._complete_header(trns_set.header, date_first, date_last, value_diff)
         trns_set.trns = trns
 
         return trns_set
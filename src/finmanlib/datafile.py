@@ -36,12 +36,39 @@ header information (e.g. date ranges)
 
 """
 
-from collections.abc import Sequence
+from array import array
+import bisect
+from collections import namedtuple
+from collections.abc import Sized
 from decimal import Decimal
 from enum import Enum, auto
+import functools
+import gzip
+import io
+import itertools
 import json
 import logging
-from typing import Set, List, Dict, Optional, Union
+import mmap
+import os
+import re
+import sys
+import threading
+import tracemalloc
+from typing import Set, List, Dict, Iterable, Optional, Union, Tuple
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from finmanlib.autosave import Autosaver
+from finmanlib.cache import SelectionCache
+from finmanlib.codec import get_codec
+from finmanlib.instrument import instr
+from finmanlib.memory import get_size
+from finmanlib.stats import DataStats
+from finmanlib.watch import get_file_stat
 
 
 # Field names.  TBD: rename "column" to "field" or "attribute"?
@@ -52,15 +79,136 @@ COL_DATE    = 'date'
 COL_VALUE   = 'value'
 COL_CAT_ALT = '_cat_alt'
 
+# Separator of hierarchy levels within category names.
+SEPARATOR_CATS = ' ▶ '
 
-def plural(word: str, count: Union[int, Sequence]) -> str:
-    if isinstance(count, Sequence):
+
+def plural(word: str, count: Union[int, Sized], plural_word: Optional[str] = None) -> str:
+    """
+    Get the word in singular or plural form (by default the word + "s")
+    according to the count, or the length of a container.
+    """
+    if isinstance(count, Sized):
         count = len(count)
-    return word + "s" if count != 1 else word
+    if count == 1:
+        return word
+    return plural_word if plural_word is not None else word + "s"
 
 def str_modified(obj) -> str:
     return "modified" if obj.is_modified() else "unmodified"
 
+def value_to_cents(s: str) -> int:
+    """
+    Convert a money value string (e.g. '+100.78') to an integer number of cents.
+    """
+    if len(s) > 3 and s[-3] == '.':
+        return int(s.replace('.', '', 1))
+    cents = Decimal(s) * 100
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Value '{s}' is not a whole number of cents")
+    return int(cents)
+
+def cents_to_str(cents: int) -> str:
+    """
+    Convert an integer number of cents to a money value string (e.g. '+100.78').
+    """
+    sign = '-' if cents < 0 else '+'
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02}"
+
+def is_compressed(filename: str) -> bool:
+    return filename.endswith(('.gz', '.zst'))
+
+def get_tmp_filename(filename: str) -> str:
+    """
+    Get the name of the temporary file used for writing the given file
+    atomically (in the same directory, with the same compression suffix).
+    """
+    dirname, basename = os.path.split(filename)
+    suffix = os.path.splitext(filename)[1] if is_compressed(filename) else ""
+    return os.path.join(dirname, f".{basename}.tmp{suffix}")
+
+def open_jsonl(filename: str, mode: str = 'rb'):
+    """
+    Open a JSONL file for reading as binary stream (mode 'rb') or for writing
+    as text stream (mode 'w').
+
+    Files with suffix '.gz' (gzip) or '.zst' (Zstandard; needs module
+    zstandard) are decompressed or compressed while streaming.
+    """
+    assert mode in ('rb', 'w'), f"invalid mode '{mode}'"
+    if filename.endswith('.gz'):
+        if mode == 'rb':
+            return gzip.open(filename, 'rb')
+        return gzip.open(filename, 'wt', encoding='utf-8')
+    elif filename.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError(f"Cannot open {filename}: module zstandard is not installed")
+        if mode == 'rb':
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb')))
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(filename, 'wb')),
+                                encoding='utf-8')
+    else:
+        if mode == 'rb':
+            return open(filename, 'rb')
+        return open(filename, 'w', encoding='utf-8')
+
+
+
+class StringPool:
+    """
+    A pool of strings, so that equal strings (e.g. the addressees or
+    categories of many transactions) are stored only once.
+
+    The pool also records the names of the 'columns' and 'notes' fields of
+    the pooled transactions (see intern_trn()).
+    """
+
+    def __init__(self):
+        self._strings: Dict[str, str]  = {"": ""}
+        self.column_fields: Set[str]   = set()
+        self.note_fields: Set[str]     = set()
+
+    def __repr__(self):
+        return f"<StringPool: {len(self._strings)} {plural('string', len(self._strings))}>"
+
+    def __len__(self):
+        return len(self._strings)
+
+
+    def intern(self, s: str) -> str:
+        """
+        Get the pooled string equal to the given one; add it if needed.
+        """
+        return self._strings.setdefault(s, s)
+
+
+    def get(self, s: str) -> Optional[str]:
+        """
+        Get the pooled string equal to the given one, or None.
+        """
+        return self._strings.get(s)
+
+
+    def intern_trn(self, trn: 'Trn'):
+        """
+        Replace the field names and the string values of the 'columns' fields
+        (except COL_VALUE, whose values rarely repeat) and of the category of
+        the given transaction by pooled strings.
+        """
+        intern = self._strings.setdefault
+        columns = {intern(key, key): intern(value, value)
+                                     if type(value) is str and key != COL_VALUE else value
+                   for key, value in trn.columns.items()}
+        notes = {intern(key, key): value for key, value in trn.notes.items()}
+        cat = notes.get('cat')
+        if type(cat) is str:
+            notes['cat'] = intern(cat, cat)
+        trn.columns = columns
+        trn.notes = notes
+
+        self.column_fields.update(columns)
+        self.note_fields.update(notes)
+
 
 
 class Trn:
@@ -70,24 +218,38 @@ class Trn:
     Attributes:
 
     _id             Unique ID during program run, set during loading of JSONL files.
-    _idx            The index within the latest selection
     _is_modified    Have the transaction's 'note' attributes been modified?
     _cat_alt        Temporary alternative category name
+    _observer       Object to be notified on changes (FinmanData)
+    _value_cents    Cached value of field COL_VALUE in cents (see value_cents())
     line_num_in_csv Line number in CSV file described in current block in JSONL.
     columns         Fields copied from CSV file (remain unchanged).
                     Field COL_VALUE is treated special (see selection.py).
     notes           User annotations.
                     Fields 'cat', 'cat_auto', 'remark' are expectedd.
                     Add any custom fields here; they remain unchanged.
+
+    Field '_idx' (COL_IDX) is not stored, but is the position within the
+    active selection (see get_idx()).
     """
 
     INVALID_FIELD = None
 
     def __init__(self, _id: Optional[str]=None):
+        self._init_volatile(_id)
+        self._init_fields()
+
+
+    def _init_volatile(self, _id: Optional[str]):
         self._id                      = _id
-        self._idx                     = None
         self._is_modified             = False
         self._cat_alt                 = ""
+        self._observer                = None
+        self._value_cents             = None
+        self._value_src               = None
+
+
+    def _init_fields(self):
         self.line_num_in_csv          = None
         self.columns: Dict[str, str]  = {}
         self.notes                    = {
@@ -106,6 +268,20 @@ class Trn:
         return self._is_modified
 
 
+    def is_decoded(self):
+        """
+        Are all fields of the transaction available (see LazyTrn)?
+        """
+        return True
+
+
+    def get_known_columns(self) -> Dict[str, str]:
+        """
+        Get the 'columns' fields which are available without decoding.
+        """
+        return self.columns
+
+
     def _check_fields(self):
         """
         Give infos/warnings if expected attributes are not present.
@@ -134,8 +310,40 @@ class Trn:
 
 
     def value(self) -> Decimal:
-        assert COL_VALUE in self.columns
-        return Decimal(self.columns[COL_VALUE])
+        return Decimal(self.value_cents()).scaleb(-2)
+
+
+    def get_comparable_field(self, field: str, invalid_fields: Optional[set] = None):
+        """
+        Get field of transaction in the form used for comparisons: field
+        COL_VALUE as integer number of cents, all other fields as is.
+        """
+        if field == COL_VALUE:
+            return self.value_cents()
+        return self.get_field(field, invalid_fields)
+
+
+    def get_idx(self) -> Optional[int]:
+        """
+        Get the position (1-based) of the transaction within the active
+        selection of the FinmanData object (see Selection.get_idx()); None
+        if not selected.
+        """
+        selection = self._observer.active_selection if self._observer is not None else None
+        return selection.get_idx(self) if selection is not None else None
+
+
+    def value_cents(self) -> int:
+        """
+        Get value of transaction as integer number of cents.
+
+        The value is parsed only once, unless field COL_VALUE changes.
+        """
+        s = self.columns[COL_VALUE]
+        if s is not self._value_src:
+            self._value_cents = value_to_cents(s)
+            self._value_src = s
+        return self._value_cents
 
 
     def get_field(self, field: str, invalid_fields: Optional[set] = None) -> str:
@@ -146,7 +354,10 @@ class Trn:
         """
         if field == '':
             return self.INVALID_FIELD
-        elif field in ('_id', '_idx', '_is_modified', '_cat_alt', 'line_num_in_csv'):
+        elif field == COL_IDX:
+            idx = self.get_idx()
+            return str(idx) if idx is not None else self.INVALID_FIELD
+        elif field in ('_id', '_is_modified', '_cat_alt', 'line_num_in_csv'):
             return getattr(self, field)
         elif field in self.columns:
             return self.columns[field]
@@ -174,23 +385,61 @@ class Trn:
 
         'cat_auto' indicates if category was set according to automatic rule.
         """
-        if self.notes['cat'] != cat:
-            self.notes['cat'] = cat
-            self.notes['cat_auto'] = cat_auto
-            self._is_modified = True
+        old = self._set_cat(cat, cat_auto)
+        if old is not None and self._observer is not None:
+            old_cat, old_cat_auto = old
+            self._observer.cat_changed(self, old_cat)
+            self._observer.trn_modified(self, {'cat': old_cat, 'cat_auto': old_cat_auto})
+
+
+    def _set_cat(self, cat: str, cat_auto: bool) -> Optional[Tuple[str, Optional[bool]]]:
+        """
+        Set category of transaction without notifying the observer (see
+        FinmanData.set_cats()); return the old category and 'cat_auto' if
+        changed, else None.
+        """
+        old_cat = self.notes['cat']
+        if old_cat == cat:
+            return None
+        if self._observer is not None:
+            cat = self._observer.string_pool.intern(cat)
+        old_cat_auto = self.notes['cat_auto']
+        self.notes['cat'] = cat
+        self.notes['cat_auto'] = cat_auto
+        self._is_modified = True
+        return old_cat, old_cat_auto
 
 
     def clear_cat(self):
-        if self.notes['cat'] != "":
+        old_cat = self.notes['cat']
+        if old_cat != "":
+            old_cat_auto = self.notes['cat_auto']
             self.notes['cat'] = ""
             self.notes['cat_auto'] = None
             self._is_modified = True
+            if self._observer is not None:
+                self._observer.cat_changed(self, old_cat)
+                self._observer.trn_modified(self, {'cat': old_cat, 'cat_auto': old_cat_auto})
 
 
     def set_remark(self, remark=""):
-        if self.notes['remark'] != remark:
-            self.notes['remark'] = remark
-            self._is_modified = True
+        old_remark = self._set_remark(remark)
+        if old_remark is not None and self._observer is not None:
+            self._observer.trn_modified(self, {'remark': old_remark})
+
+
+    def _set_remark(self, remark: str) -> Optional[str]:
+        """
+        Set remark of transaction without notifying the observer (see
+        FinmanData.set_remarks()); return the old remark if changed, else
+        None.
+        """
+        old_remark = self.notes['remark']
+        if old_remark == remark:
+            return None
+        self.notes['remark'] = remark
+        self._is_modified = True
+        return old_remark
 
 
     def clear_modified(self):
@@ -198,6 +447,141 @@ class Trn:
 
 
 
+class LazyTrn(Trn):
+    """
+    A transaction loaded in lazy mode (see JsonlFile).
+
+    The transaction keeps its raw JSONL line and the line's byte offset within
+    the JSONL file.  Only the fields HOT_FIELDS are extracted from the line
+    on first access to any of them (cheaply, by searching the keys); the line
+    is decoded completely on first access to any other field of
+    'line_num_in_csv', 'columns' and 'notes', e.g. on modification.
+
+    Attributes (additionally to Trn):
+
+    _raw            Raw JSONL line (bytes), or None if decoded
+    _offset         Byte offset of the line within the (uncompressed) JSONL file
+    _hot            Pre-extracted fields (field name -> value), or None if decoded;
+                    not present before first access
+    """
+
+    # Fields expected in 'columns' and 'notes' which are pre-extracted.
+    HOT_COLUMNS = (COL_DATE, COL_VALUE)
+    HOT_NOTES   = ('cat',)
+    HOT_FIELDS  = HOT_COLUMNS + HOT_NOTES
+
+    # Fields which are only present after decoding.
+    DECODED_FIELDS = ('line_num_in_csv', 'columns', 'notes')
+
+    # Marker of Trn lines as written by JsonlFile with the default JSON codec
+    # (see codec.py); other lines are decoded directly.
+    LINE_START = b'{"type": "Trn"'
+
+    # Keys of the fields, as written by JsonlFile.
+    # Only string values are extracted; the first occurrence is used, which
+    # matches the look-up order of get_field() ('columns' before 'notes').
+    _HOT_KEYS = [(field, b'"' + field.encode() + b'": "') for field in HOT_FIELDS]
+    _STRING_BODY = re.compile(rb'(?:[^"\\]|\\.)*')
+
+    def __init__(self, _id: Optional[str], raw: bytes, offset: int):
+        self._init_volatile(_id)
+        self._raw       = raw
+        self._offset    = offset
+
+
+    def __getattr__(self, name):
+        # Only called if the attribute is not present, i.e. not yet
+        # extracted or decoded.
+        if self.__dict__.get('_raw') is not None:
+            if name == '_hot':
+                observer = self._observer
+                string_pool = observer.string_pool \
+                              if observer is not None and observer.pool_strings else None
+                self._hot = self._extract_hot(self._raw, string_pool)
+                return self._hot
+            if name in self.DECODED_FIELDS:
+                self._decode()
+                return getattr(self, name)
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+
+    @classmethod
+    def _extract_hot(cls, raw: bytes, string_pool: Optional[StringPool]) -> Dict[str, str]:
+        hot = {}
+        for field, key in cls._HOT_KEYS:
+            start = raw.find(key)
+            if start < 0:
+                continue
+            start += len(key)
+            end = raw.find(b'"', start)
+            if end < 0:
+                continue
+            value = raw[start:end]
+            if raw[end - 1] == 0x5c:        # escaped quote (backslash)
+                value = cls._STRING_BODY.match(raw, start).group()
+            value = cls._unescape(value) if b'\\' in value else value.decode()
+            if string_pool is not None and field != COL_VALUE:
+                value = string_pool.intern(value)
+            hot[field] = value
+        return hot
+
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _unescape(value: bytes) -> str:
+        # Escaped values are mostly non-ASCII category names, which repeat.
+        return json.loads(b'"' + value + b'"')
+
+
+    def _decode(self):
+        # The raw line is dropped last, so that a concurrent save (see
+        # JsonlFile._write()) writes either it or the complete fields.
+        d = get_codec().loads(self._raw)
+        del d['type']
+        self._init_fields()
+        JsonlFile._update(self, d)
+        self._check_fields()
+        if self._observer is not None and self._observer.pool_strings:
+            self._observer.string_pool.intern_trn(self)
+        self._hot = None
+        self._raw = None
+
+
+    def is_decoded(self):
+        return self._raw is None
+
+
+    def get_raw(self) -> str:
+        """
+        Get the raw JSONL line of a transaction which is not decoded.
+        """
+        assert self._raw is not None
+        return self._raw.decode()
+
+
+    def get_known_columns(self) -> Dict[str, str]:
+        if self._raw is None:
+            return self.columns
+        return {field: self._hot[field] for field in self.HOT_COLUMNS if field in self._hot}
+
+
+    def get_field(self, field: str, invalid_fields: Optional[set] = None) -> str:
+        hot = self._hot
+        if hot is not None and field in hot:
+            return hot[field]
+        return Trn.get_field(self, field, invalid_fields)
+
+
+    def value_cents(self) -> int:
+        hot = self._hot
+        if hot is not None and COL_VALUE in hot:
+            if self._value_cents is None:
+                self._value_cents = value_to_cents(hot[COL_VALUE])
+            return self._value_cents
+        return Trn.value_cents(self)
+
+
+
 class SourceFileInfo:
     """
     Information about a CSV source file (excluding header data).
@@ -214,6 +598,7 @@ class SourceFileInfo:
         self.currency:          str = None
         self.columns:           Dict[str, str] = {}
         self.header_lines:      List[str] = []
+        self.header_values:     Dict[str, str] = {}
         self.num_lines:         int = None
         self.num_trns:          int = None
 
@@ -233,6 +618,7 @@ class TrnsSetHeader:
     """
 
     def __init__(self):
+        self.bank_account:  str = None
         self.date_start:    str = None
         self.date_end:      str = None
         self.date_first:    str = None
@@ -245,15 +631,46 @@ class TrnsSetHeader:
         return f"<TrnsSetHeader {self.date_start} to {self.date_end}>"
 
 
+FieldRange = namedtuple('FieldRange', 'min max count')
+# min           = minimum value of a field within a TrnsSet
+# max           = maximum value of a field within a TrnsSet
+# count         = number of transactions containing the field
+
+ReloadResult = namedtuple('ReloadResult', 'sets_kept sets_reloaded trns_kept trns_new trns_removed conflicts')
+# sets_kept     = number of unchanged TrnsSets (kept as they are)
+# sets_reloaded = number of changed TrnsSets (parsed again)
+# trns_kept     = number of Trn objects kept within changed TrnsSets
+# trns_new      = number of Trn objects created for new or changed lines
+# trns_removed  = number of previous Trn objects dropped (removed or changed)
+# conflicts     = descriptions of unsaved edits of transactions changed or
+#                 removed in the file
+
+
+
 class TrnsSet:
     """
     A set of transactions, consisting of description and list of transactions.
+
+    For the (unchangeable) 'columns' fields of the transactions, the range of
+    values is kept, so that whole sets may be skipped when filtering
+    transactions. These ranges are determined on first use (see
+    get_field_range()), and need to be updated with update_field_ranges()
+    if transactions are added or removed.
     """
 
     def __init__(self):
         self.src             = SourceFileInfo()
         self.header          = TrnsSetHeader()
         self.trns: List[Trn] = []
+        self._field_ranges: Optional[Dict[str, FieldRange]] = None     # determined on first use
+
+        # Position of the set in the JSONL file, and CRC-32 of its lines and
+        # of each transaction's line, for detecting unchanged sets and
+        # transactions when reloading (see JsonlFile.reload()).
+        self._line_num: Optional[int] = None
+        self._offset: Optional[int]   = None
+        self._crc: Optional[int]      = None
+        self._trn_crcs                = array('I')
 
     def __repr__(self):
         return f"<TrnsSet {self.src.filename} " \
@@ -264,15 +681,79 @@ class TrnsSet:
         return any(trn.is_modified() for trn in self.trns)
 
 
+    def update_field_ranges(self):
+        """
+        Determine the range of values of all 'columns' fields (for lazily
+        loaded transactions: of the pre-extracted fields only).
+
+        Field COL_VALUE is compared as integer number of cents, all other
+        fields as strings; fields with non-string values are not considered.
+        """
+        ranges = {}
+        invalid = set()
+        for trn in self.trns:
+            for field, value in trn.get_known_columns().items():
+                if field in invalid:
+                    continue
+                if type(value) is not str:
+                    invalid.add(field)
+                    continue
+                if field == COL_VALUE:
+                    value = trn.value_cents()
+
+                rng = ranges.get(field)
+                if rng is None:
+                    ranges[field] = [value, value, 1]
+                else:
+                    if value < rng[0]:
+                        rng[0] = value
+                    elif value > rng[1]:
+                        rng[1] = value
+                    rng[2] += 1
+
+        self._field_ranges = {field: FieldRange(*rng)
+                              for field, rng in ranges.items() if field not in invalid}
+
+
+    def get_field_range(self, field: str) -> Optional[FieldRange]:
+        """
+        Get range of values of the given field, or None if unknown.
+        """
+        if self._field_ranges is None:
+            self.update_field_ranges()
+        return self._field_ranges.get(field)
+
+
+
+class FileChangedError(ValueError):
+    """
+    A file to be saved has been changed on disk since it was loaded or
+    saved; it has to be reloaded first (see JsonlFile.reload()).
+    """
+
+
 
 class JsonlFile:
     """
     A transactions file, consisting of zero, one or multiple transaction sets.
+
+    In lazy mode, transactions are loaded as LazyTrn objects, which are
+    decoded completely only when needed.
+
+    Compressed files are read and written transparently (see open_jsonl()).
+
+    If a StringPool is given, the strings of the transactions are pooled.
+
+    Changes of the file on disk can be reloaded incrementally (see reload()).
     """
 
-    def __init__(self, filename: str, trn_id_prefix=""):
+    def __init__(self, filename: str, trn_id_prefix="", lazy=False,
+                 string_pool: Optional[StringPool] = None):
         self.filename                   = filename
+        self.lazy                       = lazy
+        self.string_pool                = string_pool
         self.trns_sets: List[TrnsSet]   = []
+        self._file_stat                 = None
 
         if filename:
             self.load(trn_id_prefix)
@@ -290,56 +771,279 @@ class JsonlFile:
         return any(trns_set.is_modified() for trns_set in self.trns_sets)
 
 
-    def save(self):
+    def is_changed_on_disk(self) -> bool:
         """
-        Save all modified files in the given FinMan data.
+        Has the file been changed since it was loaded or saved?
         """
-        if self.is_modified():
-            with open(self.filename, 'w') as fh:
-                self._write(fh)
-            self.modified = False
+        return get_file_stat(self.filename) != self._file_stat
 
-        # Clear modified flag.
-        for trns_set in self.trns_sets:
-            for trn in trns_set.trns:
-                trn.clear_modified()
 
+    def save(self) -> bool:
+        """
+        Save the file, if modified; return True if saved.
 
-    def _write(self, fh):
+        The file is replaced atomically by a completely written temporary
+        file.  The modified flags are cleared before writing, so transactions
+        modified while writing (e.g. when saving in background) remain
+        modified.
 
-        def get_json(obj) -> str:
-            """
-            Deliver the JSONified variables of an object, with a type marker added.
-            """
-            pub_dict = {key: getattr(obj, key) for key in vars(obj) if not key.startswith('_')}
-            d = {'type': obj.__class__.__name__, **pub_dict}
-            return json.dumps(d)
+        A file changed on disk is not overwritten; FileChangedError is raised
+        (see reload()).
+        """
+        modified_trns = [trn for trns_set in self.trns_sets
+                             for trn in trns_set.trns if trn.is_modified()]
+        if not modified_trns:
+            return False
+        if self.is_changed_on_disk():
+            raise FileChangedError(f"File {self.filename} has been changed on disk; "
+                                   f"reload it before saving")
+
+        for trn in modified_trns:
+            trn.clear_modified()
+        tmp_filename = get_tmp_filename(self.filename)
+        try:
+            with open_jsonl(tmp_filename, 'w') as fh:
+                self._write(fh)
+            os.replace(tmp_filename, self.filename)
+            self._file_stat = get_file_stat(self.filename)
+        except Exception:
+            for trn in modified_trns:
+                trn._is_modified = True
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        return True
 
+
+    def _write(self, fh):
+        codec = get_codec()
         for trns_set in self.trns_sets:
-            fh.write(get_json(trns_set.src) + "\n")
-            fh.write(get_json(trns_set.header) + "\n")
+            fh.write(codec.dumps_obj(trns_set.src, 'SourceFileInfo') + "\n")
+            fh.write(codec.dumps_obj(trns_set.header, 'TrnsSetHeader') + "\n")
             for trn in trns_set.trns:
-                fh.write(get_json(trn) + "\n")
+                # Transactions may be decoded concurrently (see LazyTrn._decode()).
+                raw = trn.__dict__.get('_raw')
+                if raw is None:
+                    fh.write(codec.dumps_trn(trn) + "\n")
+                else:
+                    fh.write(raw.decode() + "\n")
             fh.write("\n")
 
 
     def load(self, trn_id_prefix: str):
         try:
             dicts = {}
-            with open(self.filename) as fh:
-                for line_num_in_jsonl, line in enumerate(fh.readlines(), start=1):
-                    line = line.strip()
-                    if line:
-                        dicts[line_num_in_jsonl] = json.loads(line)
+            offset = 0
+            set_positions = []      # [line_num, offset, line CRCs, Trn line CRCs] of each set
+            loads = get_codec().loads
+            # Get file status before reading, so that concurrent changes are
+            # detected as changes on disk.
+            self._file_stat = get_file_stat(self.filename)
+            with open_jsonl(self.filename, 'rb') as fh:
+                for line_num_in_jsonl, line in enumerate(fh, start=1):
+                    stripped = line.strip()
+                    is_trn = False
+                    if not stripped:
+                        pass
+                    elif self.lazy and stripped.startswith(LazyTrn.LINE_START):
+                        dicts[line_num_in_jsonl] = {'type': 'Trn', '_raw': stripped, '_offset': offset}
+                        is_trn = True
+                    else:
+                        d = dicts[line_num_in_jsonl] = loads(stripped)
+                        tp = d.get('type')
+                        if tp == 'SourceFileInfo':
+                            set_positions.append([line_num_in_jsonl, offset, array('I'), array('I')])
+                        is_trn = (tp == 'Trn')
+                    if set_positions:
+                        crc = zlib.crc32(line)
+                        set_positions[-1][2].append(crc)
+                        if is_trn:
+                            set_positions[-1][3].append(crc)
+                    offset += len(line)
 
             self.trns_sets = []
             self._construct_from_dicts(dicts, trn_id_prefix)
+            for trns_set, (line_num, offset, line_crcs, trn_crcs) in zip(self.trns_sets, set_positions):
+                trns_set._line_num, trns_set._offset = line_num, offset
+                trns_set._crc, trns_set._trn_crcs = zlib.crc32(line_crcs), trn_crcs
 
         except json.JSONDecodeError as e:
             raise Exception(f"Error reading JSONL file {self.filename}, "
                             f"line {line_num_in_jsonl + 1}: {e}")
 
 
+    def _read_set_chunks(self) -> List[Tuple[int, int, List[bytes]]]:
+        """
+        Read the file, split into the lines of the transaction sets.
+
+        Return a list of (line number, offset, lines) per set; each set starts
+        with a SourceFileInfo line.
+        """
+        chunks = []
+        offset = 0
+        loads = get_codec().loads
+        with open_jsonl(self.filename, 'rb') as fh:
+            for line_num_in_jsonl, line in enumerate(fh, start=1):
+                # Only lines possibly starting a set are decoded.
+                if b'"SourceFileInfo"' in line \
+                        and loads(line.strip()).get('type') == 'SourceFileInfo':
+                    chunks.append((line_num_in_jsonl, offset, []))
+                if chunks:
+                    chunks[-1][2].append(line)
+                offset += len(line)
+        return chunks
+
+
+    def reload(self, trn_id_prefix: str) -> ReloadResult:
+        """
+        Reload the file after it has been changed on disk.
+
+        Unchanged transaction sets are kept as they are.  Within changed sets,
+        Trn objects whose lines are unchanged are kept (including unsaved
+        edits); only changed lines are parsed (both detected via CRC-32).
+
+        A changed transaction with unsaved edits is matched by its CSV line
+        number and columns; its edits take precedence and a conflict is
+        reported.  Conflicts are also reported for removed transactions with
+        unsaved edits.
+
+        If the file cannot be read or parsed (e.g. as it is only partly
+        written), the exception is raised and the loaded data is unchanged.
+        """
+        file_stat = get_file_stat(self.filename)
+        chunks = self._read_set_chunks()
+
+        old_sets_by_crc: Dict[int, List[TrnsSet]] = {}
+        for trns_set in self.trns_sets:
+            old_sets_by_crc.setdefault(trns_set._crc, []).append(trns_set)
+
+        # Keep unchanged sets; the positions of their transactions are
+        # adjusted (if moved) once the changed sets are parsed.
+        line_crcs = [array('I', map(zlib.crc32, lines)) for _, _, lines in chunks]
+        new_sets: List[Optional[TrnsSet]] = []
+        moved_sets = []
+        for (line_num, offset, _), crcs in zip(chunks, line_crcs):
+            candidates = old_sets_by_crc.get(zlib.crc32(crcs))
+            if not candidates:
+                new_sets.append(None)
+                continue
+            trns_set = candidates.pop(0)
+            moved_sets.append((trns_set, line_num, offset))
+            new_sets.append(trns_set)
+
+        # Transactions of changed sets, by CRC-32 of their lines.
+        old_trns_by_crc: Dict[int, List[Trn]] = {}
+        for trns_sets in old_sets_by_crc.values():
+            for trns_set in trns_sets:
+                for trn, crc in zip(trns_set.trns, trns_set._trn_crcs):
+                    old_trns_by_crc.setdefault(crc, []).append(trn)
+
+        # Parse changed sets, re-using the transactions of unchanged lines
+        # (whose IDs and offsets are restored if parsing fails).
+        positions = [(trn, trn._id, trn._offset if isinstance(trn, LazyTrn) else None)
+                     for candidates in old_trns_by_crc.values() for trn in candidates]
+        try:
+            sets_reloaded, trns_kept, parsed_trns = self._parse_changed_sets(
+                    chunks, line_crcs, new_sets, old_trns_by_crc, trn_id_prefix)
+        except Exception:
+            for trn, trn_id, offset in positions:
+                trn._id = trn_id
+                if offset is not None:
+                    trn._offset = offset
+            raise
+
+        for trns_set, line_num, offset in moved_sets:
+            line_delta = line_num - trns_set._line_num
+            offset_delta = offset - trns_set._offset
+            if line_delta != 0:
+                for trn in trns_set.trns:
+                    trn._id = f"{trn_id_prefix}{int(trn._id[len(trn_id_prefix):]) + line_delta}"
+            if offset_delta != 0:
+                for trn in trns_set.trns:
+                    if isinstance(trn, LazyTrn):
+                        trn._offset += offset_delta
+            trns_set._line_num, trns_set._offset = line_num, offset
+        # Changed transactions with unsaved edits keep these edits.
+        modified_trns = {(trn.line_num_in_csv, tuple(trn.columns.items())): trn
+                         for candidates in old_trns_by_crc.values()
+                         for trn in candidates if trn.is_modified()}
+        conflicts = []
+        for trns_set, trn_idx in parsed_trns:
+            trn = trns_set.trns[trn_idx]
+            old_trn = modified_trns.pop((trn.line_num_in_csv, tuple(trn.columns.items())), None)
+            if old_trn is not None:
+                conflicts.append(f"{trn._id}: notes changed in file; unsaved edits kept")
+                old_trn._id = trn._id
+                trns_set.trns[trn_idx] = old_trn
+                trns_kept += 1
+        for trn in modified_trns.values():
+            conflicts.append(f"{trn._id}: removed from file; unsaved edits lost")
+
+        num_old_trns = sum(len(trns_set.trns) for trns_sets in old_sets_by_crc.values()
+                                              for trns_set in trns_sets)
+        self.trns_sets = new_sets
+        self._file_stat = file_stat
+        return ReloadResult(sets_kept=len(chunks) - sets_reloaded, sets_reloaded=sets_reloaded,
+                            trns_kept=trns_kept, trns_new=len(parsed_trns) - len(conflicts),
+                            trns_removed=num_old_trns - trns_kept, conflicts=conflicts)
+
+
+    def _parse_changed_sets(self,
+            chunks: List[Tuple[int, int, List[bytes]]],
+            line_crcs: List[array],
+            new_sets: List[Optional[TrnsSet]],
+            old_trns_by_crc: Dict[int, List[Trn]],
+            trn_id_prefix: str) -> Tuple[int, int, List[Tuple[TrnsSet, int]]]:
+        """
+        Parse the changed sets (None in new_sets) into new_sets, re-using the
+        transactions of unchanged lines (see reload()).
+
+        Return the number of parsed sets, the number of re-used transactions,
+        and the new transactions (as (set, index) tuples).
+        """
+        loads = get_codec().loads
+        sets_reloaded = 0
+        trns_kept = 0
+        parsed_trns = []
+        for idx, (line_num, offset, lines) in enumerate(chunks):
+            if new_sets[idx] is not None:
+                continue
+            dicts = {}
+            trn_crcs = array('I')
+            kept_trns = set()
+            for line_num_in_jsonl, line, crc in zip(itertools.count(line_num), lines, line_crcs[idx]):
+                stripped = line.strip()
+                candidates = old_trns_by_crc.get(crc)
+                if not stripped:
+                    pass
+                elif candidates:
+                    trn = candidates.pop()
+                    dicts[line_num_in_jsonl] = {'type': 'Trn', '_trn': trn, '_offset': offset}
+                    kept_trns.add(trn)
+                    trn_crcs.append(crc)
+                elif self.lazy and stripped.startswith(LazyTrn.LINE_START):
+                    dicts[line_num_in_jsonl] = {'type': 'Trn', '_raw': stripped, '_offset': offset}
+                    trn_crcs.append(crc)
+                else:
+                    d = dicts[line_num_in_jsonl] = loads(stripped)
+                    if d.get('type') == 'Trn':
+                        trn_crcs.append(crc)
+                offset += len(line)
+
+            part = JsonlFile(None, lazy=self.lazy, string_pool=self.string_pool)
+            part.filename = self.filename
+            part._construct_from_dicts(dicts, trn_id_prefix)
+            trns_set = part.trns_sets[0]
+            trns_set._line_num, trns_set._offset = chunks[idx][:2]
+            trns_set._crc, trns_set._trn_crcs = zlib.crc32(line_crcs[idx]), trn_crcs
+            parsed_trns += [(trns_set, trn_idx) for trn_idx, trn in enumerate(trns_set.trns)
+                                                if trn not in kept_trns]
+            trns_kept += len(kept_trns)
+            sets_reloaded += 1
+            new_sets[idx] = trns_set
+        return sets_reloaded, trns_kept, parsed_trns
+
+
     @staticmethod
     def _update(obj, d: Dict):
         # TBD:
@@ -413,9 +1117,20 @@ class JsonlFile:
                     raise ValueError("Expected type 'Trn'")
 
                 _id = f"{trn_id_prefix}{line_num_in_jsonl}"
-                trn = Trn(_id)
-                self._update(trn, d)
-                trn._check_fields()
+                if '_trn' in d:
+                    # Transaction kept when reloading.
+                    trn = d['_trn']
+                    trn._id = _id
+                    if isinstance(trn, LazyTrn):
+                        trn._offset = d['_offset']
+                elif '_raw' in d:
+                    trn = LazyTrn(_id, d['_raw'], d['_offset'])
+                else:
+                    trn = Trn(_id)
+                    self._update(trn, d)
+                    trn._check_fields()
+                    if self.string_pool is not None:
+                        self.string_pool.intern_trn(trn)
                 trns_set.trns.append(trn)
 
             else:
@@ -428,17 +1143,532 @@ class JsonlFile:
 
 
 
+class JsonlIndex:
+    """
+    Index of a JSONL file: the byte offsets of all lines and the line ranges
+    of all transaction sets.
+
+    The index is stored next to the JSONL file (filename + SUFFIX), as a JSON
+    line with meta data, followed by the offsets as array of 64-bit integers.
+    It is valid only as long as size and modification time of the JSONL file
+    do not change; otherwise it is recreated.
+    """
+
+    SUFFIX          = ".idx"
+    FORMAT_VERSION  = 1
+
+    def __init__(self, jsonl_filename: str):
+        self.jsonl_filename                     = jsonl_filename
+        self.index_filename                     = jsonl_filename + self.SUFFIX
+        self.size: int                          = None
+        self.mtime_ns: int                      = None
+        self.offsets                            = array('Q')    # per line number - 1
+        self.set_ranges: List[Tuple[int, int]]  = []            # first and last line numbers
+
+
+    def __repr__(self):
+        return f"<JsonlIndex {self.jsonl_filename}: " \
+               f"{len(self.offsets)} {plural('line', len(self.offsets))}, " \
+               f"{len(self.set_ranges)} transaction {plural('set', self.set_ranges)}>"
+
+
+    @classmethod
+    def get(cls, jsonl_filename: str) -> 'JsonlIndex':
+        """
+        Get the index of the given JSONL file: load it if it is valid, or
+        create (and store) it.
+        """
+        index = cls(jsonl_filename)
+        if not index._load():
+            with instr.timer("index"):
+                index._create()
+            index._store()
+        return index
+
+
+    def get_num_lines(self) -> int:
+        return len(self.offsets)
+
+
+    def get_line_range(self, line_num: int) -> Tuple[int, int]:
+        """
+        Get start and end offset of the given line (line numbers start at 1).
+        """
+        if not 1 <= line_num <= len(self.offsets):
+            raise IndexError(f"{self.jsonl_filename}: invalid line number {line_num}")
+        end = self.offsets[line_num] if line_num < len(self.offsets) else self.size
+        return self.offsets[line_num - 1], end
+
+
+    def find_trns_set(self, line_num: int) -> Optional[int]:
+        """
+        Get the index of the transaction set containing the given line, or None.
+        """
+        pos = bisect.bisect_right([first for first, _ in self.set_ranges], line_num) - 1
+        if pos >= 0 and line_num <= self.set_ranges[pos][1]:
+            return pos
+        return None
+
+
+    def _load(self) -> bool:
+        try:
+            st = os.stat(self.jsonl_filename)
+            with open(self.index_filename, 'rb') as fh:
+                meta = json.loads(fh.readline())
+                if meta.get('version') != self.FORMAT_VERSION \
+                        or meta.get('byteorder') != sys.byteorder \
+                        or meta.get('size') != st.st_size \
+                        or meta.get('mtime_ns') != st.st_mtime_ns:
+                    logging.debug(f"Index file {self.index_filename} is outdated.")
+                    return False
+                self.offsets.fromfile(fh, meta['num_lines'])
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            logging.debug(f"Cannot read index file {self.index_filename}: {e}")
+            self.offsets = array('Q')
+            return False
+
+        self.size = meta['size']
+        self.mtime_ns = meta['mtime_ns']
+        self.set_ranges = [tuple(rng) for rng in meta['set_ranges']]
+        return True
+
+
+    def _create(self):
+        # Get file status before reading, so that concurrent changes make the
+        # index outdated.
+        st = os.stat(self.jsonl_filename)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.offsets = array('Q')
+        self.set_ranges = []
+
+        first = None
+        last = None
+        offset = 0
+        with open(self.jsonl_filename, 'rb') as fh:
+            for line_num, line in enumerate(fh, start=1):
+                self.offsets.append(offset)
+                offset += len(line)
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                if not stripped.startswith(LazyTrn.LINE_START) \
+                        and json.loads(stripped).get('type') == 'SourceFileInfo':
+                    if first is not None:
+                        self.set_ranges.append((first, last))
+                    first = line_num
+                last = line_num
+        if first is not None:
+            self.set_ranges.append((first, last))
+
+
+    def _store(self):
+        meta = {
+            'version': self.FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'num_lines': len(self.offsets),
+            'set_ranges': self.set_ranges,
+        }
+        try:
+            with open(self.index_filename, 'wb') as fh:
+                fh.write(json.dumps(meta).encode() + b"\n")
+                self.offsets.tofile(fh)
+        except OSError as e:
+            logging.info(f"Cannot write index file {self.index_filename}: {e}")
+
+
+
+class JsonlReader:
+    """
+    Read single transactions or transaction sets from a memory-mapped JSONL
+    file, without loading the whole file (see JsonlIndex).  Compressed files
+    are not supported.
+
+    Transaction IDs are assigned as by JsonlFile.
+    """
+
+    def __init__(self, filename: str, trn_id_prefix=""):
+        if is_compressed(filename):
+            raise ValueError(f"Cannot read single transactions of compressed file {filename}")
+        self.filename       = filename
+        self.trn_id_prefix  = trn_id_prefix
+        self.index          = JsonlIndex.get(filename)
+        self._fh            = open(filename, 'rb')
+        self._mmap          = None
+        if self.index.size:
+            self._mmap = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def __repr__(self):
+        return f"<JsonlReader {self.filename}>"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._fh.close()
+
+
+    def get_num_trns_sets(self) -> int:
+        return len(self.index.set_ranges)
+
+
+    def get_line(self, line_num: int) -> bytes:
+        start, end = self.index.get_line_range(line_num)
+        return self._mmap[start:end].strip()
+
+
+    def get_trn(self, line_num: int) -> Trn:
+        """
+        Read the transaction in the given line.
+        """
+        line = self.get_line(line_num)
+        d = get_codec().loads(line) if line else {}
+        if d.get('type') != 'Trn':
+            raise ValueError(f"{self.filename} line {line_num}: no transaction")
+        del d['type']
+        trn = Trn(f"{self.trn_id_prefix}{line_num}")
+        JsonlFile._update(trn, d)
+        trn._check_fields()
+        return trn
+
+
+    def get_trns_set(self, set_idx: int) -> TrnsSet:
+        """
+        Read the transaction set with the given index.
+        """
+        first, last = self.index.set_ranges[set_idx]
+        dicts = {}
+        for line_num in range(first, last + 1):
+            line = self.get_line(line_num)
+            if line:
+                dicts[line_num] = get_codec().loads(line)
+        jsonl_file = JsonlFile(None)
+        jsonl_file._construct_from_dicts(dicts, self.trn_id_prefix)
+        return jsonl_file.trns_sets[0]
+
+
+
+def read_trns(filenames: List[str], trn_ids: List[str]) -> List[Trn]:
+    """
+    Read the transactions with the given IDs (as assigned by FinmanData) from
+    the given JSONL files, without loading the files.
+    """
+    readers = {}
+    trns = []
+    try:
+        for trn_id in trn_ids:
+            if len(filenames) == 1:
+                file_num, line_num = "1", trn_id
+            else:
+                file_num, _, line_num = trn_id.partition('-')
+            if not (file_num.isdigit() and line_num.isdigit()
+                    and 1 <= int(file_num) <= len(filenames)):
+                raise ValueError(f"Invalid transaction ID '{trn_id}'")
+
+            file_num = int(file_num)
+            if file_num not in readers:
+                readers[file_num] = JsonlReader(
+                        filenames[file_num - 1],
+                        trn_id_prefix=FinmanData.get_trn_id_prefix(file_num, len(filenames)))
+            trns.append(readers[file_num].get_trn(int(line_num)))
+    finally:
+        for reader in readers.values():
+            reader.close()
+    return trns
+
+
+
+class Rollups:
+    """
+    Aggregates of the transactions of a FinmanData object, kept up to date
+    instead of being recomputed on demand:
+
+    - The running balance within each TrnsSet, in order of dates, starting
+      with the TrnsSetHeader's value_start (or 0, if unknown).
+    - The totals per category, per month and per category and month.
+
+    All values are integer numbers of cents; the totals are [sum, count]
+    lists. The category totals are updated on category changes via
+    cat_changed() or, for many transactions at once, cats_changed().
+    """
+
+    def __init__(self, jsonl_files: List[JsonlFile] = ()):
+        self.balances: Dict[TrnsSet, List[int]]            = {}
+        self.balance_ranges: Dict[TrnsSet, Tuple[int, int]] = {}
+        self.cat_totals: Dict[str, List[int]]              = {}
+        self.month_totals: Dict[str, List[int]]            = {}
+        self.cat_month_totals: Dict[Tuple[str, str], List[int]] = {}
+
+        for jsonl_file in jsonl_files:
+            self.add_jsonl_file(jsonl_file)
+
+
+    def __repr__(self):
+        return f"<Rollups: {len(self.balances)} transaction {plural('set', self.balances)}, " \
+               f"{len(self.cat_totals)} {plural('category', self.cat_totals, 'categories')}, " \
+               f"{len(self.month_totals)} {plural('month', self.month_totals)}>"
+
+
+    @staticmethod
+    def _add(totals: Dict, key, cents: int, count: int = 1):
+        acc = totals.get(key)
+        if acc is None:
+            totals[key] = [cents, count]
+        else:
+            acc[0] += cents
+            acc[1] += count
+            if acc[1] == 0:
+                del totals[key]
+
+
+    def add_jsonl_file(self, jsonl_file: 'JsonlFile'):
+        for trns_set in jsonl_file.trns_sets:
+            self.add_trns_set(trns_set)
+
+
+    def add_trns_set(self, trns_set: TrnsSet):
+        """
+        Add the aggregates of the transactions of the given set.
+        """
+        value_start = trns_set.header.value_start
+        balance = 0 if value_start is None else value_to_cents(value_start)
+        balance_start = balance
+        order = sorted(range(len(trns_set.trns)),
+                       key=lambda idx: trns_set.trns[idx].get_field(COL_DATE) or "")
+        balances = [0] * len(trns_set.trns)
+        for idx in order:
+            trn = trns_set.trns[idx]
+            cents = trn.value_cents()
+            balance += cents
+            balances[idx] = balance
+
+            cat = trn.get_field('cat')
+            month = (trn.get_field(COL_DATE) or "")[:7]
+            self._add(self.cat_totals, cat, cents)
+            self._add(self.month_totals, month, cents)
+            self._add(self.cat_month_totals, (cat, month), cents)
+        self.balances[trns_set] = balances
+        self.balance_ranges[trns_set] = (balance_start, balance)
+
+
+    def remove_trns_set(self, trns_set: TrnsSet):
+        """
+        Remove the aggregates of the transactions of the given set.
+        """
+        for trn in trns_set.trns:
+            cents = trn.value_cents()
+            cat = trn.get_field('cat')
+            month = (trn.get_field(COL_DATE) or "")[:7]
+            self._add(self.cat_totals, cat, -cents, -1)
+            self._add(self.month_totals, month, -cents, -1)
+            self._add(self.cat_month_totals, (cat, month), -cents, -1)
+        del self.balances[trns_set]
+        del self.balance_ranges[trns_set]
+
+
+    def cat_changed(self, trn: Trn, old_cat: str):
+        """
+        Move the value of the given transaction from its old to its current
+        category.
+        """
+        cents = trn.value_cents()
+        cat = trn.get_field('cat')
+        month = (trn.get_field(COL_DATE) or "")[:7]
+        self._add(self.cat_totals, old_cat, -cents, -1)
+        self._add(self.cat_month_totals, (old_cat, month), -cents, -1)
+        self._add(self.cat_totals, cat, cents)
+        self._add(self.cat_month_totals, (cat, month), cents)
+
+
+    def cats_changed(self, changes: List[Tuple[Trn, str]]):
+        """
+        Move the values of the given transactions from their old (given with
+        each transaction) to their current categories.
+
+        The changes are summed up per old and new category and month first,
+        so that the totals are updated once per such group.
+        """
+        moves = {}      # (old category, category, month) -> [sum, count]
+        for trn, old_cat in changes:
+            key = (old_cat, trn.get_field('cat'), (trn.get_field(COL_DATE) or "")[:7])
+            acc = moves.get(key)
+            if acc is None:
+                moves[key] = [trn.value_cents(), 1]
+            else:
+                acc[0] += trn.value_cents()
+                acc[1] += 1
+
+        # Each group is moved completely, so the totals remain consistent
+        # (and emptied totals are removed) after each step.
+        for (old_cat, cat, month), (cents, count) in moves.items():
+            self._add(self.cat_totals, old_cat, -cents, -count)
+            self._add(self.cat_month_totals, (old_cat, month), -cents, -count)
+            self._add(self.cat_totals, cat, cents, count)
+            self._add(self.cat_month_totals, (cat, month), cents, count)
+
+
+    def get_balance(self, trns_set: TrnsSet) -> Tuple[int, int]:
+        """
+        Get balance at start and end of the given transaction set.
+        """
+        return self.balance_ranges[trns_set]
+
+
+    def check(self, jsonl_files: List['JsonlFile']) -> List[str]:
+        """
+        Compare the aggregates with a full recomputation.
+
+        Return a list of descriptions of all differences.
+        """
+        ref = Rollups(jsonl_files)
+        diffs = []
+        for name in ('balances', 'balance_ranges', 'cat_totals', 'month_totals', 'cat_month_totals'):
+            actual, expected = getattr(self, name), getattr(ref, name)
+            for key in set(actual).union(expected):
+                if actual.get(key) != expected.get(key):
+                    diffs.append(f"{name}[{key}]: {actual.get(key)} != {expected.get(key)}")
+        return diffs
+
+
+
 class FinmanData:
     """ TBD: add comments (also below) """
 
-    def __init__(self, filenames: Union[str, List[str]]):
+    def __init__(self, filenames: Union[str, List[str]], trace_memory=False, lazy=False,
+                 pool_strings=True, background=False, cache_entries=16, cache_trns=1_000_000,
+                 num_workers=None, parallel_min_trns=200_000):
+        """
+        If trace_memory is set, the peak memory usage during loading is
+        measured (with tracemalloc, which slows down loading).
+
+        If lazy is set, transactions are decoded only when needed (see LazyTrn).
+
+        If pool_strings is set, equal strings of the transactions are stored
+        only once (see StringPool).
+
+        If background is set, the files are loaded by a background thread;
+        the data must not be accessed before wait_loaded() has returned
+        (see is_loading()).
+
+        Selection results are cached for up to cache_entries filters, with up
+        to cache_trns transactions in total (see SelectionCache).
+
+        Filtering at least parallel_min_trns transactions with expensive
+        conditions is done by num_workers worker processes (default: number
+        of CPUs; 1: no worker processes; see Selection._scan_parallel()).
+        """
         if isinstance(filenames, str):
             filenames = filenames.split()
 
         self.filenames          = filenames
+        self.lazy               = lazy
+        self.pool_strings       = pool_strings
+        self.string_pool        = StringPool()
         self.jsonl_files        = []
-        self.load()
+        self.known_field_names  = set()
+        self._rollups: Optional[Rollups] = None    # determined on first use (see rollups)
+        self.load_memory_peak   = None
+        self.num_files_loaded   = 0
+        self.edit_seq           = 0        # incremented with each edit
+        self.selection_cache    = SelectionCache(cache_entries, cache_trns)
+        self.stats              = DataStats(self)
+        self.active_selection   = None     # Selection resolving COL_IDX (see Trn.get_idx())
+        self.num_workers        = num_workers if num_workers is not None else (os.cpu_count() or 1)
+        self.parallel_min_trns  = parallel_min_trns
+        self.autosaver          = None
+        self._load_thread       = None
+        self._load_error        = None
+        self._save_lock         = threading.Lock()
+        self._reload_errors: Dict[str, tuple] = {}  # file stat per file failed to reload
+
+        if background:
+            self._load_thread = threading.Thread(target=self._load_in_background,
+                                                 args=(trace_memory,),
+                                                 name="finman-load", daemon=True)
+            self._load_thread.start()
+        else:
+            self._load_traced(trace_memory)
+
+
+    def _load_in_background(self, trace_memory: bool):
+        try:
+            self._load_traced(trace_memory)
+        except Exception as e:
+            self._load_error = e
+
+
+    def is_loading(self) -> bool:
+        """
+        Are the files still being loaded in background?
+        """
+        return self._load_thread is not None and self._load_thread.is_alive()
+
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the files have been loaded in background (if any).
+
+        Return False if still loading after the timeout.  Exceptions during
+        loading are raised here.
+        """
+        if self._load_thread is not None:
+            self._load_thread.join(timeout)
+            if self._load_thread.is_alive():
+                return False
+        if self._load_error is not None:
+            raise self._load_error
+        return True
+
+
+    def _load_traced(self, trace_memory: bool):
+        if trace_memory:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            self._load_all()
+            self.load_memory_peak = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+        else:
+            self._load_all()
+
+
+    def _load_all(self):
+        """
+        Load JSONL files, and determine derived data.
+        """
+        with instr.timer("load"):
+            self.load()
         self.known_field_names  = self._get_field_names()
+        self.stats.collect(self.known_field_names)
+
+
+    @property
+    def rollups(self) -> Rollups:
+        """
+        Aggregates of the transactions (see Rollups), determined on first
+        access (not while loading in background), then kept up to date.
+        """
+        if self._rollups is None:
+            if self.is_loading():
+                return Rollups()
+            with instr.timer("rollups"):
+                self._rollups = Rollups(self.jsonl_files)
+        return self._rollups
 
 
     def __repr__(self):
@@ -453,27 +1683,330 @@ class FinmanData:
 
 
     def load(self):
-        if len(self.filenames) == 0:
-            self.jsonl_files = []
-        if len(self.filenames) == 1:
-            self.jsonl_files = [JsonlFile(self.filenames[0])]
+        num_files = len(self.filenames)
+        string_pool = self.string_pool if self.pool_strings else None
+        jsonl_files = []
+        self.num_files_loaded = 0
+        for idx, filename in enumerate(self.filenames, start=1):
+            jsonl_files.append(JsonlFile(filename,
+                                         trn_id_prefix=self.get_trn_id_prefix(idx, num_files),
+                                         lazy=self.lazy,
+                                         string_pool=string_pool))
+            self.num_files_loaded = idx
+        self.jsonl_files = jsonl_files
+
+        for jsonl_file in self.jsonl_files:
+            for trns_set in jsonl_file.trns_sets:
+                for trn in trns_set.trns:
+                    trn._observer = self
+
+
+    @staticmethod
+    def get_trn_id_prefix(file_num: int, num_files: int) -> str:
+        """
+        Get the prefix of the IDs of the transactions in the given file
+        (numbered from 1); the prefix is only needed for multiple files.
+        """
+        return "" if num_files == 1 else f"{file_num}-"
+
+
+    def cat_changed(self, trn: Trn, old_cat: str):
+        """
+        Update aggregates after the category of the given transaction changed.
+        """
+        if self._rollups is not None:
+            self._rollups.cat_changed(trn, old_cat)
+
+
+    def trn_modified(self, trn: Trn, old_values: Dict):
+        """
+        Record an edit of the given transaction; 'old_values' are the old
+        values of the modified fields (field name -> value).
+        """
+        self.trns_modified([trn], {field: [value] for field, value in old_values.items()})
+
+
+    def trns_modified(self, trns: List[Trn], old_values: Dict[str, List]):
+        """
+        Record an edit of the given transactions, made at once; 'old_values'
+        are the old values of the modified fields (field name -> values per
+        transaction).
+        """
+        self.edit_seq += 1
+        self.selection_cache.invalidate(set(old_values))
+        for field, values in old_values.items():
+            self.stats.update(field, trns, values)
+        if self.autosaver is not None:
+            self.autosaver.notify_edit(len(trns))
+
+
+    def set_cats(self, assignments: Iterable[Tuple[Trn, str]], cat_auto: bool = False) -> int:
+        """
+        Set the categories of many transactions, given as (transaction,
+        category) pairs, as one edit: the aggregates, the selection cache,
+        the field statistics and the autosaver are updated once.  A save in
+        progress is not waited for; transactions edited while it writes
+        remain modified (see JsonlFile.save()).
+
+        Return the number of changed transactions.
+        """
+        with instr.timer("bulk edit"):
+            trns, old_cats, old_cat_autos = [], [], []
+            for trn, cat in assignments:
+                old = trn._set_cat(cat, cat_auto)
+                if old is not None:
+                    trns.append(trn)
+                    old_cats.append(old[0])
+                    old_cat_autos.append(old[1])
+            if trns:
+                if self._rollups is not None:
+                    self._rollups.cats_changed(list(zip(trns, old_cats)))
+                self.trns_modified(trns, {'cat': old_cats, 'cat_auto': old_cat_autos})
+        instr.count("transactions edited", len(trns))
+        return len(trns)
+
+
+    def set_remarks(self, assignments: Iterable[Tuple[Trn, str]]) -> int:
+        """
+        Set the remarks of many transactions, given as (transaction, remark)
+        pairs, as one edit (see set_cats()).
+
+        Return the number of changed transactions.
+        """
+        with instr.timer("bulk edit"):
+            trns, old_remarks = [], []
+            for trn, remark in assignments:
+                old_remark = trn._set_remark(remark)
+                if old_remark is not None:
+                    trns.append(trn)
+                    old_remarks.append(old_remark)
+            if trns:
+                self.trns_modified(trns, {'remark': old_remarks})
+        instr.count("transactions edited", len(trns))
+        return len(trns)
+
+
+    def start_autosave(self, delay: float = 2.0):
+        """
+        Start saving modified files in background (see Autosaver); if already
+        started, only the delay is changed.
+        """
+        if self.autosaver is None:
+            self.autosaver = Autosaver(self, delay=delay)
         else:
-            self.jsonl_files = [JsonlFile(filename, trn_id_prefix=f"{idx}-")
-                                for idx, filename in enumerate(self.filenames, start=1)]
+            self.autosaver.delay = delay
+
+
+    def flush_autosave(self):
+        """
+        Save pending edits now, if saving in background; saving in
+        background continues.
+        """
+        if self.autosaver is not None:
+            self.autosaver.flush()
+
+
+    def stop_autosave(self, flush: bool = True):
+        """
+        Stop saving in background; pending edits are saved if 'flush' is set.
+        """
+        if self.autosaver is not None:
+            self.autosaver.stop(flush=flush)
+            self.autosaver = None
+
+
+    def is_pooled_field(self, field: str) -> bool:
+        """
+        Are the values of the given field of all transactions pooled strings
+        (if they are strings)?
+
+        Of lazily loaded transactions, only the pre-extracted fields are
+        pooled before decoding.
+        """
+        pool = self.string_pool
+        if not self.pool_strings:
+            return False
+        if field == COL_VALUE or (field in pool.note_fields and field != 'cat'):
+            return False
+        if self.lazy:
+            return field in LazyTrn.HOT_FIELDS
+        return field in pool.column_fields or field == 'cat'
+
+
+    def has_field_stats(self, field: str) -> bool:
+        """
+        May statistics and indexes of the given field be determined (see
+        DataStats)?
+
+        Not while loading in background (see is_stats_field()).
+        """
+        return not self.is_loading() and self.is_stats_field(field)
+
+
+    def is_stats_field(self, field: str) -> bool:
+        """
+        Not for fields whose values change without notification (e.g.
+        COL_IDX), and, of lazily loaded transactions, not for fields which
+        are not pre-extracted (as all transactions would be decoded).
+        """
+        if field in (COL_IDX, COL_MOD, COL_CAT_ALT):
+            return False
+        return not self.lazy or field in LazyTrn.HOT_FIELDS
 
 
-    def _get_field_names(self) -> Set[str]:
+    def _get_field_names(self, trns_sets: Optional[List[TrnsSet]] = None) -> Set[str]:
+        """
+        Get the names of all fields of all transactions (or of the
+        transactions of the given sets).
+
+        Of lazily loaded transactions which are not decoded, only the first
+        transaction of each set is considered (and decoded).
+        """
+        if trns_sets is None:
+            trns_sets = [trns_set for jsonl_file in self.jsonl_files
+                                  for trns_set in jsonl_file.trns_sets]
         s = set()
+        for trns_set in trns_sets:
+            for idx, trn in enumerate(trns_set.trns):
+                if idx == 0 or trn.is_decoded():
+                    s.update(trn.get_all_field_names())
+        return s
+
+
+    def get_memory_report(self) -> Dict:
+        """
+        Get the approximate memory usage (in bytes) of the loaded data, as
+        dict containing:
+
+        files       Per JsonlFile: total size and per TrnsSet: sizes of the
+                    transactions' object overhead, 'columns' and 'notes'
+                    fields, raw lines (of lazily loaded transactions), and of
+                    the set headers.
+        trns        Sums of the above over all transactions, and their number.
+        caches      Sizes of derived data (field ranges, rollups, ...).
+        load_peak   Peak memory during loading, if measured (else None).
+        """
+        seen = set()
+        trns_sizes = {'objects': 0, 'columns': 0, 'notes': 0, 'raw': 0, 'count': 0}
+        files = {}
         for jsonl_file in self.jsonl_files:
+            sets = []
             for trns_set in jsonl_file.trns_sets:
+                sizes = {'objects': 0, 'columns': 0, 'notes': 0, 'raw': 0}
                 for trn in trns_set.trns:
-                    s = s.union(trn.get_all_field_names())
-        return s
+                    sizes['objects'] += sys.getsizeof(trn) + sys.getsizeof(vars(trn))
+                    for key, value in vars(trn).items():
+                        if key == 'columns':
+                            sizes['columns'] += get_size(value, seen)
+                        elif key == 'notes':
+                            sizes['notes'] += get_size(value, seen)
+                        elif key in ('_raw', '_hot'):
+                            sizes['raw'] += get_size(value, seen)
+                        elif key != '_observer':
+                            sizes['objects'] += get_size(value, seen)
+                for key in ('objects', 'columns', 'notes', 'raw'):
+                    trns_sizes[key] += sizes[key]
+                trns_sizes['count'] += len(trns_set.trns)
+
+                sizes['headers'] = get_size(vars(trns_set.src), seen) + \
+                                   get_size(vars(trns_set.header), seen)
+                sizes['trns_list'] = sys.getsizeof(trns_set.trns)
+                sizes['total'] = sum(sizes.values())
+                sizes['name'] = trns_set.src.filename
+                sizes['num_trns'] = len(trns_set.trns)
+                sets.append(sizes)
+
+            files[jsonl_file.filename] = {
+                'total': sum(sizes['total'] for sizes in sets),
+                'sets': sets,
+            }
+
+        caches = {name: get_size(obj, seen)
+                  for name, obj in self._get_memory_caches().items()}
+
+        return {
+            'files': files,
+            'trns': trns_sizes,
+            'caches': caches,
+            'load_peak': self.load_memory_peak,
+        }
 
 
-    def save(self):
-        for jsonl_file in self.jsonl_files:
-            jsonl_file.save()
+    def _get_memory_caches(self) -> Dict[str, object]:
+        """
+        Get the derived data structures, for the memory report.
+        """
+        return {
+            'field ranges': [trns_set._field_ranges for jsonl_file in self.jsonl_files
+                                                    for trns_set in jsonl_file.trns_sets],
+            'rollups': vars(self._rollups) if self._rollups is not None else None,
+            'known field names': self.known_field_names,
+            'string pool': self.string_pool._strings,
+            'selection cache': self.selection_cache._entries,
+            'field statistics': self.stats._stats,
+            'field indexes': self.stats._indexes,
+            'field projections': self.stats._values,
+            'line checksums': [trns_set._trn_crcs for jsonl_file in self.jsonl_files
+                                                  for trns_set in jsonl_file.trns_sets],
+        }
+
+
+    def reload_changed(self) -> Dict[str, ReloadResult]:
+        """
+        Reload all files changed on disk incrementally (see JsonlFile.reload());
+        return the results per reloaded file.
+
+        A file failing to reload (e.g. as it is only partly written) keeps
+        its loaded data; the error is logged and reloading is retried once
+        the file changes again.
+        """
+        results = {}
+        num_files = len(self.jsonl_files)
+        for idx, jsonl_file in enumerate(self.jsonl_files, start=1):
+            if not jsonl_file.is_changed_on_disk():
+                continue
+            filename = jsonl_file.filename
+            file_stat = get_file_stat(filename)
+            if filename in self._reload_errors and self._reload_errors[filename] == file_stat:
+                continue
+            with self._save_lock, instr.timer("reload"):
+                old_sets = jsonl_file.trns_sets
+                try:
+                    results[filename] = jsonl_file.reload(self.get_trn_id_prefix(idx, num_files))
+                except Exception as e:
+                    self._reload_errors[filename] = file_stat
+                    logging.warning(f"Reloading {filename} failed: {e}; keeping the loaded data")
+                    continue
+                self._reload_errors.pop(filename, None)
+
+                rollups = self._rollups     # updated only if determined already
+                kept_sets = set(jsonl_file.trns_sets)
+                if rollups is not None:
+                    for trns_set in old_sets:
+                        if trns_set not in kept_sets:
+                            rollups.remove_trns_set(trns_set)
+                old_sets = set(old_sets)
+                new_sets = [trns_set for trns_set in jsonl_file.trns_sets if trns_set not in old_sets]
+                for trns_set in new_sets:
+                    for trn in trns_set.trns:
+                        trn._observer = self
+                    if rollups is not None:
+                        rollups.add_trns_set(trns_set)
+                self.known_field_names.update(self._get_field_names(new_sets))
+        if results:
+            self.selection_cache.clear()
+            self.stats.clear()
+            self.stats.collect(self.known_field_names)
+        return results
+
+
+    def save(self) -> int:
+        """
+        Save all modified files; return the number of saved files.  This
+        may be called concurrently by the autosave thread.
+        """
+        with self._save_lock, instr.timer("save"):
+            return sum(jsonl_file.save() for jsonl_file in self.jsonl_files)
 
 
     def expand_fieldname(self, field) -> str:
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+This module provides timers and counters, with which the Finman library
+records where the time of a command goes (e.g. filtering, sorting, formatting
+and writing output), and how much work was done.
+
+The process-wide Instrumentation object 'instr' is used by all modules.
+"""
+
+from contextlib import contextmanager
+import time
+from typing import Dict, List
+
+
+
+class Instrumentation:
+    """
+    Accumulated timers (in seconds) and counters, per phase/name.
+    """
+
+    def __init__(self):
+        self.timers: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+
+    def __repr__(self):
+        return f"<Instrumentation: {len(self.timers)} timers, {len(self.counters)} counters>"
+
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {}
+
+
+    @contextmanager
+    def timer(self, phase: str):
+        """
+        Context manager adding the time spent within to the given phase.
+        """
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - t_start)
+
+
+    def add_time(self, phase: str, seconds: float):
+        self.timers[phase] = self.timers.get(phase, 0.0) + seconds
+
+
+    def count(self, name: str, num: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + num
+
+
+    def get_report(self) -> List[str]:
+        """
+        Get the timers and counters as list of formatted lines.
+        """
+        lines = []
+        max_len = max((len(name) for name in (*self.timers, *self.counters)), default=0)
+        for phase, seconds in self.timers.items():
+            lines.append(f"{phase.ljust(max_len)}  {seconds * 1000:10.1f} ms")
+        for name, num in self.counters.items():
+            lines.append(f"{name.ljust(max_len)}  {num:10}")
+        return lines
+
+
+
+instr = Instrumentation()
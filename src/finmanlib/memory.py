@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the accounting of memory used by Finman data structures.
+
+Sizes are approximations based on sys.getsizeof(), following containers
+(dict, list, tuple, set) but not the attributes of other objects (which may
+point back to large parts of the data). Objects referenced from several
+places (e.g. shared strings) are counted only once, for the first place they
+are found at.
+"""
+
+import sys
+from typing import Optional, Set
+
+
+
+def get_size(obj, seen: Optional[Set[int]] = None) -> int:
+    """
+    Get approximate size of the given object in bytes, including all
+    contained objects not in 'seen' (a set of object IDs, which is updated).
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+def fmt_bytes(num_bytes: Optional[int]) -> str:
+    """
+    Format a number of bytes in human-readable form.
+    """
+    if num_bytes is None:
+        return "-"
+    for unit in ("B", "kB", "MB", "GB"):
+        if abs(num_bytes) < 1024 or unit == "GB":
+            break
+        num_bytes /= 1024
+    return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the evaluation of filters in worker processes, for
+scanning many transactions with expensive conditions (e.g. substrings).
+
+Workers do not get Trn objects, but projections of the transactions to the
+fields needed by the filter (one list of values per field, see
+DataStats.get_values()), and return the positions of the matching
+transactions.  Workers are started once (when first needed) and reused.
+"""
+
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from finmanlib.datafile import COL_VALUE
+
+
+
+class ProjectedTrn:
+    """
+    Stand-in for a Trn object in a worker process: the transaction at
+    position 'pos' of the projected columns.  Only the methods used for
+    matching are provided.
+
+    A single object is moved over all positions, so that no object is
+    created per transaction.
+    """
+    __slots__ = ('columns', 'pos')
+
+    def __init__(self, columns: Dict[str, List]):
+        self.columns    = columns
+        self.pos        = 0
+
+    def get_field(self, field: str, invalid_fields: Optional[set] = None):
+        column = self.columns.get(field)
+        return column[self.pos] if column is not None else None
+
+    def value_cents(self) -> int:
+        # Projected as integer number of cents (see Trn.get_comparable_field()).
+        return self.columns[COL_VALUE][self.pos]
+
+
+
+class WorkerPool:
+    """
+    Pool of worker processes (started with 'spawn', as the main process may
+    run other threads, e.g. for autosaving).
+    """
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return f"<WorkerPool: {self.num_workers} workers, " \
+               f"{'started' if self._executor is not None else 'not started'}>"
+
+
+    def map(self, func: Callable, args_list: List[tuple]) -> List:
+        """
+        Call the function with each of the argument tuples in the workers;
+        return the results in the order of the arguments.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                        self.num_workers, mp_context=multiprocessing.get_context('spawn'))
+            executor = self._executor
+        futures = [executor.submit(func, *args) for args in args_list]
+        return [future.result() for future in futures]
+
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+
+_pools: Dict[int, WorkerPool] = {}
+
+
+def get_pool(num_workers: Optional[int] = None) -> WorkerPool:
+    """
+    Get the (process-wide) pool with the given number of workers (default:
+    number of CPUs).
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    pool = _pools.get(num_workers)
+    if pool is None:
+        pool = _pools[num_workers] = WorkerPool(num_workers)
+    return pool
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+
+
+def split_range(num_items: int, num_chunks: int, min_chunk_size: int = 1) -> List[range]:
+    """
+    Split the positions 0 ... num_items - 1 into (at most) the given number of
+    consecutive ranges of about equal size.
+    """
+    num_chunks = max(1, min(num_chunks, num_items // max(1, min_chunk_size)))
+    bounds = [num_items * i // num_chunks for i in range(num_chunks + 1)]
+    return [range(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
@@ -5,14 +5,21 @@ An interactive REPL (read-eval-print loop) for Finman.
 """
 
 import code
+import cProfile
+import itertools
 import os
+import pstats
 import readline
 import sys
-from typing import Optional
+import time
+from typing import Iterable, Optional
 
 from finmanlib.categories import Categories
-from finmanlib.datafile import FinmanData
-from finmanlib.selection import Selection
+from finmanlib.datafile import FileChangedError, FinmanData, plural, value_to_cents, cents_to_str
+from finmanlib.instrument import instr
+from finmanlib.memory import fmt_bytes
+from finmanlib.selection import Selection, TrnFilter
+from finmanlib.watch import FileWatcher
 
 
 USAGE = """
@@ -21,9 +28,17 @@ Usage:
 Show transactions:
     p                       print current selection
     f <filter_str>          set filter for selection
+    explain [<filter_str>]  show how the filter (default: current one) is
+                            evaluated: plan with estimates, access path
     fields <fields_str>     set fields to be printed
     s <fields_str>          set sort order
     d <subset_str>          show details of subset of selection
+    a <group_str>           sum up values of selection, grouped by fields
+                            (e.g. 'cat:1|month'; default: 'cat')
+    bal                     show balances of all transaction sets
+    cat-totals              show totals of all transactions per category
+    month-totals            show totals of all transactions per month
+    totals-check            compare balances/totals with a full recomputation
 
 Modify transactions:
     r <subset_str>          set remarks for subset of selection
@@ -32,13 +47,32 @@ Modify transactions:
 
 Other:
     save                    save JSONL file(s)
+    autosave on|off|<sec>   save modified files in background, <sec> seconds
+                            after the last edit (default: 2)
     q                       quit if no changes unsaved
     Q                       force quit (no save)
     cat-list                list categories and conditions
     cat-reload              reload catgories file
+    reload                  reload JSONL file(s) changed on disk
+    watch on|off            reload changed files automatically
     vars                    print variables
+    mem                     print memory usage of loaded data
+    timing on|off           print timers/counters after each command
+    prof <cmd> <arg>        run command with profiler, print hot spots
     py                      interactive Python session
     ?                       help
+
+Filter strings:
+    <field><op><value>      condition; operators: = < <= > >= =~ (contains),
+                            ~/<regex>/i (i: ignore case), =lo..hi (between;
+                            for dates and values, e.g. 'val=-100..-50')
+    a|b                     a AND b
+    a,b                     a OR b (if b is a condition; other commas are
+                            part of values, e.g. 'addr=Dr. Evil, Inc.')
+    !a                      NOT a
+    (a)                     grouping (e.g. '(cat=food,cat=drinks)|!val>0')
+                            Values containing these characters otherwise are
+                            quoted (e.g. "det='a|b'").
 """
 
 # TBD: listing categories, add new category, set/modify category match string.
@@ -55,6 +89,12 @@ class FinmanREPL:
     #DEFAULT_FIELDS = "date|desc:40|value|_is_mod|cat|remark:40"
     DEFAULT_FIELDS = "date|addr:30|desc:40|value|_is_mod|cat|remark:40"
     FIELDS_CAT_DIFF = "date|addr:20|desc:20|value|_is_mod|_cat_alt|cat:20"
+    DEFAULT_GROUP_FIELDS = "cat"
+    PROF_NUM_LINES = 20
+
+    # Commands which do not access the transactions; they can be used while
+    # the files are still being loaded in background.
+    NO_DATA_CMDS = {'?', 'q', 'Q', 'cat-list', 'cat-reload', 'timing', 'vars', 'watch'}
 
     def __init__(self, args):
         if args.cat is None:
@@ -63,15 +103,39 @@ class FinmanREPL:
             self.categories = Categories(cats_file=args.cat)
 
         try:
-            self.finman_data = FinmanData(filenames=args.jsonl)
+            self.finman_data = FinmanData(filenames=args.jsonl,
+                                          trace_memory=args.trace_mem,
+                                          lazy=args.lazy,
+                                          background=args.background,
+                                          cache_entries=args.cache_entries,
+                                          num_workers=args.workers)
         except Exception as e:
             print(str(e))
             sys.exit(1)
 
+        self.timing = False
         self.sort_str = ""
         self.filter_str = ""
         self.fields_str = self.DEFAULT_FIELDS
-        self.selection = Selection(self.finman_data, filter_str="", sort_str="")
+        self.selection = None
+        if not self.finman_data.is_loading():
+            self.wait_loaded()
+        if args.autosave is not None:
+            self.finman_data.start_autosave(delay=args.autosave)
+        self.watcher = None
+        if args.watch:
+            self.set_watch("on")
+
+
+    @property
+    def selection(self) -> Optional[Selection]:
+        return self.finman_data.active_selection
+
+
+    @selection.setter
+    def selection(self, selection: Optional[Selection]):
+        # The current selection resolves field '_idx' (see Trn.get_idx()).
+        self.finman_data.active_selection = selection
 
 
     def run_repl(self):
@@ -89,7 +153,7 @@ class FinmanREPL:
             
             # Read command.
             try:
-                cmd_line = input("\n> ")
+                cmd_line = input(f"\n{self.get_prompt()}")
             except (KeyboardInterrupt, EOFError):
                 print("Enter 'q' to quit.")
                 continue
@@ -99,11 +163,15 @@ class FinmanREPL:
             if cmd_line == "" or cmd_line.startswith('#'):
                 continue
 
+            # Reload files changed meanwhile.
+            if self.watcher is not None:
+                self.reload_changed_files()
+
             # Evaluating input string.
-            cmd_parts = cmd_line.split()
-            cmd = cmd_parts[0]
-            arg = cmd_parts[1] if len(cmd_parts) >= 2 else ""
-            quit = self.run_cmd(cmd, arg)
+            cmd, arg = self.split_cmd_line(cmd_line)
+            if cmd == 'prof':
+                arg = cmd_line[len(cmd):].strip()
+            quit = self.run_cmd_timed(cmd, arg)
 
         try:
             readline.write_history_file(self.HIST_FILE)
@@ -111,28 +179,197 @@ class FinmanREPL:
             print(f"Cannot write file {self.HIST_FILE}.")
 
 
+    def get_prompt(self) -> str:
+        if self.finman_data.is_loading():
+            num_files = len(self.finman_data.filenames)
+            return f"[loading {self.finman_data.num_files_loaded}/{num_files}] > "
+        return "> "
+
+
+    def wait_loaded(self) -> bool:
+        """
+        Wait until the files have been loaded in background, and create the
+        initial selection.  Return False if waiting has been interrupted.
+        """
+        if self.finman_data.is_loading():
+            num_files = len(self.finman_data.filenames)
+            print(f"Waiting for loading ({self.finman_data.num_files_loaded}/{num_files} files) ...")
+            try:
+                self.finman_data.wait_loaded()
+            except KeyboardInterrupt:
+                print("Interrupted.")
+                return False
+        try:
+            self.finman_data.wait_loaded()
+        except Exception as e:
+            print(str(e))
+            sys.exit(1)
+
+        if self.selection is None:
+            self.selection = Selection(self.finman_data, filter_str=self.filter_str,
+                                       sort_str=self.sort_str)
+        return True
+
+
+    @staticmethod
+    def split_cmd_line(cmd_line: str):
+        """
+        Split command line into command and (first) argument.
+        """
+        cmd_parts = cmd_line.split()
+        cmd = cmd_parts[0] if len(cmd_parts) >= 1 else ""
+        arg = cmd_parts[1] if len(cmd_parts) >= 2 else ""
+        return cmd, arg
+
+
+    def run_cmd_timed(self, cmd: str, arg: str) -> Optional[bool]:
+        """
+        Run given command; if timing is switched on, print the recorded timers
+        and counters afterwards.
+        """
+        instr.reset()
+        t_start = time.perf_counter()
+        quit = self.run_cmd(cmd, arg)
+        t_total = time.perf_counter() - t_start
+
+        if self.timing:
+            print()
+            print(f"Timing of '{cmd}': {t_total * 1000:.1f} ms in total")
+            for line in instr.get_report():
+                print(f"    {line}")
+        return quit
+
+
+    def run_profiled(self, cmd_line: str) -> Optional[bool]:
+        """
+        Run given command line with the profiler; print the top hot spots.
+        """
+        cmd, arg = self.split_cmd_line(cmd_line)
+        if cmd in ("", "prof"):
+            print("Usage: prof <cmd> <arg>")
+            return None
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            quit = self.run_cmd(cmd, arg)
+        finally:
+            profiler.disable()
+
+        print()
+        stats = pstats.Stats(profiler, stream=sys.stdout)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.PROF_NUM_LINES)
+        return quit
+
+
+    def set_autosave(self, arg: str):
+        if arg == "off":
+            self.finman_data.stop_autosave()
+        elif arg != "":
+            try:
+                delay = 2.0 if arg == "on" else float(arg)
+            except ValueError:
+                print("Usage: autosave on|off|<seconds>")
+                return
+            self.finman_data.start_autosave(delay=delay)
+
+        autosaver = self.finman_data.autosaver
+        if autosaver is None:
+            print("Autosave is off.")
+            return
+        print(f"Autosave is on ({autosaver.delay:g} s after the last edit).")
+        print(f"    saves:          {autosaver.num_saves} "
+              f"({autosaver.num_files_saved} {plural('file', autosaver.num_files_saved)}, "
+              f"{autosaver.num_edits_saved} {plural('edit', autosaver.num_edits_saved)})")
+        print(f"    pending edits:  {autosaver.get_num_pending_edits()}")
+        if autosaver.last_save_time is not None:
+            print(f"    last save:      {autosaver.last_save_time * 1000:.1f} ms")
+        if autosaver.last_error is not None:
+            print(f"    last error:     {autosaver.last_error}")
+
+
+    def set_watch(self, arg: str):
+        if arg == "on" and self.watcher is None:
+            filenames = list(self.finman_data.filenames)
+            if self.categories is not None:
+                filenames.append(self.categories.cats_file)
+            self.watcher = FileWatcher(filenames)
+        elif arg == "off" and self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        print(f"Watching files is {'on' if self.watcher is not None else 'off'}.")
+
+
+    def reload_changed_files(self, filenames: Optional[Iterable[str]] = None):
+        """
+        Reload the categories and JSONL files changed on disk (by default, the
+        ones reported by the file watcher).
+        """
+        if filenames is None:
+            if self.finman_data.is_loading():
+                return      # Check again after loading.
+            filenames = self.watcher.get_changed()
+
+        if self.categories is not None and self.categories.cats_file in filenames:
+            print(f"Reloading categories file {self.categories.cats_file}.")
+            self.categories.load()
+
+        if not any(filename in self.finman_data.filenames for filename in filenames):
+            return
+        results = self.finman_data.reload_changed()
+        for filename, result in results.items():
+            print(f"Reloaded {filename}: "
+                  f"{result.sets_reloaded} of {result.sets_kept + result.sets_reloaded} "
+                  f"transaction {plural('set', result.sets_kept + result.sets_reloaded)} changed, "
+                  f"{result.trns_new} new/changed, {result.trns_removed} removed "
+                  f"{plural('transaction', result.trns_removed)}.")
+            for conflict in result.conflicts:
+                print(f"    Conflict: {conflict}")
+        if results:
+            self.selection = Selection(self.finman_data, filter_str=self.filter_str,
+                                       sort_str=self.sort_str)
+
+
+    def set_timing(self, arg: str):
+        if arg in ("on", "off"):
+            self.timing = (arg == "on")
+        print(f"Timing is {'on' if self.timing else 'off'}.")
+
+
     def run_cmd(self, cmd: str, arg: str) -> Optional[bool]:
         """
         Run given command with argument. Return True if the REPL should stop.
         """
+        if cmd not in self.NO_DATA_CMDS and not self.wait_loaded():
+            return None
+
         if cmd == '?':
             print()
             print(USAGE.strip())
 
         # Saving and quitting program.
         elif cmd == 'Q':
+            self.finman_data.stop_autosave(flush=False)
             if self.finman_data.is_modified():
                 print("Skipping unsaved changes.")
             return True
 
         elif cmd == 'q':
+            self.finman_data.flush_autosave()
             if self.finman_data.is_modified():
                 print("Unsaved changes; will not quit.")
             else:
+                self.finman_data.stop_autosave()
                 return True
 
         elif cmd == 'save':
-            self.finman_data.save()
+            try:
+                self.finman_data.save()
+            except FileChangedError as e:
+                print(f"Not saved: {e} (command 'reload').")
+
+        elif cmd == 'autosave':
+            self.set_autosave(arg)
 
         # Selection and printing.
         elif cmd == 'p':
@@ -141,9 +378,27 @@ class FinmanREPL:
         elif cmd == 'd':
             self.print_details(subset_str=arg)
 
+        elif cmd == 'a':
+            self.print_aggregation(group_str=arg)
+
+        elif cmd == 'bal':
+            self.print_balances()
+
+        elif cmd == 'cat-totals':
+            self.print_totals(self.finman_data.rollups.cat_totals)
+
+        elif cmd == 'month-totals':
+            self.print_totals(self.finman_data.rollups.month_totals)
+
+        elif cmd == 'totals-check':
+            self.check_totals()
+
         elif cmd == 'f':
             self.set_filter(filter_str=arg)
 
+        elif cmd == 'explain':
+            self.explain_filter(filter_str=arg or self.filter_str)
+
         elif cmd == 'fields':
             self.set_fields(fields_str=arg)
 
@@ -163,13 +418,29 @@ class FinmanREPL:
         elif cmd == 'cat-reload':
             self.categories.load()
 
+        elif cmd == 'reload':
+            self.reload_changed_files(self.finman_data.filenames)
+
+        elif cmd == 'watch':
+            self.set_watch(arg)
+
         elif cmd == 'cat-auto':
             self.set_categories_auto()
 
+        # Timing and profiling.
+        elif cmd == 'timing':
+            self.set_timing(arg)
+
+        elif cmd == 'prof':
+            return self.run_profiled(arg)
+
         # Python stuff.
         elif cmd == 'vars':
             self.print_variables()
 
+        elif cmd == 'mem':
+            self.print_memory()
+
         elif cmd == 'py':
             self.start_python_repl()
 
@@ -194,9 +465,58 @@ class FinmanREPL:
         """
         if subset_str == "":
             subset_str = "1-"
-        self.selection.print_trns_details(
-                fields_str=self.fields_str,
-                subset_str=subset_str)
+        self.selection.print_trns_details(subset_str=subset_str)
+
+
+    def print_aggregation(self, group_str: str):
+        """
+        Print sums of values of current selection, grouped by fields.
+        """
+        if group_str == "":
+            group_str = self.DEFAULT_GROUP_FIELDS
+        print()
+        self.selection.print_aggregation(group_str=group_str)
+
+
+    def print_balances(self):
+        """
+        Print balances at start and end of all transaction sets.
+        """
+        print()
+        rollups = self.finman_data.rollups
+        for jsonl_file in self.finman_data.jsonl_files:
+            print(f"{jsonl_file.filename}:")
+            for trns_set in jsonl_file.trns_sets:
+                start, end = rollups.get_balance(trns_set)
+                hdr = trns_set.header
+                note = ""
+                if hdr.value_end is not None and value_to_cents(hdr.value_end) != end:
+                    note = f"  (header: {hdr.value_end})"
+                print(f"    {hdr.date_start or '?':<10} - {hdr.date_end or '?':<10}  "
+                      f"{cents_to_str(start):>12} → {cents_to_str(end):>12}{note}")
+
+
+    def print_totals(self, totals: dict):
+        """
+        Print given totals (per category or month).
+        """
+        print()
+        if not totals:
+            return
+        max_len = max(len(key) for key in totals)
+        for key in sorted(totals):
+            sum_cents, count = totals[key]
+            print(f"    {(key or '-').ljust(max_len)}  {cents_to_str(sum_cents):>12}  {count:>6}")
+
+
+    def check_totals(self):
+        """
+        Compare balances and totals with a full recomputation.
+        """
+        diffs = self.finman_data.rollups.check(self.finman_data.jsonl_files)
+        for diff in diffs:
+            print(f"    {diff}")
+        print(f"{len(diffs)} {plural('difference', diffs)} found.")
 
 
     def set_filter(self, filter_str: str):
@@ -208,6 +528,16 @@ class FinmanREPL:
             print(f"Error: {e} TBD: to be checked")
 
 
+    def explain_filter(self, filter_str: str):
+        """
+        Print how the given filter is evaluated (see TrnFilter.explain()).
+        """
+        trn_filter = TrnFilter(self.finman_data, filter_str)
+        print(f"Filter: '{filter_str}'")
+        for line in trn_filter.explain(self.finman_data):
+            print(f"    {line}")
+
+
     def set_fields(self, fields_str: str):
         try:
             if fields_str == "":
@@ -233,13 +563,16 @@ class FinmanREPL:
     def set_remarks(self, subset_str: str):
         self.print_transactions(subset_str)
         print()
+        remarks = []
         for trn in self.selection.get_subset(subset_str):
             try:
-                remark = input(f"Remark for #{trn._idx}: ")
+                remark = input(f"Remark for #{self.selection.get_idx(trn)}: ")
             except KeyboardInterrupt:
                 print("... setting of remaining remarks canceled.")
+                self.finman_data.set_remarks(remarks)
                 return
-            trn.set_remark(remark)
+            remarks.append((trn, remark))
+        self.finman_data.set_remarks(remarks)
         self.print_transactions(subset_str)
 
 
@@ -270,8 +603,7 @@ class FinmanREPL:
             return
 
         # Setting new category.
-        for trn in self.selection.get_subset(subset_str):
-            trn.set_cat(new_cat, cat_auto=False)
+        self.selection.set_cat(new_cat, subset_str)
         self.print_transactions(subset_str)
 
 
@@ -342,10 +674,9 @@ class FinmanREPL:
             return
                     
         # Set categories.
-        for trn, new_cat in aa.no_prev.items():
-            trn.set_cat(new_cat, cat_auto=True)
-        for trn, new_cat in aa.prev_auto.items():
-            trn.set_cat(new_cat, cat_auto=True)
+        num_changed = self.finman_data.set_cats(
+                itertools.chain(aa.no_prev.items(), aa.prev_auto.items()), cat_auto=True)
+        print(f"Category set for {num_changed} {plural('transaction', num_changed)}.")
             
 
 
@@ -356,14 +687,48 @@ class FinmanREPL:
         print()
         print("Variables:")
         print(f"    finman_data:   {self.finman_data}")
+        if self.finman_data.is_loading():
+            print(f"                   (loading: {self.finman_data.num_files_loaded}/"
+                  f"{len(self.finman_data.filenames)} files done)")
         print(f"    selection:     {self.selection}")
         print(f"    filter_str:    '{self.filter_str}'")
         print(f"    fields_str:    '{self.fields_str}'")
         print(f"    categories:    {self.categories}")
+        print(f"    autosaver:     {self.finman_data.autosaver}")
+        print(f"    watcher:       {self.watcher}")
+        print(f"    cache:         {self.finman_data.selection_cache}")
+        print(f"    stats:         {self.finman_data.stats}")
+        print(f"    workers:       {self.finman_data.num_workers} "
+              f"(for at least {self.finman_data.parallel_min_trns} transactions)")
         print("And by the way:")
         print(f"    known fields:  {','.join(sorted(self.finman_data.known_field_names))}")
 
 
+    def print_memory(self):
+        """
+        Print approximate memory usage of the loaded data.
+        """
+        report = self.finman_data.get_memory_report()
+        print()
+        print("Memory usage (approximate):")
+        for filename, file_report in report['files'].items():
+            print(f"    {filename}: {fmt_bytes(file_report['total'])}")
+            for sizes in file_report['sets']:
+                print(f"        {sizes['name']} ({sizes['num_trns']} transactions): "
+                      f"{fmt_bytes(sizes['total'])}")
+
+        trns = report['trns']
+        print(f"    Transactions ({trns['count']}):")
+        for key in ('objects', 'columns', 'notes', 'raw'):
+            per_trn = f"{trns[key] / trns['count']:.0f} B" if trns['count'] else "-"
+            print(f"        {key + ':':<20}{fmt_bytes(trns[key]):>10}   ({per_trn} per transaction)")
+        print(f"    Caches and indexes:")
+        for name, size in report['caches'].items():
+            print(f"        {name + ':':<20}{fmt_bytes(size):>10}")
+        print(f"    Peak memory during loading: {fmt_bytes(report['load_peak'])}"
+              f"{'' if report['load_peak'] else ' (start with --trace-mem)'}")
+
+
     def start_python_repl(self):
         self.print_variables()
         print("Entering Python REPL (hit Ctrl-D to quit)...")
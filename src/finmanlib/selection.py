@@ -7,25 +7,58 @@ transactions from a FinmanData object:
 - Access/modify specific Trn objects.
 """
 
+import bisect
 from collections import namedtuple
+from collections.abc import Sequence
 import decimal
+from decimal import Decimal
 from enum import Enum
+import functools
+import itertools
 import logging
+import operator
 import os
+import re
 import sys
-from typing import List, Optional, Tuple, Callable
+from typing import List, Optional, Set, Tuple, Callable, Dict, Iterable, Iterator, Union
 
-from finmanlib.datafile import FinmanData, Trn, \
-    COL_ID, COL_IDX, COL_MOD, COL_DATE, COL_VALUE, COL_CAT_ALT 
+from finmanlib.datafile import FinmanData, Trn, TrnsSet, \
+    COL_ID, COL_IDX, COL_MOD, COL_DATE, COL_VALUE, COL_CAT_ALT, \
+    SEPARATOR_CATS, plural, cents_to_str
+from finmanlib.instrument import instr
+from finmanlib.parallel import ProjectedTrn, get_pool, split_range
+from finmanlib.stats import DataStats, FieldStats
+
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_regex(pattern: str, flags: int = 0) -> re.Pattern:
+    """
+    Compile the regular expression; compiled expressions are shared by all
+    filters (e.g. those of the categories' conditions).
+    """
+    return re.compile(pattern, flags)
 
 
 
 class Selection:
     """
     A selection of transactions.
+
+    The positions of the transactions within the selection (field '_idx',
+    COL_IDX) are determined when first needed (see get_idx()); the
+    selection set as FinmanData.active_selection resolves COL_IDX for the
+    transactions' fields and filters.
+
+    The list of transactions (trns) may be shared with the selection cache
+    and other selections; it must not be modified.
     """
     SEPARATOR_FIELDS = '|'
 
+    # Minimum estimated cost of filters for scanning in worker processes
+    # (see FilterPlan; e.g. conditions with operator 'contains').
+    PARALLEL_MIN_COST = 2.0
+
     def __init__(self, finman_data: FinmanData, filter_str="", sort_str="", trns=None):
         self.finman_data = finman_data
 
@@ -35,50 +68,182 @@ class Selection:
                     for field in sort_str.split(self.SEPARATOR_FIELDS)
                         if field != ""]
             trn_filter = TrnFilter(finman_data, filter_str)
-            self.trns = self._get_filtered_trns(finman_data, trn_filter, sort_fields)
+            self.trns = self._get_cached_trns(finman_data, trn_filter, sort_fields)
             self.filter_str = filter_str
 
-            # Enumerate filtered transactions.
-            for idx, trn in enumerate(self.trns, start=1):
-                trn._idx = str(idx)
-
         else:
             # Use set of transactions as provided by 'trn'.
             self.trns = trns
             self.filter_str = ""
 
+        # Positions of the transactions (id(trn) -> 1-based index; see get_idx()).
+        self._positions: Optional[Dict[int, int]] = None
+
 
     def __repr__(self):
         return f"<Selection '{self.filter_str}' ({len(self.trns)} transactions)>"
 
 
+    def get_idx(self, trn: Trn) -> Optional[int]:
+        """
+        Get the position (1-based) of the transaction within the selection;
+        None if not selected.
+
+        The positions of all transactions are determined on first call.
+        """
+        if self._positions is None:
+            with instr.timer("selection positions"):
+                self._positions = {id(trn): idx for idx, trn in enumerate(self.trns, start=1)}
+        return self._positions.get(id(trn))
+
+
+    def get_field(self, trn: Trn, field: str, invalid_fields: Optional[set] = None) -> str:
+        """
+        Get field of transaction by name, with COL_IDX as the position
+        within this selection (see Trn.get_field()).
+        """
+        if field == COL_IDX:
+            idx = self.get_idx(trn)
+            return str(idx) if idx is not None else Trn.INVALID_FIELD
+        return trn.get_field(field, invalid_fields)
+
+
+    @classmethod
+    def _get_cached_trns(cls, finman_data: FinmanData,
+            trn_filter: 'TrnFilter', sort_fields: List[str]) -> List[Trn]:
+        """
+        Get the filtered and sorted transactions from the selection cache of
+        the FinmanData object, or determine them (see _get_filtered_trns()).
+        A cached list is returned as is (not copied).
+        """
+        key = trn_filter.get_cache_key(sort_fields)
+        if key is None:
+            return cls._get_filtered_trns(finman_data, trn_filter, sort_fields)
+
+        trns = finman_data.selection_cache.get(key)
+        if trns is not None:
+            instr.count("selection cache hits")
+        else:
+            instr.count("selection cache misses")
+            trns = cls._get_filtered_trns(finman_data, trn_filter, sort_fields)
+            finman_data.selection_cache.put(key, trns, trn_filter.get_fields() | set(sort_fields))
+        return trns
+
+
     @staticmethod   # TBD: rename, put 'sorted' into function name?
     def _get_filtered_trns(finman_data: FinmanData,
             trn_filter: 'TrnFilter', sort_fields: List[str] = None) -> List[Trn]:
         """
         Get all transactions which match the filter conditions.
         Those conditions have been stored in trn_filter.
-
-        In each contained Trn object, their index in this selection is stored in
-        attribute '_idx' (COL_IDX).
         """
 
-        # Determine filtered transactions.
+        # Determine filtered transactions, by index lookup if selective
+        # enough; else whole transaction sets are skipped or taken if the
+        # filter allows.
         trns = []
-        for jsonl in finman_data.jsonl_files:
-            for trns_set in jsonl.trns_sets:
-                for trn in trns_set.trns:
-                    if trn_filter.match(trn):
-                        trns.append(trn)
+        num_scanned = 0
+        index_cond = trn_filter.get_index_cond()
+        index = finman_data.stats.get_index(index_cond.field) if index_cond is not None else None
+        with instr.timer("filter"):
+            if index is not None:
+                candidates = index.get(index_cond.value, [])
+                trns.extend(filter(trn_filter.match, candidates))
+                instr.count("transactions looked up", len(candidates))
+            else:
+                set_matchers = [(trns_set, *trn_filter.get_set_matcher(trns_set))
+                                for jsonl in finman_data.jsonl_files
+                                    for trns_set in jsonl.trns_sets]
+                num_scanned = sum(len(trns_set.trns) for trns_set, set_match, _ in set_matchers
+                                                     if set_match is None)
+                scanned = None
+                if Selection._is_parallel(finman_data, trn_filter, num_scanned):
+                    try:
+                        scanned = Selection._scan_parallel(finman_data, trn_filter, set_matchers)
+                    except (OSError, RuntimeError) as e:
+                        # E.g. workers could not be started; don't try again.
+                        logging.warning(f"Filtering in worker processes failed: {e}; "
+                                        f"filtering sequentially.")
+                        finman_data.num_workers = 1
+
+                for trns_set, set_match, match in set_matchers:
+                    if set_match is None:
+                        trns.extend(scanned[trns_set] if scanned is not None
+                                    else filter(match, trns_set.trns))
+                    elif set_match:
+                        trns.extend(trns_set.trns)
+                    else:
+                        instr.count("transaction sets skipped")
+        instr.count("transactions scanned", num_scanned)
 
         if sort_fields:
-            for field in reversed(sort_fields):
-                if field:
-                    trns.sort(key=lambda trn: trn.get_field(field))
+            with instr.timer("sort"):
+                for field in reversed(sort_fields):
+                    if field == COL_VALUE:
+                        trns.sort(key=lambda trn: trn.value_cents())
+                    elif field:
+                        trns.sort(key=lambda trn: trn.get_field(field))
 
         return trns
 
 
+    @classmethod
+    def _is_parallel(cls, finman_data: FinmanData, trn_filter: 'TrnFilter', num_scanned: int) -> bool:
+        """
+        Should the transactions be scanned in worker processes?  Only if
+        there are many transactions and the filter is expensive, as the
+        projections of the transactions need to be passed to the workers.
+        """
+        return finman_data.num_workers > 1 \
+               and num_scanned >= finman_data.parallel_min_trns \
+               and trn_filter.plan.cost >= cls.PARALLEL_MIN_COST \
+               and all(finman_data.has_field_stats(field) for field in trn_filter.get_fields())
+
+
+    @staticmethod
+    def _scan_parallel(finman_data: FinmanData, trn_filter: 'TrnFilter',
+            set_matchers: List[Tuple[TrnsSet, Optional[bool], Callable]]) -> Dict[TrnsSet, List[Trn]]:
+        """
+        Scan the sets not decided by get_set_matcher() in worker processes, on
+        projections of the transactions to the fields of the filter (see
+        DataStats.get_values()); return the matching transactions per set.
+        """
+        fields = sorted(trn_filter.get_fields())
+        values = {field: finman_data.stats.get_values(field) for field in fields}
+
+        # Projection of the transactions to scan, and start of their sets.
+        scan_trns = []
+        scan_sets = []
+        set_starts = []
+        columns = {field: [] for field in fields}
+        offset = 0
+        for trns_set, set_match, _ in set_matchers:
+            num_trns = len(trns_set.trns)
+            if set_match is None:
+                scan_sets.append(trns_set)
+                set_starts.append(len(scan_trns))
+                scan_trns.extend(trns_set.trns)
+                for field in fields:
+                    columns[field].extend(values[field][offset:offset + num_trns])
+            offset += num_trns
+
+        pool = get_pool(finman_data.num_workers)
+        chunks = split_range(len(scan_trns), pool.num_workers * 4, min_chunk_size=10_000)
+        expr = trn_filter.plan.get_expr()
+        with instr.timer("filter parallel"):
+            results = pool.map(_match_projected,
+                    [(expr, {field: column[chunk.start:chunk.stop] for field, column in columns.items()},
+                      len(chunk)) for chunk in chunks])
+        instr.count("transactions scanned in parallel", len(scan_trns))
+
+        matches = {trns_set: [] for trns_set in scan_sets}
+        for chunk, positions in zip(chunks, results):
+            for pos in positions:
+                pos += chunk.start
+                matches[scan_sets[bisect.bisect_right(set_starts, pos) - 1]].append(scan_trns[pos])
+        return matches
+
+
     def _eval_fields_str(self, fields_str: str) -> Tuple[List[str], List[str]]:
         """
         Evaluate a fields specification.
@@ -141,10 +306,11 @@ class Selection:
 
         # Evaluate formatting.
         trns = self.get_subset(subset_str)
-        sum_value = sum(trn.value() for trn in trns)
-        sum_str = "%+.2f" % sum_value
+        sum_str = cents_to_str(sum(trn.value_cents() for trn in trns))
         field_names, column_headings, max_widths = self._eval_fields_str(fields_str)
-        fmt = ColumnFormatter(self.trns, field_names, column_headings, max_widths, output_width)
+        with instr.timer("format widths"):
+            fmt = ColumnFormatter(trns, field_names, column_headings, max_widths, output_width,
+                                  get_field=self.get_field)
 
         # Print header.
         header = fmt.get_formatted_line(column_headings) + \
@@ -153,18 +319,20 @@ class Selection:
 
         # Print data lines.
         invalid_fields = set()
-        for trn in trns:
+        with instr.timer("output"):
+            for trn in trns:
 
-            # Determine column values. Special treatment of "modified"-flag.
-            values = []
-            for field_name in field_names:
-                value = trn.get_field(field_name, invalid_fields)
-                if field_name == COL_MOD:
-                    value = "*" if value is True else ""
-                values.append(value)
+                # Determine column values. Special treatment of "modified"-flag.
+                values = []
+                for field_name in field_names:
+                    value = self.get_field(trn, field_name, invalid_fields)
+                    if field_name == COL_MOD:
+                        value = "*" if value is True else ""
+                    values.append(value)
 
-            line = fmt.get_formatted_line(values)
-            fh.write(line)
+                line = fmt.get_formatted_line(values)
+                fh.write(line)
+        instr.count("rows rendered", len(trns))
 
         # Determine if the values of the transactions are printed.
         for col_idx, col_name in enumerate(field_names):
@@ -201,10 +369,10 @@ class Selection:
         """
         invalid_fields = set()
         for trn in self.get_subset(subset_str):
-            s = f"\n# {trn._idx}\n"
+            s = f"\n# {self.get_idx(trn)}\n"
             s += "    Top-level fields:\n"
             for field in ('_id', '_idx', '_is_modified', '_cat_alt', 'line_num_in_csv'):
-                s += f"        {field + ':':<28}{getattr(trn, field)}\n"
+                s += f"        {field + ':':<28}{self.get_field(trn, field)}\n"
             s += "    Columns:\n"
             for key, value in trn.columns.items():
                 s += f"        {key + ':':<28}'{value}'\n"
@@ -233,26 +401,121 @@ class Selection:
         fh.write(csv_sep.join(column_headings) + "\n")
 
         invalid_fields = set()
-        for trn in self.get_subset(subset_str):
-            values = [trn.get_field(field_name, invalid_fields) for field_name in field_names]
-            fh.write(csv_sep.join(values) + "\n")
+        trns = self.get_subset(subset_str)
+        with instr.timer("output"):
+            for trn in trns:
+                values = [self.get_field(trn, field_name, invalid_fields) for field_name in field_names]
+                fh.write(csv_sep.join(values) + "\n")
+        instr.count("rows rendered", len(trns))
 
 
-    def get_subset(self, subset_str: Optional[str] = None) -> List[Trn]:
+    def print_aggregation(self,
+            group_str: str,
+            subset_str=None,
+            output_width=None,
+            fh=sys.stdout):
+        """
+        Print the sum, count, minimum, maximum and average of the values of the
+        whole selection of transactions, or a subset thereof, grouped by the
+        given fields (see class Aggregation).
+
+        group_str       The fields to group by (type: str)
+        subset_str      The subset of transactions to aggregate (type: Optional[str])
+        output_width    Maximum width of formatted output (type: Optional[int])
+                        If None, the full terminal width is used.
+        fh              File handle for output
+        """
+        if output_width is None:
+            output_width = os.get_terminal_size().columns
+
+        with instr.timer("aggregation"):
+            agg = Aggregation(self.finman_data, group_str, self.get_subset(subset_str))
+        with instr.timer("output"):
+            agg.print_table(output_width, fh)
+
+
+    def set_cat(self, cat: str, subset_str: Optional[str] = None, cat_auto: bool = False) -> int:
+        """
+        Set the category of the whole selection, or a subset thereof, as one
+        edit (see FinmanData.set_cats()); return the number of changed
+        transactions.
+        """
+        return self.finman_data.set_cats(((trn, cat) for trn in self.get_subset(subset_str)),
+                                         cat_auto=cat_auto)
+
+
+    def set_remark(self, remark: str, subset_str: Optional[str] = None) -> int:
+        """
+        Set the remark of the whole selection, or a subset thereof, as one
+        edit (see FinmanData.set_remarks()); return the number of changed
+        transactions.
+        """
+        return self.finman_data.set_remarks((trn, remark) for trn in self.get_subset(subset_str))
+
+
+    def get_subset(self, subset_str: Optional[str] = None) -> 'TrnsView':
         """
-        Get a subset of the selection, as specified by subset_str.
+        Get a subset of the selection, as specified by subset_str (see
+        Ranges), as a view of the selection's transactions (not a copy).
         """
         if subset_str is None:
-            return self.trns[:]
+            return TrnsView(self.trns, [range(len(self.trns))])
         else:
-            trns = []
-            for rng in Ranges.get(subset_str, len(self.trns)):
-                rng_min, rng_max = rng
-                if rng_max == None:
-                    trns += self.trns[rng_min - 1:]
-                else:
-                    trns += self.trns[rng_min - 1:rng_max]
-            return trns
+            return TrnsView(self.trns, [range(max(rng_min, 1) - 1, rng_max)
+                                        for rng_min, rng_max in Ranges.get(subset_str, len(self.trns))])
+
+
+
+class TrnsView(Sequence):
+    """
+    Read-only view of ranges of a list of transactions, e.g. a subset of a
+    selection (see Selection.get_subset()).  The transactions are not copied,
+    but taken from the list when iterating; changes of the list are therefore
+    visible in the view.
+
+    The ranges are 0-based and exclusive (type range) and must not overlap;
+    they are clipped to the length of the list at creation.
+    """
+
+    def __init__(self, trns: List[Trn], ranges: List[range]):
+        self._trns = trns
+        self._ranges = [rng for rng in (range(rng.start, min(rng.stop, len(trns)))
+                                        for rng in ranges)
+                            if len(rng) > 0]
+
+        # Position of each range's first transaction within the view.
+        self._starts = []
+        pos = 0
+        for rng in self._ranges:
+            self._starts.append(pos)
+            pos += len(rng)
+        self._len = pos
+
+
+    def __repr__(self):
+        return f"<TrnsView ({self._len} of {len(self._trns)} transactions)>"
+
+
+    def __len__(self) -> int:
+        return self._len
+
+
+    def __iter__(self) -> Iterator[Trn]:
+        trns = self._trns
+        for rng in self._ranges:
+            yield from map(trns.__getitem__, rng if rng.stop <= len(trns)
+                                                 else range(rng.start, len(trns)))
+
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(self._len))]
+        if pos < 0:
+            pos += self._len
+        if not 0 <= pos < self._len:
+            raise IndexError("TrnsView index out of range")
+        i = bisect.bisect_right(self._starts, pos) - 1
+        return self._trns[self._ranges[i].start + pos - self._starts[i]]
 
 
 
@@ -353,6 +616,186 @@ class Ranges:
 
 
 
+class Aggregation:
+    """
+    Aggregation of the values of transactions, grouped by fields.
+
+    The group fields are given as in fields strings, separated by '|'. Besides
+    the transaction fields, these derived fields are available:
+        month           The month of the date, e.g. '2021-03'
+        year            The year of the date, e.g. '2021'
+        <field>:<n>     The first n levels of a hierarchical field, e.g. 'cat:1'
+                        for the top-level category
+
+    The values are summed up as integer numbers of cents, in one pass over the
+    transactions.
+    """
+    SEPARATOR_FIELDS = '|'
+    AGG_FIELDS = ('sum', 'count', 'min', 'max', 'avg')
+
+    DERIVED_FIELDS = {
+        'month': lambda trn: (trn.get_field(COL_DATE) or "")[:7],
+        'year':  lambda trn: (trn.get_field(COL_DATE) or "")[:4],
+    }
+
+    class Row:
+        """
+        One line of the aggregation result, providing the same field access as
+        class Trn (as needed by ColumnFormatter).
+        """
+        def __init__(self, values: Dict[str, str]):
+            self.values = values
+
+        def get_field(self, field: str, invalid_fields: Optional[set] = None) -> str:
+            return self.values[field]
+
+
+    def __init__(self, finman_data: FinmanData, group_str: str, trns: List[Trn]):
+        self.group_fields, key_funcs = self._eval_group_str(finman_data, group_str)
+        self.groups = self._aggregate(trns, key_funcs)
+
+
+    def __repr__(self):
+        return f"<Aggregation by '{self.SEPARATOR_FIELDS.join(self.group_fields)}' " \
+               f"({len(self.groups)} groups)>"
+
+
+    @classmethod
+    def _eval_group_str(cls,
+            finman_data: FinmanData,
+            group_str: str) -> Tuple[List[str], List[Callable]]:
+        """
+        Evaluate a group fields specification.
+
+        Return the group field names and a key function for each of them.
+        """
+        group_fields = []
+        key_funcs = []
+        for field in group_str.split(cls.SEPARATOR_FIELDS):
+            field = field.strip()
+            if field == "":
+                continue
+
+            # Derived fields.
+            if field in cls.DERIVED_FIELDS:
+                group_fields.append(field)
+                key_funcs.append(cls.DERIVED_FIELDS[field])
+                continue
+
+            # Determine number of hierarchy levels, if given in string.
+            levels = None
+            if (pos := field.find(':')) >= 0:
+                try:
+                    levels = int(field[pos + 1:])
+                except ValueError:
+                    logging.warning(f"Invalid number of levels in '{field}'; ignoring.")
+                field = field[:pos]
+
+            field_name = finman_data.expand_fieldname(field)
+            if field_name == "":
+                logging.warning(f"No expansion for field '{field}'; ignoring.")
+                continue
+
+            if levels is None:
+                group_fields.append(field_name)
+                key_funcs.append(lambda trn, f=field_name: trn.get_field(f))
+            else:
+                group_fields.append(f"{field_name}:{levels}")
+                key_funcs.append(lambda trn, f=field_name, n=levels:
+                        SEPARATOR_CATS.join(str(trn.get_field(f)).split(SEPARATOR_CATS)[:n]))
+
+        return group_fields, key_funcs
+
+
+    @staticmethod
+    def _aggregate(trns: List[Trn], key_funcs: List[Callable]) -> Dict[tuple, List[int]]:
+        """
+        Aggregate the values of the given transactions by hashing their group
+        keys.
+
+        Return a dict mapping group keys to [sum, count, min, max] in cents.
+        """
+        groups = {}
+        for trn in trns:
+            key = tuple(key_func(trn) for key_func in key_funcs)
+            cents = trn.value_cents()
+            acc = groups.get(key)
+            if acc is None:
+                groups[key] = [cents, 1, cents, cents]
+            else:
+                acc[0] += cents
+                acc[1] += 1
+                if cents < acc[2]:
+                    acc[2] = cents
+                elif cents > acc[3]:
+                    acc[3] = cents
+        return groups
+
+
+    @staticmethod
+    def get_average(sum_cents: int, count: int) -> Decimal:
+        """
+        Get exact average value (rounded to cents) of a group.
+        """
+        return (Decimal(sum_cents) / count / 100).quantize(Decimal("0.01"))
+
+
+    def get_rows(self) -> List['Aggregation.Row']:
+        """
+        Get the aggregation result as sorted list of rows, the last one
+        containing the totals.
+        """
+        rows = []
+        for key in sorted(self.groups, key=lambda key: tuple(str(k) for k in key)):
+            sum_cents, count, min_cents, max_cents = self.groups[key]
+            values = {field: ("" if k is None else str(k))
+                      for field, k in zip(self.group_fields, key)}
+            values['sum'] = cents_to_str(sum_cents)
+            values['count'] = str(count)
+            values['min'] = cents_to_str(min_cents)
+            values['max'] = cents_to_str(max_cents)
+            values['avg'] = "%+.2f" % self.get_average(sum_cents, count)
+            rows.append(self.Row(values))
+
+        # Totals.
+        values = {field: "" for field in self.group_fields}
+        if self.groups:
+            sum_cents = sum(acc[0] for acc in self.groups.values())
+            count = sum(acc[1] for acc in self.groups.values())
+            values['sum'] = cents_to_str(sum_cents)
+            values['count'] = str(count)
+            values['min'] = cents_to_str(min(acc[2] for acc in self.groups.values()))
+            values['max'] = cents_to_str(max(acc[3] for acc in self.groups.values()))
+            values['avg'] = "%+.2f" % self.get_average(sum_cents, count)
+        else:
+            values.update({field: "" for field in self.AGG_FIELDS})
+            values['count'] = "0"
+        rows.append(self.Row(values))
+
+        return rows
+
+
+    def print_table(self, output_width=None, fh=sys.stdout):
+        """
+        Print the aggregation result in table format.
+        """
+        field_names = self.group_fields + list(self.AGG_FIELDS)
+        rows = self.get_rows()
+        fmt = ColumnFormatter(rows, field_names, field_names, [None] * len(field_names),
+                              output_width, right_aligned=self.AGG_FIELDS)
+
+        fh.write(fmt.get_formatted_line(field_names) +
+                 fmt.get_separator_line())
+        for row in rows[:-1]:
+            fh.write(fmt.get_formatted_line([row.get_field(f) for f in field_names]))
+
+        totals = [rows[-1].get_field(f) for f in field_names]
+        totals[0] = totals[0] or "Σ"
+        fh.write(fmt.get_separator_line() +
+                 fmt.get_formatted_line(totals))
+
+
+
 class ColumnFormatter:
     """
     Provide formatted tabular output of values.
@@ -361,38 +804,50 @@ class ColumnFormatter:
     ColumnFormat = namedtuple('ColumnFormat', 'width left_aligned')
 
     def __init__(self,
-            trns: List[Trn],
+            trns: Iterable[Trn],
             field_names: List[str],
             column_headings: List[str],
             max_widths: List[int],
-            output_width: Optional[int] = None):
+            output_width: Optional[int] = None,
+            right_aligned=(COL_VALUE, COL_IDX),
+            get_field: Optional[Callable] = None):
         self.output_width = output_width
-        self.col_fmts = self._get_formats(trns, field_names, column_headings, max_widths)
+        self.col_fmts = self._get_formats(trns, field_names, column_headings, max_widths,
+                                          right_aligned, get_field)
 
 
     @classmethod
     def _get_formats(cls,
-            trns: List[Trn],
+            trns: Iterable[Trn],
             field_names: List[str],
             column_headings: List[str],
-            max_widths: List[int]) -> List[ColumnFormat]:
+            max_widths: List[int],
+            right_aligned=(COL_VALUE, COL_IDX),
+            get_field: Optional[Callable] = None) -> List[ColumnFormat]:
         """
         Get format (width, alignment) for all columns.
+
+        The columns of the fields given in right_aligned are right-aligned.
+        The values are determined by get_field(trn, field, invalid_fields), if
+        given, else by trn.get_field(field, invalid_fields).
         """
         col_fmts = []
         invalid_fields = set()
 
         for field_name, column_heading, max_width in zip(field_names, column_headings, max_widths):
 
-            # Loop over all data lines.
-            values = [column_heading] + [trn.get_field(field_name, invalid_fields) for trn in trns]
-            lengths = [(1 if type(value) is bool else len(value)) for value in values]
+            # Loop over all data lines (without collecting the values).
+            if get_field is None:
+                values = (trn.get_field(field_name, invalid_fields) for trn in trns)
+            else:
+                values = (get_field(trn, field_name, invalid_fields) for trn in trns)
+            values = itertools.chain((column_heading,), values)
+            width = max((1 if type(value) is bool else len(value)) for value in values)
 
             # Create ColumnFormat object.
-            width = max(lengths)
             if max_width is not None:
                 width = min(width, max_width)
-            left_aligned = not (field_name in (COL_VALUE, COL_IDX))
+            left_aligned = not (field_name in right_aligned)
             col_fmts.append(cls.ColumnFormat(width, left_aligned))
 
         return col_fmts
@@ -431,133 +886,910 @@ class ColumnFormatter:
 
 
 
+# Parsed filter expressions (see TrnFilter); defined at module level, so that
+# they can be passed to worker processes (see _match_projected()).
+FilterCond = namedtuple('FilterCond', 'field op value')
+FilterExpr = namedtuple('FilterExpr', 'op operands')   # op: 'and', 'or', 'not'
+
+
+
 class TrnFilter:
     """
     A filter which determines whether a given transaction matches certain
     conditions.
+
+    Conditions (e.g. 'date>=2021-01-01', 'details=~rent', 'desc~/^rent\\b/i',
+    'value=-100..-50'; see _get_filter_cond()) are combined by the operators
+    (in order of increasing precedence):
+
+        a,b     OR
+        a|b     AND
+        !a      NOT
+        (a)     grouping
+
+    A comma is the operator OR only if a condition on a known field follows
+    (e.g. 'addr=Dr. Evil, Inc.' is a single condition).  Values containing
+    these characters otherwise are to be quoted (e.g. "det='a|b'").
+
+    The filter string is parsed once into an expression tree (FilterExpr
+    nodes with FilterCond leaves), which is compiled into a FilterPlan: a
+    function per node, with the operands of AND/OR ordered so that cheap and
+    selective conditions are evaluated first (see FilterPlan).
     """
     SEPARATOR_COND   = '|'
+    SEPARATOR_OR     = ','
+    PREFIX_NOT       = '!'
+    SEPARATOR_RANGE  = '..'
+
+    # Operators of conditions; at the same position, the longest one wins.
+    OPERATORS_RE     = re.compile(r'<=|>=|=~|<|>|=|~')
+
+    # Start of a condition (after NOT and parentheses), with its field name.
+    COND_START_RE    = re.compile(r'[\s!(]*(\w+)\s*(?:<=|>=|=~|<|>|=|~)')
+    REGEX_FLAGS      = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+
+    # Fields with numerical values or dates (i.e. fields for which the
+    # operators <, >, etc. make sense).
+    ORDERED_FIELDS   = {COL_ID, COL_IDX, COL_DATE, COL_VALUE}
 
-    FilterCond = namedtuple('FilterCond', 'field op value')
+    FilterCond = FilterCond
+    FilterExpr = FilterExpr
 
-    def __init__(self, finman_data, filter_str=""):
-        self.filter_conds = self._get_filter_conds(finman_data, filter_str)
+    # Fields whose values change without notification of the FinmanData
+    # object (e.g. when saving); selections depending on them are not cached.
+    UNCACHEABLE_FIELDS = {COL_IDX, COL_MOD, COL_CAT_ALT}
+
+    def __init__(self, finman_data, filter_str="", expr=None):
+        """
+        The filter is given as filter string, or as parsed expression (see
+        _parse(); None matches all transactions, False none).
+        """
+        if expr is None:
+            expr = self._parse(finman_data, filter_str)
+        self.expr = expr
+        self.filter_conds = self._get_leaves(expr)
+        self.plan = FilterPlan.compile(self._prepare(finman_data, expr), finman_data.stats)
+        self.match = self.plan.func
+
+
+    def __repr__(self):
+        return f"<TrnFilter {self.plan}>"
 
 
     @classmethod
-    def _get_filter_conds(cls,
-            finman_data: FinmanData,
-            filter_str="") -> List[FilterCond]:
-        """
-        Get the filter conditions from given string.
-        """
-        operators = ('<=', '>=', '<', '>', '=~', '=')
-
-        filter_conds = []
-        for cond_str in filter_str.split(cls.SEPARATOR_COND):
-            if cond_str == "":
-                continue    # Ignoring empty conditions.
-
-            for op in operators:
-
-                # Split condition in field/operator/value.
-                p = cond_str.find(op)
-                if p < 0:
-                    # Not the correct operator.
-                    continue
-                field, value = cond_str[:p], cond_str[p + len(op):]
-                field = field.strip()
-                value = value.strip()
-
-                # Check for empty fields.
-                if field == "":
-                    logging.warning(f"No field in condition '{cond_str}'; ignoring.")
-                    break
-                if value == "":
-                    logging.warning(f"No value in condition '{cond_str}'; ignoring.")
-                    break
-
-                # Expand field name.
-                field_exp = finman_data.expand_fieldname(field)
-                if field_exp == "":
-                    logging.warning(f"No expansion for field '{field}'; ignoring.")
-                    break
-                field = field_exp
-
-                # Unquote value.
-                if len(value) >= 2:
-                    if (value[0] == '"' and value[-1] == '"') or \
-                       (value[0] == "'" and value[-1] == "'"):
-                        value = value[1:-1]
-
-                # In case of "contains" operator: prepare for case-insensitive comparison.
-                if op == '=~':
-                    op = "contains"
-                    value = value.upper()
-
-                # The text operator 'contains' does not make much sense on numerical values...
-                if op == "contains":
-                    if field in (COL_ID, COL_IDX, COL_VALUE):
-                        logging.warning(f"Invalid condition: operator '{op}' and field '{field}'; ignoring.")
-                        break
-
-                # while the numeric operators do not make much sense on text values.
-                else:
-                    if field not in (COL_ID, COL_IDX, COL_DATE, COL_VALUE):
-                        logging.info(f"Unusual condition: operator '{op}' and field '{field}'.")
+    def any_of(cls, finman_data, filter_strs: List[str]) -> 'TrnFilter':
+        """
+        Create a filter matching the transactions which match any of the
+        given filter strings.
+        """
+        exprs = [cls._parse(finman_data, filter_str) for filter_str in filter_strs]
+        if not exprs:
+            return cls(finman_data, expr=False)
+        if None in exprs:
+            return cls(finman_data, expr=None)
+        return cls(finman_data, expr=cls._make_expr('or', exprs))
 
-                # Some fields do not contain text but numbers.
-                if field in (COL_ID, COL_IDX):
-                    value = int(value)
-                elif field == COL_VALUE:
-                    value = decimal.Decimal(value)
 
-                # Valid condition; store it.
-                filter_conds.append(cls.FilterCond(field, op, value))
-                break
+    def can_match(self) -> bool:
+        """
+        Can any transaction match the conditions?
+
+        This is determined on creation of the filter (see _get_pooled_cond()).
+        """
+        return self.plan.const is not False
+
+
+    def get_fields(self) -> Set[str]:
+        """
+        Get the fields the conditions depend on.
+        """
+        return {fc.field for fc in self.filter_conds}
+
+
+    def get_cache_key(self, sort_fields: List[str]) -> Optional[tuple]:
+        """
+        Get the key of the selection by this filter and the given sort fields
+        in the selection cache: the normalized expression (operands of AND/OR
+        without duplicates, in a fixed order) and the sort fields.  Return
+        None if the selection must not be cached.
+        """
+        if not self.UNCACHEABLE_FIELDS.isdisjoint(self.get_fields()) \
+                or not self.UNCACHEABLE_FIELDS.isdisjoint(sort_fields):
+            return None
+        return (self._normalize(self.expr), tuple(sort_fields))
+
+
+    @classmethod
+    def _normalize(cls, expr):
+        if isinstance(expr, cls.FilterExpr):
+            operands = {cls._normalize(operand) for operand in expr.operands}
+            return cls.FilterExpr(expr.op, tuple(sorted(operands, key=repr)))
+        return expr
+
+
+    @classmethod
+    def _get_leaves(cls, expr) -> List[FilterCond]:
+        if expr is None or isinstance(expr, bool):
+            return []
+        elif isinstance(expr, cls.FilterExpr):
+            return [fc for operand in expr.operands for fc in cls._get_leaves(operand)]
+        return [expr]
+
+
+    @classmethod
+    def _make_expr(cls, op: str, operands: list):
+        """
+        Create an expression node; ignored operands (None) are left out,
+        and nested nodes of the same operator are merged.
+        """
+        if op == 'not':
+            operand = operands[0]
+            if operand is None:
+                return None
+            if isinstance(operand, cls.FilterExpr) and operand.op == 'not':
+                return operand.operands[0]
+            return cls.FilterExpr('not', (operand,))
+
+        merged = []
+        for operand in operands:
+            if isinstance(operand, cls.FilterExpr) and operand.op == op:
+                merged.extend(operand.operands)
+            elif operand is not None:
+                merged.append(operand)
+        if len(merged) == 0:
+            return None
+        if len(merged) == 1:
+            return merged[0]
+        return cls.FilterExpr(op, tuple(merged))
 
+
+    @classmethod
+    def _tokenize(cls, filter_str: str,
+                  is_field: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, str]]:
+        """
+        Split a filter string into tokens: ('op', <operator or parenthesis>)
+        and ('cond', <condition string>).
+
+        A comma is an operator only if a condition follows whose field name
+        is accepted by 'is_field' (if given); else it is part of the value.
+
+        Parentheses are operators only at the start of a condition, or when
+        closing a group; balanced parentheses within a condition are part of
+        it.  A quote directly after the operator of a condition (and spaces)
+        extends to the matching quote, if any; so does a regular expression
+        '/.../' after the operator '~' (with '\\/' for a literal slash).
+        """
+        tokens = []
+        cond = []
+        cond_parens = 0
+        quote = None
+        escaped = False
+
+        def finish_cond():
+            nonlocal cond, cond_parens
+            cond_str = "".join(cond).strip()
+            if cond_str:
+                tokens.append(('cond', cond_str))
+            cond = []
+            cond_parens = 0
+
+        for pos, c in enumerate(filter_str):
+            at_start = "".join(cond).strip() == ""
+            if quote is not None:
+                cond.append(c)
+                if escaped:
+                    escaped = False
+                elif c == '\\' and quote == '/':
+                    escaped = True
+                elif c == quote:
+                    quote = None
+            elif c in ('"', "'") and "".join(cond).rstrip()[-1:] in ('=', '<', '>', '~') \
+                    and filter_str.find(c, pos + 1) >= 0:
+                quote = c
+                cond.append(c)
+            elif c == '/' and "".join(cond).rstrip()[-1:] == '~' \
+                    and filter_str.find(c, pos + 1) >= 0:
+                quote = c
+                cond.append(c)
+            elif c == cls.SEPARATOR_COND or c == cls.SEPARATOR_OR \
+                    and cls._is_cond_start(filter_str, pos + 1, is_field):
+                finish_cond()
+                tokens.append(('op', c))
+            elif c in ('(', cls.PREFIX_NOT) and at_start:
+                cond = []
+                tokens.append(('op', c))
+            elif c == '(':
+                cond_parens += 1
+                cond.append(c)
+            elif c == ')' and cond_parens > 0:
+                cond_parens -= 1
+                cond.append(c)
+            elif c == ')':
+                finish_cond()
+                tokens.append(('op', c))
             else:
-                logging.warning(f"No valid operator in condition '{cond_str}'; ignoring.")
+                cond.append(c)
+        finish_cond()
+        return tokens
 
-        return filter_conds
+
+    @classmethod
+    def _is_cond_start(cls, filter_str: str, pos: int,
+                       is_field: Optional[Callable[[str], bool]]) -> bool:
+        """
+        Does a condition (on a field accepted by 'is_field', if given) start
+        at the given position of the filter string?
+        """
+        m = cls.COND_START_RE.match(filter_str, pos)
+        return m is not None and (is_field is None or is_field(m.group(1)))
 
 
-    def match(self, trn: Trn) -> bool:
+    @classmethod
+    def _parse(cls, finman_data: FinmanData, filter_str: str):
         """
-        Check if given transaction matches the conditions.
+        Parse a filter string into an expression: a FilterExpr, a FilterCond,
+        or None if there are no (valid) conditions.  Invalid conditions are
+        ignored (with a warning).
+        """
+        if finman_data is not None:
+            # Without the warnings of FinmanData.expand_fieldname().
+            is_field = lambda field: any(name.startswith(field)
+                                         for name in finman_data.known_field_names)
+        else:
+            is_field = None
+        tokens = cls._tokenize(filter_str, is_field)
+        pos = 0
+
+        def peek() -> Optional[Tuple[str, str]]:
+            return tokens[pos] if pos < len(tokens) else None
+
+        def parse_or():
+            nonlocal pos
+            operands = [parse_and()]
+            while peek() == ('op', cls.SEPARATOR_OR):
+                pos += 1
+                operands.append(parse_and())
+            return cls._make_expr('or', operands)
+
+        def parse_and():
+            nonlocal pos
+            operands = [parse_unary()]
+            while peek() == ('op', cls.SEPARATOR_COND):
+                pos += 1
+                operands.append(parse_unary())
+            return cls._make_expr('and', operands)
+
+        def parse_unary():
+            nonlocal pos
+            token = peek()
+            if token == ('op', cls.PREFIX_NOT):
+                pos += 1
+                return cls._make_expr('not', [parse_unary()])
+            elif token == ('op', '('):
+                pos += 1
+                expr = parse_or()
+                if peek() == ('op', ')'):
+                    pos += 1
+                else:
+                    logging.warning(f"Missing ')' in filter '{filter_str}'.")
+                return expr
+            elif token is not None and token[0] == 'cond':
+                pos += 1
+                return cls._get_filter_cond(finman_data, token[1])
+            return None     # Empty operand; ignored.
+
+        expr = parse_or()
+        while pos < len(tokens):
+            logging.warning(f"Unexpected '{tokens[pos][1]}' in filter '{filter_str}'; ignoring.")
+            pos += 1
+            expr = cls._make_expr('and', [expr, parse_or()])
+        return expr
+
 
-        Return False on any failed condition; or True otherwise.
+    @classmethod
+    def _get_filter_cond(cls, finman_data: FinmanData, cond_str: str) -> Optional[FilterCond]:
+        """
+        Get the filter condition from given string; None if invalid.
+
+        The operator is the first one found in the string (so that values
+        may contain operator characters, e.g. 'details=a<b').  Operators:
+
+            = < <= > >=     comparison
+            =~              contains (case-insensitive)
+            ~/.../i         matches regular expression (flag i: ignore
+                            case; also m, s, x: see module re)
+            =lo..hi         between lo and hi, inclusive (for numerical
+                            fields and dates; lo or hi may be omitted)
+        """
+        m = cls.OPERATORS_RE.search(cond_str)
+        if m is None:
+            logging.warning(f"No valid operator in condition '{cond_str}'; ignoring.")
+            return None
+
+        # Split condition in field/operator/value.
+        op = m.group()
+        field, value = cond_str[:m.start()], cond_str[m.end():]
+        field = field.strip()
+        value = value.strip()
+
+        # Check for empty fields.
+        if field == "":
+            logging.warning(f"No field in condition '{cond_str}'; ignoring.")
+            return None
+        if value == "":
+            logging.warning(f"No value in condition '{cond_str}'; ignoring.")
+            return None
+
+        # Expand field name.
+        field_exp = finman_data.expand_fieldname(field)
+        if field_exp == "":
+            logging.warning(f"No expansion for field '{field}'; ignoring.")
+            return None
+        field = field_exp
+
+        # Unquote value.
+        if len(value) >= 2:
+            if (value[0] == '"' and value[-1] == '"') or \
+               (value[0] == "'" and value[-1] == "'"):
+                value = value[1:-1]
+
+        # In case of "contains" operator: prepare for case-insensitive comparison.
+        if op == '=~':
+            op = "contains"
+            value = value.upper()
+
+        # Between operator: only on numerical fields and dates (for which
+        # '..' cannot be part of a value); a missing bound is a comparison.
+        elif op == '=' and field in cls.ORDERED_FIELDS and cls.SEPARATOR_RANGE in value:
+            lo, hi = (bound.strip() for bound in value.split(cls.SEPARATOR_RANGE, 1))
+            if lo == "" and hi == "":
+                logging.warning(f"No bounds in condition '{cond_str}'; ignoring.")
+                return None
+            try:
+                lo = cls._get_field_value(field, lo) if lo != "" else None
+                hi = cls._get_field_value(field, hi) if hi != "" else None
+            except (ValueError, decimal.InvalidOperation):
+                logging.warning(f"Invalid bounds in condition '{cond_str}'; ignoring.")
+                return None
+            if hi is None:
+                return cls.FilterCond(field, '>=', lo)
+            elif lo is None:
+                return cls.FilterCond(field, '<=', hi)
+            return cls.FilterCond(field, 'between', (lo, hi))
+
+        elif op == '~':
+            op = "regex"
+            try:
+                value = cls._get_regex(value)
+            except (ValueError, re.error) as e:
+                logging.warning(f"Invalid regular expression in condition '{cond_str}': {e}; ignoring.")
+                return None
+
+        # The text operators do not make much sense on numerical values...
+        if op in ("contains", "regex"):
+            if field in (COL_ID, COL_IDX, COL_VALUE):
+                logging.warning(f"Invalid condition: operator '{op}' and field '{field}'; ignoring.")
+                return None
+
+        # while the numeric operators do not make much sense on text values.
+        else:
+            if field not in cls.ORDERED_FIELDS:
+                logging.info(f"Unusual condition: operator '{op}' and field '{field}'.")
+            try:
+                value = cls._get_field_value(field, value)
+            except (ValueError, decimal.InvalidOperation):
+                logging.warning(f"Invalid value in condition '{cond_str}'; ignoring.")
+                return None
+
+        # Valid condition.
+        return cls.FilterCond(field, op, value)
+
+
+    @staticmethod
+    def _get_field_value(field: str, value: str):
+        """
+        Convert the value for comparisons: some fields do not contain text
+        but numbers.
+        """
+        if field in (COL_ID, COL_IDX):
+            return int(value)
+        elif field == COL_VALUE:
+            return decimal.Decimal(value)
+        return value
+
+
+    @classmethod
+    def _get_regex(cls, value: str) -> re.Pattern:
+        """
+        Get the compiled regular expression given as '/pattern/flags' (or as
+        plain pattern, without flags).
+        """
+        flags = 0
+        if len(value) >= 2 and value[0] == '/':
+            p = value.rfind('/')
+            if p == 0:
+                raise ValueError("missing closing '/'")
+            value, flag_chars = value[1:p], value[p + 1:]
+            for flag_char in flag_chars.lower():
+                if flag_char not in cls.REGEX_FLAGS:
+                    raise ValueError(f"unknown flag '{flag_char}'")
+                flags |= cls.REGEX_FLAGS[flag_char]
+            value = value.replace('\\/', '/')
+        return compile_regex(value, flags)
+
+
+    @classmethod
+    def _prepare(cls, finman_data: FinmanData, expr):
+        """
+        Get the expression in the form used for matching (see
+        _get_comparable_cond() and _get_pooled_cond()); conditions which no
+        transaction can match are replaced by False.
+        """
+        if isinstance(expr, cls.FilterExpr):
+            return cls.FilterExpr(expr.op, tuple(cls._prepare(finman_data, operand)
+                                                 for operand in expr.operands))
+        elif expr is None or isinstance(expr, bool):
+            return expr
+        return cls._get_pooled_cond(finman_data, cls._get_comparable_cond(expr))
+
+
+    @classmethod
+    def _get_comparable_cond(cls, fc: FilterCond) -> FilterCond:
+        """
+        Get the condition in the form used for matching: values of field
+        COL_VALUE are compared as cents (see Trn.value_cents()).
+        """
+        if fc.field == COL_VALUE:
+            if fc.op == 'between':
+                return cls.FilterCond(fc.field, fc.op, tuple(map(cls._get_cents, fc.value)))
+            return cls.FilterCond(fc.field, fc.op, cls._get_cents(fc.value))
+        return fc
+
+
+    @staticmethod
+    def _get_cents(value: Decimal):
+        cents = value * 100
+        if cents == cents.to_integral_value():
+            cents = int(cents)
+        return cents
+
+
+    @classmethod
+    def _get_pooled_cond(cls, finman_data: FinmanData, fc: FilterCond) -> Union[FilterCond, bool]:
+        """
+        Get the condition with the value replaced by the equal pooled string
+        (see StringPool) for '=' conditions on pooled fields, so that most
+        comparisons are identity checks.  If there is no such pooled string,
+        no transaction can match (False).
+        """
+        if fc.op == '=' and type(fc.value) is str and finman_data.is_pooled_field(fc.field):
+            value = finman_data.string_pool.get(fc.value)
+            if value is None:
+                return False
+            return cls.FilterCond(fc.field, fc.op, value)
+        return fc
+
+
+    def get_index_cond(self) -> Optional[FilterCond]:
+        """
+        Get the condition by which the matching transactions are to be looked
+        up in an index (see DataStats.get_index()), instead of scanning all
+        transactions; None if scanning is expected to be cheaper.
+        """
+        return self.plan.get_index_cond()
+
+
+    def explain(self, finman_data: FinmanData) -> List[str]:
+        """
+        Describe how matching transactions are determined: the plan with its
+        estimates, and the access path (index lookup, or scan of the sets
+        not decided by the ranges of field values).
         """
+        num_trns = sum(len(trns_set.trns) for jsonl_file in finman_data.jsonl_files
+                                          for trns_set in jsonl_file.trns_sets)
+        lines = ["Plan (estimated selectivity, cost per transaction):"]
+        lines += self.plan.explain(num_trns, indent=1)
+
+        index_cond = self.get_index_cond()
+        if index_cond is not None:
+            state = "existing" if finman_data.stats.has_index(index_cond.field) else "to be built"
+            lines.append(f"Access: index lookup ({state}): {FilterPlan.cond_to_str(index_cond)}")
+            return lines
+
+        num_sets = {True: 0, False: 0, None: 0}
+        num_scanned = 0
+        for jsonl_file in finman_data.jsonl_files:
+            for trns_set in jsonl_file.trns_sets:
+                set_match = self.match_set(trns_set)
+                num_sets[set_match] += 1
+                if set_match is None:
+                    num_scanned += len(trns_set.trns)
+        lines.append(f"Access: scan of {num_scanned} of {num_trns} "
+                     f"{plural('transaction', num_trns)}; "
+                     f"transaction sets: {num_sets[None]} scanned, {num_sets[True]} taken, "
+                     f"{num_sets[False]} skipped")
+        return lines
+
+
+    def match_set(self, trns_set: TrnsSet) -> Optional[bool]:
+        """
+        Check if the transactions of the given set match the conditions, based
+        on the ranges of field values within the set.
+
+        Return False if no transaction can match, True if all transactions
+        match, or None if the transactions need to be checked one by one.
+        """
+        return self.plan.match_set(trns_set)[0]
+
+
+    def get_set_matcher(self, trns_set: TrnsSet) -> Tuple[Optional[bool], Callable[[Trn], bool]]:
+        """
+        Like match_set(), but additionally return the function matching the
+        single transactions of the set; conditions already decided for the
+        whole set are left out.
+        """
+        return self.plan.match_set(trns_set)
+
+
+
+class FilterPlan:
+    """
+    A compiled filter expression (see TrnFilter).
+
+    Each node has a function matching single transactions, and estimates of
+    its cost (per transaction, relative to a simple comparison) and of its
+    selectivity (fraction of matching transactions).  The operands of AND
+    nodes are ordered by ascending cost / (1 - selectivity), those of OR
+    nodes by ascending cost / selectivity, so that evaluation is
+    short-circuited as early and cheaply as possible.
+
+    The estimates of conditions are based on the statistics of the field
+    values (see FieldStats), if available, else on fixed values per
+    operator.
+
+    Constant nodes (const True or False) result from conditions which no
+    transaction can match.
+    """
+
+    # Estimated cost and selectivity per operator of conditions.
+    COND_COSTS = {'=': 1.0, '<': 1.2, '<=': 1.2, '>': 1.2, '>=': 1.2, 'between': 1.4,
+                  'contains': 3.0, 'regex': 5.0}
+    COND_SELECTIVITIES = {'=': 0.1, '<': 0.5, '<=': 0.5, '>': 0.5, '>=': 0.5, 'between': 0.25,
+                          'contains': 0.2, 'regex': 0.2}
+
+    COMPARISONS = {'=': operator.eq, '<': operator.lt, '<=': operator.le,
+                   '>': operator.gt, '>=': operator.ge}
+
+    # Length of strings for which the cost of the text operators applies;
+    # the cost increases with the average length of the field values.
+    COST_STR_LEN = 32
+
+    # Maximum estimated selectivity of '=' conditions for index lookups.
+    INDEX_MAX_SELECTIVITY = 0.05
+
+    def __init__(self, op: str, func: Callable[[Trn], bool], cost: float, selectivity: float,
+                 operands: Tuple['FilterPlan', ...] = (), cond=None, const: Optional[bool] = None):
+        self.op             = op        # 'and', 'or', 'not', 'cond', 'const'
+        self.func           = func
+        self.cost           = cost
+        self.selectivity    = selectivity
+        self.operands       = operands
+        self.cond           = cond
+        self.const          = const
+
+
+    def __repr__(self):
+        if self.op == 'cond':
+            return self.cond_to_str(self.cond)
+        elif self.op == 'const':
+            return str(self.const)
+        elif self.op == 'not':
+            return f"NOT {self.operands[0]}"
+        return "(" + f" {self.op.upper()} ".join(map(repr, self.operands)) + ")"
+
+
+    @staticmethod
+    def cond_to_str(fc: TrnFilter.FilterCond) -> str:
+        if fc.op == 'regex':
+            flags = "".join(flag_char for flag_char, flag in TrnFilter.REGEX_FLAGS.items()
+                                if fc.value.flags & flag)
+            return f"{fc.field} regex /{fc.value.pattern}/{flags}"
+        return f"{fc.field} {fc.op} {fc.value!r}"
+
+
+    def explain(self, num_trns: int, indent: int = 0) -> List[str]:
+        """
+        Describe the plan: one line per node, with its estimates.
+        """
+        if self.op == 'cond':
+            desc = self.cond_to_str(self.cond)
+        elif self.op == 'const':
+            desc = str(self.const)
+        else:
+            desc = self.op.upper()
+        lines = [f"{'    ' * indent + desc:<56} {self.selectivity:7.2%} "
+                 f"(~{round(self.selectivity * num_trns)}) {self.cost:7.2f}"]
+        for operand in self.operands:
+            lines += operand.explain(num_trns, indent + 1)
+        return lines
+
+
+    @classmethod
+    def compile(cls, expr, stats: Optional['DataStats'] = None, keep_order=False) -> 'FilterPlan':
+        """
+        Compile a (prepared) expression; None matches all transactions.
+        The estimates of conditions are based on the given statistics, if any.
+
+        If keep_order is set, operands are evaluated in the given order (e.g.
+        of an expression from get_expr()).
+        """
+        if expr is None or expr is True:
+            return cls.make_const(True)
+        elif expr is False:
+            return cls.make_const(False)
+        elif isinstance(expr, FilterCond):
+            return cls.make_cond(expr, stats.get(expr.field) if stats is not None else None)
+        return cls.make_node(expr.op, [cls.compile(operand, stats, keep_order)
+                                       for operand in expr.operands], keep_order)
+
+
+    def get_expr(self):
+        """
+        Get the (prepared) expression of the plan, with the operands in the
+        order of evaluation.
+        """
+        if self.op == 'const':
+            return self.const
+        elif self.op == 'cond':
+            return self.cond
+        return FilterExpr(self.op, tuple(operand.get_expr() for operand in self.operands))
+
+
+    @classmethod
+    def make_const(cls, const: bool) -> 'FilterPlan':
+        return cls('const', (lambda trn: True) if const else (lambda trn: False),
+                   0.0, 1.0 if const else 0.0, const=const)
+
+
+    @classmethod
+    def make_cond(cls, fc: TrnFilter.FilterCond, field_stats: Optional['FieldStats'] = None) -> 'FilterPlan':
+        field, op, value = fc
         invalid_fields = set()
-        for fc in self.filter_conds:
+        if op == 'contains':
+            def func(trn):
+                return value in (trn.get_field(field, invalid_fields) or "").upper()
+        elif op == 'regex':
+            search = value.search
+            def func(trn):
+                return search(trn.get_field(field, invalid_fields) or "") is not None
+        elif field == COL_IDX:
+            # Positions within the active selection (see Trn.get_idx()).
+            if op == 'between':
+                lo, hi = value
+                def func(trn):
+                    idx = trn.get_idx()
+                    return idx is not None and lo <= idx <= hi
+            else:
+                cmp = cls.COMPARISONS[op]
+                def func(trn):
+                    idx = trn.get_idx()
+                    return idx is not None and cmp(idx, value)
+        elif op == 'between':
+            lo, hi = value
+            if field == COL_VALUE:
+                def func(trn):
+                    return lo <= trn.value_cents() <= hi
+            else:
+                def func(trn):
+                    value = trn.get_field(field, invalid_fields)
+                    return value is not None and lo <= value <= hi
+        elif field == COL_VALUE:
+            # Column COL_VALUE contains decimal numbers, compared as cents.
+            cmp = cls.COMPARISONS[op]
+            def func(trn):
+                return cmp(trn.value_cents(), value)
+        else:
+            cmp = cls.COMPARISONS[op]
+            def func(trn):
+                return cmp(trn.get_field(field, invalid_fields), value)
+        return cls('cond', func, *cls._estimate(fc, field_stats), cond=fc)
+
 
-            if fc.op == 'contains':
-                # Search for sub-string.
-                value = trn.get_field(fc.field, invalid_fields).upper()
-                if not (value.find(fc.value) >= 0):
-                    return False
+    @classmethod
+    def _estimate(cls, fc: TrnFilter.FilterCond,
+                  field_stats: Optional['FieldStats']) -> Tuple[float, float]:
+        """
+        Estimate cost and selectivity of the condition.
+        """
+        field, op, value = fc
+        cost, selectivity = cls.COND_COSTS[op], cls.COND_SELECTIVITIES[op]
+        if field_stats is None:
+            return cost, selectivity
+
+        if op == '=':
+            estimate = field_stats.estimate_eq(value)
+        elif op in ('<', '<='):
+            estimate = field_stats.estimate_range(hi=value, hi_incl=(op == '<='))
+        elif op in ('>', '>='):
+            estimate = field_stats.estimate_range(lo=value, lo_incl=(op == '>='))
+        elif op == 'between':
+            estimate = field_stats.estimate_range(*value)
+        else:
+            if op == 'contains':
+                match = lambda v: type(v) is str and value in v.upper()
             else:
-                value = trn.get_field(fc.field, invalid_fields)
-                if fc.field == COL_VALUE:
-                    # Column COL_VALUE contains decimal numbers.
-                    value = decimal.Decimal(value)
+                match = lambda v: type(v) is str and value.search(v) is not None
+            estimate = field_stats.estimate_sample(match)
+            cost *= max(1.0, field_stats.avg_len / cls.COST_STR_LEN)
 
-                if fc.op == '<':
-                    if not (value < fc.value):
-                        return False
-                elif fc.op == '<=':
-                    if not (value <= fc.value):
-                        return False
-                elif fc.op == '>':
-                    if not (value > fc.value):
-                        return False
-                elif fc.op == '>=':
-                    if not (value >= fc.value):
-                        return False
-                elif fc.op == '=':
-                    if not (value == fc.value):
+        if estimate is not None:
+            selectivity = estimate
+        return cost, selectivity
+
+
+    def get_index_cond(self) -> Optional[TrnFilter.FilterCond]:
+        """
+        Get the most selective '=' condition which all matching transactions
+        fulfill (the plan itself, or an operand of AND), if selective enough
+        for an index lookup (see TrnFilter.get_index_cond()).
+        """
+        if self.op == 'cond':
+            candidates = [self]
+        elif self.op == 'and':
+            candidates = [operand for operand in self.operands if operand.op == 'cond']
+        else:
+            return None
+        candidates = [plan for plan in candidates
+                          if plan.cond.op == '=' and plan.selectivity <= self.INDEX_MAX_SELECTIVITY]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda plan: plan.selectivity).cond
+
+
+    @classmethod
+    def make_node(cls, op: str, operands: List['FilterPlan'], keep_order=False) -> 'FilterPlan':
+        """
+        Create a node with given operands; constant operands are folded.
+        """
+        if op == 'not':
+            operand = operands[0]
+            if operand.const is not None:
+                return cls.make_const(not operand.const)
+            func = operand.func
+            return cls('not', lambda trn: not func(trn), operand.cost, 1.0 - operand.selectivity,
+                       operands=(operand,))
+
+        # The constant deciding the node (e.g. False for AND), and the neutral one.
+        deciding = (op == 'or')
+        if any(operand.const is deciding for operand in operands):
+            return cls.make_const(deciding)
+        operands = [operand for operand in operands if operand.const is None]
+        if not operands:
+            return cls.make_const(not deciding)
+        if len(operands) == 1:
+            return operands[0]
+
+        # Order operands; accumulate expected cost and selectivity.
+        if not keep_order:
+            if op == 'and':
+                operands.sort(key=lambda p: p.cost / max(1.0 - p.selectivity, 1e-6))
+            else:
+                operands.sort(key=lambda p: p.cost / max(p.selectivity, 1e-6))
+        cost = 0.0
+        p_continue = 1.0    # probability that evaluation reaches the operand
+        for operand in operands:
+            cost += p_continue * operand.cost
+            p_continue *= operand.selectivity if op == 'and' else 1.0 - operand.selectivity
+        selectivity = p_continue if op == 'and' else 1.0 - p_continue
+
+        return cls(op, cls._combine(op, [operand.func for operand in operands]),
+                   cost, selectivity, operands=tuple(operands))
+
+
+    @staticmethod
+    def _combine(op: str, funcs: List[Callable[[Trn], bool]]) -> Callable[[Trn], bool]:
+        if len(funcs) == 2:
+            f1, f2 = funcs
+            if op == 'and':
+                return lambda trn: f1(trn) and f2(trn)
+            return lambda trn: f1(trn) or f2(trn)
+
+        funcs = tuple(funcs)
+        if op == 'and':
+            def func(trn):
+                for f in funcs:
+                    if not f(trn):
                         return False
-                else:
-                    assert False, f"Invalid comparison operator '{op}'."
+                return True
+        else:
+            def func(trn):
+                for f in funcs:
+                    if f(trn):
+                        return True
+                return False
+        return func
+
 
-        return True
+    def match_set(self, trns_set: TrnsSet) -> Tuple[Optional[bool], Callable[[Trn], bool]]:
+        """
+        Check if the transactions of the given set match, based on the ranges
+        of field values within the set (see TrnFilter.match_set()); return
+        the result and the function matching single transactions of the set.
+        """
+        if self.op == 'const':
+            return self.const, self.func
+        elif self.op == 'cond':
+            return self._match_set_cond(trns_set), self.func
+        elif self.op == 'not':
+            result, func = self.operands[0].match_set(trns_set)
+            if result is not None:
+                return not result, self.func
+            return None, self.func if func is self.operands[0].func else (lambda trn: not func(trn))
+
+        deciding = (self.op == 'or')
+        funcs = []
+        changed = False
+        for operand in self.operands:
+            result, func = operand.match_set(trns_set)
+            if result is deciding:
+                return deciding, self.func
+            if result is None:
+                funcs.append(func)
+                changed |= func is not operand.func
+            else:
+                changed = True
+        if not funcs:
+            return not deciding, self.func
+        if not changed:
+            return None, self.func
+        if len(funcs) == 1:
+            return None, funcs[0]
+        return None, self._combine(self.op, funcs)
+
+
+    def _match_set_cond(self, trns_set: TrnsSet) -> Optional[bool]:
+        fc = self.cond
+        rng = trns_set.get_field_range(fc.field)
+        if rng is None or fc.op in ('contains', 'regex') or rng.count != len(trns_set.trns):
+            return None
+        lo, hi = rng.min, rng.max
+
+        if fc.op == '<':
+            none_match, all_match = lo >= fc.value, hi < fc.value
+        elif fc.op == '<=':
+            none_match, all_match = lo > fc.value, hi <= fc.value
+        elif fc.op == '>':
+            none_match, all_match = hi <= fc.value, lo > fc.value
+        elif fc.op == '>=':
+            none_match, all_match = hi < fc.value, lo >= fc.value
+        elif fc.op == '=':
+            none_match = fc.value < lo or fc.value > hi
+            all_match = lo == hi == fc.value
+        elif fc.op == 'between':
+            none_match = hi < fc.value[0] or lo > fc.value[1]
+            all_match = fc.value[0] <= lo and hi <= fc.value[1]
+        else:
+            none_match, all_match = False, False
+
+        if none_match:
+            return False
+        if all_match:
+            return True
+        return None
+
+
+
+def _match_projected(expr, columns: Dict[str, List], num_trns: int) -> List[int]:
+    """
+    Match projected transactions (see ProjectedTrn) against the expression
+    (see FilterPlan.get_expr()) in a worker process; return the positions of
+    the matching transactions.
+    """
+    match = FilterPlan.compile(expr, keep_order=True).func
+    trn = ProjectedTrn(columns)
+    positions = []
+    for pos in range(num_trns):
+        trn.pos = pos
+        if match(trn):
+            positions.append(pos)
+    return positions
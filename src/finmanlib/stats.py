@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+"""
+This module provides statistics of the values of the transactions' fields,
+used for estimating the selectivity of filter conditions (see FilterPlan),
+indexes of field values for looking up transactions by value, and
+projections of the transactions to single fields (e.g. for passing them to
+worker processes, see Selection._scan_parallel()).
+
+Statistics are determined from a sample of the transactions while loading
+(see DataStats.collect()); indexes and projections per field when first
+needed (one pass over all transactions).  All are updated with the changed
+values when transactions are edited (see FinmanData.trns_modified()), and
+dropped when files are reloaded.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import logging
+from typing import Callable, Dict, Hashable, List, Optional
+
+from finmanlib.instrument import instr
+
+
+
+class FieldStats:
+    """
+    Statistics of the values of a field over all transactions:
+    - number of transactions, and of those containing the field,
+    - number of distinct values, and the most common values with their counts,
+    - boundaries of (approximately) equally populated buckets of the sorted
+      values (equi-depth histogram),
+    - a sample of the values (for conditions that cannot be estimated from
+      the above, e.g. substrings),
+    - average length of string values.
+
+    The statistics are determined from a systematic sample of the
+    transactions (every n-th one, see DataStats.get()), as projecting and
+    sorting all values would be expensive; counts are scaled to all
+    transactions, so they are estimates unless all transactions are
+    sampled.
+
+    On edits, the counts are updated (see update()); histogram and sample
+    are kept, as they are estimates anyway.
+    """
+    NUM_MCV     = 16
+    NUM_BUCKETS = 64
+    SAMPLE_SIZE = 256
+    HISTOGRAM_SAMPLE_SIZE = 8192
+
+    def __init__(self, field: str, values: List, num_trns: int, step: int = 1):
+        """
+        'values' are the values of the field of every step-th transaction
+        (None if missing); values other than strings and integers are not
+        considered.
+        """
+        values = [value for value in values if type(value) in (str, int)]
+        self.field          = field
+        self.num_trns       = num_trns
+        self.count          = len(values) * step
+
+        counts = Counter(values)
+        if step > 1:
+            counts = Counter({value: count * step for value, count in counts.items()})
+        self._counts        = counts
+        self.num_distinct   = len(counts)
+        self.mcv: Dict[Hashable, int] = dict(counts.most_common(self.NUM_MCV))
+
+        try:
+            values = sorted(values[::max(1, len(values) // self.HISTOGRAM_SAMPLE_SIZE)])
+        except TypeError:
+            values = None       # Values not comparable (mixed types).
+        if values:
+            step = len(values) / self.NUM_BUCKETS
+            self.bounds = [values[min(int(i * step), len(values) - 1)]
+                           for i in range(self.NUM_BUCKETS)] + [values[-1]]
+            self.sample = values[::max(1, len(values) // self.SAMPLE_SIZE)]
+        else:
+            self.bounds = []
+            self.sample = []
+
+        str_lens = [len(value) for value in self.sample if type(value) is str]
+        self.avg_len = sum(str_lens) / len(str_lens) if str_lens else 0.0
+
+
+    def __repr__(self):
+        return f"<FieldStats '{self.field}': {self.count}/{self.num_trns} transactions, " \
+               f"{self.num_distinct} distinct values>"
+
+
+    def update(self, deltas: Dict[Hashable, int]):
+        """
+        Update the counts by the given changes of the numbers of
+        transactions per value (e.g. after categories were edited).
+
+        A value becomes one of the most common values if its count exceeds
+        the smallest of these; a value dropping out of them is not replaced
+        (so they are only approximately the most common ones).
+        """
+        counts = self._counts
+        mcv = self.mcv
+        for value, delta in deltas.items():
+            if delta == 0 or type(value) not in (str, int):
+                continue
+            self.count += delta
+            count = counts[value] + delta
+            if count > 0:
+                counts[value] = count
+            else:
+                counts.pop(value, None)
+
+            if value in mcv:
+                if count > 0:
+                    mcv[value] = count
+                else:
+                    del mcv[value]
+            elif count > 0:
+                if len(mcv) >= self.NUM_MCV:
+                    min_value = min(mcv, key=mcv.get)
+                    if count <= mcv[min_value]:
+                        continue
+                    del mcv[min_value]
+                mcv[value] = count
+        self.num_distinct = len(counts)
+
+
+    def estimate_eq(self, value) -> float:
+        """
+        Estimate the fraction of transactions whose field equals the value:
+        exact for the most common values, else the remaining transactions
+        are assumed to be distributed equally over the remaining values.
+        """
+        if self.num_trns == 0:
+            return 0.0
+        if value in self.mcv:
+            return self.mcv[value] / self.num_trns
+        num_rest = self.num_distinct - len(self.mcv)
+        if num_rest <= 0:
+            return 0.0
+        return (self.count - sum(self.mcv.values())) / num_rest / self.num_trns
+
+
+    def estimate_range(self, lo=None, hi=None, lo_incl=True, hi_incl=True) -> Optional[float]:
+        """
+        Estimate the fraction of transactions whose field is within the
+        given range (None: unbounded), from the histogram; None if the
+        values cannot be compared.
+        """
+        if self.num_trns == 0 or not self.bounds:
+            return 0.0
+        try:
+            lo_pos = 0.0 if lo is None else self._get_position(lo, lo_incl)
+            hi_pos = 1.0 if hi is None else self._get_position(hi, not hi_incl)
+        except TypeError:
+            return None
+        return max(0.0, hi_pos - lo_pos) * self.count / self.num_trns
+
+
+    def _get_position(self, value, left: bool) -> float:
+        """
+        Get the fraction of the values less than (left: less than or equal
+        to) the given value.
+        """
+        bounds = self.bounds
+        pos = bisect_left(bounds, value) if left else bisect_right(bounds, value)
+        if pos == 0:
+            return 0.0
+        if pos == len(bounds):
+            return 1.0
+        # Within bucket pos - 1; half of the bucket is assumed.
+        return (pos - 0.5) / (len(bounds) - 1)
+
+
+    def estimate_sample(self, match: Callable) -> float:
+        """
+        Estimate the fraction of transactions whose field value matches the
+        given function, from the sample of values.
+        """
+        if not self.sample:
+            return 0.0
+        num_matches = sum(1 for value in self.sample if match(value))
+        # At least half a match, as the sample is small.
+        return max(num_matches, 0.5) / len(self.sample) * self.count / self.num_trns
+
+
+
+class DataStats:
+    """
+    Field statistics (see FieldStats), indexes and projections of the
+    transactions of a FinmanData object, for the fields allowed by
+    FinmanData.has_field_stats().
+
+    Values are those used for comparisons (see Trn.get_comparable_field()).
+    """
+    SAMPLE_SIZE = FieldStats.HISTOGRAM_SAMPLE_SIZE      # transactions sampled for statistics
+
+    def __init__(self, finman_data: 'FinmanData'):
+        self.finman_data    = finman_data
+        self._stats: Dict[str, FieldStats] = {}
+        self._indexes: Dict[str, Dict[Hashable, List['Trn']]] = {}
+        self._values: Dict[str, List] = {}
+        self._positions: Optional[Dict[int, int]] = None    # id(trn) -> position in scan
+
+
+    def __repr__(self):
+        return f"<DataStats: statistics of {len(self._stats)} fields, " \
+               f"{len(self._indexes)} indexes, {len(self._values)} projections>"
+
+
+    def get(self, field: str) -> Optional[FieldStats]:
+        """
+        Get the statistics of the given field (determined now if not
+        collected while loading); None if not available.
+        """
+        stats = self._stats.get(field)
+        if stats is None and self.finman_data.has_field_stats(field):
+            stats = self._determine(field)
+        return stats
+
+
+    def collect(self, fields):
+        """
+        Determine the statistics of the given fields (as far as allowed),
+        while loading or after reloading (see FinmanData._load_all()).
+        """
+        trns = self._get_all_trns()
+        for field in fields:
+            if field not in self._stats and self.finman_data.is_stats_field(field):
+                self._determine(field, trns)
+
+
+    def _determine(self, field: str, trns: Optional[List['Trn']] = None) -> FieldStats:
+        """
+        Determine the statistics of the given field from a systematic sample
+        of the transactions (see FieldStats).
+        """
+        if trns is None:
+            trns = self._get_all_trns()
+        with instr.timer("field stats"):
+            step = max(1, len(trns) // self.SAMPLE_SIZE)
+            invalid_fields = set()      # no repeated log messages
+            values = [trn.get_comparable_field(field, invalid_fields) for trn in trns[::step]]
+            stats = FieldStats(field, values, len(trns), step)
+        self._stats[field] = stats
+        logging.debug(f"Statistics determined: {stats}")
+        return stats
+
+
+    def get_values(self, field: str) -> Optional[List]:
+        """
+        Get the projection of all transactions to the given field: the values
+        of the field, in the order of the files and sets (i.e. of a scan);
+        None if not available.
+        """
+        values = self._values.get(field)
+        if values is None and self.finman_data.has_field_stats(field):
+            with instr.timer("field projection"):
+                invalid_fields = set()      # no repeated log messages
+                values = [trn.get_comparable_field(field, invalid_fields)
+                          for trn in self._get_all_trns()]
+            self._values[field] = values
+        return values
+
+
+    def get_index(self, field: str) -> Optional[Dict[Hashable, List['Trn']]]:
+        """
+        Get the index of the given field: the transactions per value, in the
+        order of the files and sets (i.e. of a scan); None if not available.
+        """
+        index = self._indexes.get(field)
+        if index is None and self.finman_data.has_field_stats(field):
+            values = self._values.get(field)    # The projection is not kept for the index.
+            with instr.timer("field index"):
+                trns = self._get_all_trns()
+                if values is None:
+                    invalid_fields = set()
+                    values = [trn.get_comparable_field(field, invalid_fields) for trn in trns]
+                index = {}
+                for trn, value in zip(trns, values):
+                    if type(value) in (str, int):
+                        index.setdefault(value, []).append(trn)
+            self._indexes[field] = index
+        return index
+
+
+    def has_index(self, field: str) -> bool:
+        return field in self._indexes
+
+
+    def update(self, field: str, trns: List['Trn'], old_values: List):
+        """
+        Update statistics, index and projection of the given field (as far
+        as determined) after the given transactions were edited; 'old_values'
+        are their values of the field before.
+        """
+        if field not in self._stats and field not in self._indexes and field not in self._values:
+            return
+
+        # Net changes per transaction (a transaction may be edited repeatedly).
+        old_by_trn = {}
+        for trn, old_value in zip(trns, old_values):
+            old_by_trn.setdefault(id(trn), (trn, old_value))
+        changes = []
+        for trn, old_value in old_by_trn.values():
+            new_value = trn.get_comparable_field(field)
+            if new_value != old_value:
+                changes.append((trn, old_value, new_value))
+        if not changes:
+            return
+
+        # Positions only for index and projection (one pass over all transactions).
+        positions = None
+        if field in self._indexes or field in self._values:
+            positions = self._get_positions()
+            if any(id(trn) not in positions for trn, _, _ in changes):
+                self.invalidate((field,))       # Not part of the data (anymore).
+                return
+
+        with instr.timer("field stats update"):
+            stats = self._stats.get(field)
+            if stats is not None:
+                deltas = Counter()
+                for _, old_value, new_value in changes:
+                    deltas[old_value] -= 1
+                    deltas[new_value] += 1
+                stats.update(deltas)
+
+            index = self._indexes.get(field)
+            if index is not None:
+                removed: Dict[Hashable, set] = {}
+                added: Dict[Hashable, List['Trn']] = {}
+                for trn, old_value, new_value in changes:
+                    if type(old_value) in (str, int):
+                        removed.setdefault(old_value, set()).add(id(trn))
+                    if type(new_value) in (str, int):
+                        added.setdefault(new_value, []).append(trn)
+                for value, trn_ids in removed.items():
+                    trns_left = [trn for trn in index.get(value, ()) if id(trn) not in trn_ids]
+                    if trns_left:
+                        index[value] = trns_left
+                    else:
+                        index.pop(value, None)
+                for value, trns_added in added.items():
+                    index[value] = sorted(index.get(value, []) + trns_added,
+                                          key=lambda trn: positions[id(trn)])
+
+            values = self._values.get(field)
+            if values is not None:
+                for trn, _, new_value in changes:
+                    values[positions[id(trn)]] = new_value
+
+
+    def invalidate(self, fields):
+        """
+        Drop statistics, indexes and projections of the given (modified)
+        fields.
+        """
+        for field in fields:
+            self._stats.pop(field, None)
+            self._indexes.pop(field, None)
+            self._values.pop(field, None)
+
+
+    def clear(self):
+        self._stats.clear()
+        self._indexes.clear()
+        self._values.clear()
+        self._positions = None
+
+
+    def _get_positions(self) -> Dict[int, int]:
+        """
+        Get the positions of all transactions in the order of a scan (see
+        get_values()), determined on first call.
+        """
+        if self._positions is None:
+            self._positions = {id(trn): pos for pos, trn in enumerate(self._get_all_trns())}
+        return self._positions
+
+
+    def _get_all_trns(self) -> List['Trn']:
+        return [trn for jsonl_file in self.finman_data.jsonl_files
+                    for trns_set in jsonl_file.trns_sets
+                        for trn in trns_set.trns]
+
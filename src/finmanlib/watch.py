@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""
+This module provides the detection of changes of files (e.g. JSONL files or
+categories files edited by hand while Finman is running).
+
+Files are polled in a background thread; a change is detected via the
+modification time and the size of a file.
+"""
+
+import os
+import threading
+from typing import List, Optional, Set, Tuple
+
+
+
+def get_file_stat(filename: str) -> Optional[Tuple[int, int]]:
+    """
+    Get modification time (in ns) and size of the given file; None if it does
+    not exist.
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+
+class FileWatcher:
+    """
+    Polls the given files every 'interval' seconds in a background thread.
+
+    The names of changed files are collected, and handed out with
+    get_changed(), so that the changes can be processed where convenient
+    (e.g. between two commands of the REPL).
+    """
+
+    def __init__(self, filenames: List[str], interval: float = 1.0):
+        self.interval   = interval
+        self._stats     = {filename: get_file_stat(filename) for filename in filenames}
+        self._changed: Set[str] = set()
+        self._lock      = threading.Lock()
+        self._stop      = threading.Event()
+        self._thread    = threading.Thread(target=self._run, name="finman-watch", daemon=True)
+        self._thread.start()
+
+
+    def __repr__(self):
+        return f"<FileWatcher: {len(self._stats)} {'file' if len(self._stats) == 1 else 'files'}, " \
+               f"interval {self.interval:g} s>"
+
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+    def poll(self):
+        """
+        Check all files for changes.
+        """
+        for filename, stat in self._stats.items():
+            current = get_file_stat(filename)
+            if current != stat:
+                self._stats[filename] = current
+                with self._lock:
+                    self._changed.add(filename)
+
+
+    def get_changed(self) -> Set[str]:
+        """
+        Get the names of the files changed since the last call.
+        """
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
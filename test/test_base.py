@@ -51,8 +51,10 @@ class TestWithSampleJsonFiles(unittest.TestCase):
         """
         Remove the temporary JSONL files.
         """
-        os.remove(cls.jsonl_filename1)
-        os.remove(cls.jsonl_filename2)
+        for filename in (cls.jsonl_filename1, cls.jsonl_filename2):
+            os.remove(filename)
+            if os.path.exists(filename + JsonlIndex.SUFFIX):
+                os.remove(filename + JsonlIndex.SUFFIX)
 
 
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Tests of file csv.py.
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+
+from finmanlib.csv import CsvFmt
+
+
+
+CSV_FMT = {
+    "name": "Test",
+    "encoding": "iso8859_15",
+    "separator": ";",
+    "num_header_lines": 3,
+    "line_with_column_names": 3,
+    "fmt_date": "DD.MM.YYYY",
+    "fmt_value": "x.xxx,yy",
+    "values_in_header": {
+        "bank_account": [1, 2, 2],
+        "value_start": None,
+        "value_end": [2, 2, 1]
+    },
+    "columns": {
+        "date": "Buchungstag",
+        "addressee": "Auftraggeber",
+        "value": "Betrag (EUR)"
+    }
+}
+
+CONTENTS_CSV = \
+    '"Konto:";"DE99 1234";\n' \
+    '"Kontostand:";"1.000,00 EUR";\n' \
+    '"Buchungstag";"Text";"Auftraggeber";"Betrag (EUR)";\n' \
+    '"05.07.1999";"Lastschrift";"Müller; Meier & Co.";"-1.234,56";\n' \
+    '"06.07.1999";"Gutschrift";"Dr. ""Evil"", Inc.";"1.376,42";\n' \
+    '\n' \
+    '"07.07.1999";"Text with\n' \
+    'line break";"Automobile Club";"-63,85";\n'
+
+
+
+class TestCsvFmt(unittest.TestCase):
+    """
+    Test class CsvFmt.
+    """
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False,
+                                         encoding='iso8859_15') as tmp_file:
+            self.csv_filename = tmp_file.name
+            tmp_file.write(CONTENTS_CSV)
+
+
+    def tearDown(self):
+        os.remove(self.csv_filename)
+
+
+    def testColumnMapping(self):
+        """
+        Test the mapping from field names to column indexes.
+        """
+        csv_fmt = CsvFmt(**CSV_FMT)
+        lines_header = CONTENTS_CSV.split("\n")[:3]
+        self.assertEqual(csv_fmt._column_mapping(lines_header),
+                {"date": 0, "addressee": 2, "value": 3})
+
+
+    def testProcessCsv(self):
+        """
+        Test the conversion of a CSV file, including quoted separators, quotes
+        and line breaks within fields.
+        """
+        csv_fmt = CsvFmt(**CSV_FMT)
+        trns_set = csv_fmt.process_csv(self.csv_filename)
+
+        self.assertEqual(trns_set.src.num_trns, 3)
+        self.assertEqual(trns_set.src.header_lines[0], '"Konto:";"DE99 1234";')
+        self.assertEqual([trn.line_num_in_csv for trn in trns_set.trns], [4, 5, 7])
+        self.assertEqual(trns_set.trns[0].columns, {
+            "date": "1999-07-05",
+            "addressee": "Müller; Meier & Co.",
+            "value": "-1234.56"
+        })
+        self.assertEqual(trns_set.trns[1].columns, {
+            "date": "1999-07-06",
+            "addressee": 'Dr. "Evil", Inc.',
+            "value": "+1376.42"
+        })
+        self.assertEqual(trns_set.trns[2].columns["value"], "-63.85")
+
+
+    def testHeaderValues(self):
+        """
+        Test the extraction of header values and the summary in the
+        TrnsSetHeader.
+        """
+        csv_fmt = CsvFmt(**CSV_FMT)
+        trns_set = csv_fmt.process_csv(self.csv_filename)
+
+        self.assertEqual(trns_set.src.header_values, {
+            "bank_account": "1234",
+            "value_end": "1.000,00"
+        })
+        header = trns_set.header
+        self.assertEqual(header.bank_account,   "1234")
+        self.assertEqual(header.date_first,     "1999-07-05")
+        self.assertEqual(header.date_last,      "1999-07-07")
+        self.assertEqual(header.value_diff,     "+78.01")
+        self.assertEqual(header.value_start,    "+921.99")
+        self.assertEqual(header.value_end,      "+1000.00")
+
+
+    def testConvDate(self):
+        """
+        Test the conversion of dates, with and without leading zeros.
+        """
+        self.assertEqual(CsvFmt.conv_date("05.07.1999", "DD/MM/YYYY"), "1999-07-05")
+        self.assertEqual(CsvFmt.conv_date("7/5/1999",   "MM/DD/YYYY"), "1999-07-05")
+        self.assertEqual(CsvFmt.conv_date("1999-07-05", "YYYY/MM/DD"), "1999-07-05")
+
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
@@ -4,11 +4,23 @@
 Tests of file datafile.py.
 """
 
+from decimal import Decimal
+import io
+import json
 import logging
+import os
+import tempfile
+import threading
+import time
 import unittest
+import unittest.mock
 
 from test_base import TestWithSampleJsonFiles
-from finmanlib.datafile import FinmanData
+from finmanlib.codec import CODEC_NAMES, make_codec
+from finmanlib.datafile import FinmanData, JsonlFile, JsonlIndex, JsonlReader, \
+    ReloadResult, plural, read_trns, open_jsonl, zstandard, value_to_cents, cents_to_str
+from finmanlib.stats import DataStats
+from finmanlib.watch import FileWatcher
 
 
 
@@ -141,6 +153,12 @@ class TestFinmanData(TestWithSampleJsonFiles):
         self.assertEqual(repr(self.trn_1a1),      fmt_trn_1a1     % "unmodified")
         self.assertEqual(repr(self.trn_1a2),      fmt_trn_1a2     % "unmodified")
 
+        # Plural forms, also of counts of containers.
+        self.assertEqual(repr(self.finman_data.rollups),
+                         "<Rollups: 3 transaction sets, 2 categories, 3 months>")
+        self.assertEqual(plural('category', {'a': 1}, 'categories'), "category")
+        self.assertEqual(plural('category', 0, 'categories'), "categories")
+
 
     def testTrnFrields(self):
         """
@@ -164,6 +182,25 @@ class TestFinmanData(TestWithSampleJsonFiles):
         self.assertEqual(trn.get_field("nonexisting_field"), "")
 
 
+    def testTrnValue(self):
+        """
+        Test the Trn methods regarding the value: value(), value_cents().
+        """
+        trn = self.trn_1a1
+        self.assertEqual(trn.value(),       Decimal("100.78"))
+        self.assertEqual(trn.value_cents(), 10078)
+
+        # The cached value follows changes of the field.
+        trn.columns["value"] = "-3.5"
+        self.assertEqual(trn.value_cents(), -350)
+
+        self.assertEqual(value_to_cents("-0.05"),   -5)
+        self.assertEqual(value_to_cents("+12"),     1200)
+        self.assertRaises(ValueError, value_to_cents, "1.005")
+        self.assertEqual(cents_to_str(-5),          "-0.05")
+        self.assertEqual(cents_to_str(123456),      "+1234.56")
+
+
     def testTrnModified(self):
         """
         Test the Trn methods regarding modification status: is_modified().
@@ -216,11 +253,565 @@ class TestFinmanData(TestWithSampleJsonFiles):
         self.assertEqual(trn.is_modified(),         True)
 
 
+    def testRollups(self):
+        """
+        Test the aggregates of class Rollups and their update on category
+        changes.
+        """
+        rollups = self.finman_data.rollups
+        self.assertEqual(rollups.balances[self.trns_set_1a], [10078, 30156, 60234])
+        self.assertEqual(rollups.get_balance(self.trns_set_1b), (0, 10055))
+        self.assertEqual(rollups.cat_totals, {"transfers": [10078, 1], "": [73411, 15]})
+        self.assertEqual(rollups.month_totals["1973-01"], [13200, 12])
+
+        self.trn_1a2.set_cat("xyz")
+        self.trn_1a1.clear_cat()
+        self.assertEqual(rollups.cat_totals, {"xyz": [20078, 1], "": [63411, 15]})
+        self.assertEqual(rollups.cat_month_totals[("xyz", "1972-07")], [20078, 1])
+        self.assertEqual(rollups.check(self.finman_data.jsonl_files), [])
+
+        # Differences to a full recomputation are detected.
+        self.trn_1a2.notes['cat'] = "abc"
+        self.assertEqual(len(rollups.check(self.finman_data.jsonl_files)), 4)
+
+        # Determined on first use, including edits made before.
+        finman_data = FinmanData((self.jsonl_filename1, self.jsonl_filename2))
+        finman_data.jsonl_files[0].trns_sets[0].trns[1].set_cat("xyz")
+        self.assertIsNone(finman_data._rollups)
+        self.assertEqual(finman_data.rollups.cat_totals["xyz"], [20078, 1])
+
+
+    def testMemoryReport(self):
+        """
+        Test the memory report of FinmanData.
+        """
+        finman_data = FinmanData((self.jsonl_filename1,), trace_memory=True)
+        report = finman_data.get_memory_report()
+
+        file_report = report['files'][self.jsonl_filename1]
+        self.assertEqual([sizes['num_trns'] for sizes in file_report['sets']], [3, 1])
+        self.assertEqual(file_report['total'], sum(sizes['total'] for sizes in file_report['sets']))
+        self.assertEqual(report['trns']['count'], 4)
+        self.assertGreater(report['trns']['columns'], 0)
+        self.assertGreater(report['trns']['notes'], 0)
+        self.assertIn('rollups', report['caches'])
+        self.assertGreater(report['load_peak'], 0)
+
+
+    def testLazyLoading(self):
+        """
+        Test the lazy loading of JSONL files.
+        """
+        finman_data = FinmanData((self.jsonl_filename1,
+                                  self.jsonl_filename2), lazy=True)
+        trns = [trn for jsonl_file in finman_data.jsonl_files
+                    for trns_set in jsonl_file.trns_sets
+                    for trn in trns_set.trns]
+        trns_eager = [trn for jsonl_file in self.finman_data.jsonl_files
+                          for trns_set in jsonl_file.trns_sets
+                          for trn in trns_set.trns]
+        self.assertEqual(len(trns), len(trns_eager))
+
+        # Pre-extracted fields are available without decoding; only the first
+        # transaction of each set has been decoded (for the field names).
+        self.assertEqual([trn.is_decoded() for trn in trns[:5]], [True, False, False, True, True])
+        trn = trns[1]
+        self.assertEqual(trn.get_field('date'), "1972-07-20")
+        self.assertEqual(trn.value_cents(), 20078)
+        self.assertEqual(trn.get_field('cat'), "")
+        self.assertFalse(trn.is_decoded())
+        with open(self.jsonl_filename1, 'rb') as fh:
+            fh.seek(trn._offset)
+            self.assertEqual(fh.readline().decode().strip(), trn.get_raw())
+        # Field ranges and rollups are determined on first use.
+        trns_set = finman_data.jsonl_files[0].trns_sets[0]
+        self.assertIsNone(trns_set._field_ranges)
+        self.assertIsNone(finman_data._rollups)
+        self.assertEqual(self.trns_set_1a.get_field_range('value'), trns_set.get_field_range('value'))
+        self.assertEqual(finman_data.known_field_names, self.finman_data.known_field_names)
+        self.assertEqual(finman_data.rollups.cat_totals, self.finman_data.rollups.cat_totals)
+
+        # Other fields cause decoding.
+        self.assertEqual(trn.get_field('remark'), "abc")
+        self.assertTrue(trn.is_decoded())
+        self.assertEqual(trns[2].columns['details'], "Transfer 1a-3")
+        self.assertTrue(trns[2].is_decoded())
+
+        # All fields are equal to those of eagerly loaded transactions.
+        for trn, trn_eager in zip(trns, trns_eager):
+            self.assertEqual(trn.get_all_field_names(), trn_eager.get_all_field_names())
+            for field in trn_eager.get_all_field_names():
+                self.assertEqual(trn.get_field(field), trn_eager.get_field(field))
+
+        # Written data is equal to that of eagerly loaded files (without
+        # decoding).
+        jsonl_file = JsonlFile(self.jsonl_filename1, lazy=True)
+        out, out_eager = io.StringIO(), io.StringIO()
+        jsonl_file._write(out)
+        self.jsonl_file1._write(out_eager)
+        self.assertEqual(out.getvalue(), out_eager.getvalue())
+        self.assertFalse(jsonl_file.trns_sets[0].trns[0].is_decoded())
+
+
+    def testJsonlIndex(self):
+        """
+        Test the index of JSONL files, and reading single transactions.
+        """
+        index_filename = self.jsonl_filename1 + JsonlIndex.SUFFIX
+        if os.path.exists(index_filename):
+            os.remove(index_filename)
+
+        with JsonlReader(self.jsonl_filename1, trn_id_prefix="1-") as reader:
+            self.assertEqual(reader.index.set_ranges, [(1, 5), (7, 9)])
+            self.assertEqual(reader.index.get_num_lines(), 10)
+            self.assertEqual(reader.index.find_trns_set(4), 0)
+            self.assertEqual(reader.index.find_trns_set(6), None)
+            self.assertEqual(reader.index.find_trns_set(9), 1)
+            self.assertTrue(os.path.exists(index_filename))
+
+            trn = reader.get_trn(4)
+            self.assertEqual(trn._id, "1-4")
+            self.assertEqual(trn.line_num_in_csv, self.trn_1a2.line_num_in_csv)
+            self.assertEqual(trn.columns, self.trn_1a2.columns)
+            self.assertEqual(trn.notes, self.trn_1a2.notes)
+            with self.assertRaises(ValueError):
+                reader.get_trn(2)
+            with self.assertRaises(IndexError):
+                reader.get_trn(11)
+
+            trns_set = reader.get_trns_set(1)
+            self.assertEqual(trns_set.src.filename, "test1b.csv")
+            self.assertEqual([trn._id for trn in trns_set.trns], ["1-9"])
+
+        # The stored index is used as long as the JSONL file is unchanged.
+        index = JsonlIndex(self.jsonl_filename1)
+        self.assertTrue(index._load())
+        self.assertEqual(index.set_ranges, [(1, 5), (7, 9)])
+        st = os.stat(self.jsonl_filename1)
+        os.utime(self.jsonl_filename1, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        self.assertFalse(JsonlIndex(self.jsonl_filename1)._load())
+
+        # Transaction IDs are those of FinmanData.
+        trns = read_trns([self.jsonl_filename1, self.jsonl_filename2], ["1-4", "2-3"])
+        self.assertEqual([trn._id for trn in trns], ["1-4", "2-3"])
+        self.assertEqual(trns[0].columns, self.trn_1a2.columns)
+        with self.assertRaises(ValueError):
+            read_trns([self.jsonl_filename1, self.jsonl_filename2], ["4"])
+
+
+    def testCodec(self):
+        """
+        Test the JSON codecs.
+        """
+        trn = self.trn_1a2
+        expected = json.dumps({'type': 'Trn', 'line_num_in_csv': trn.line_num_in_csv,
+                               'columns': trn.columns, 'notes': trn.notes})
+        self.assertEqual(make_codec('json').dumps_trn(trn), expected)
+
+        for name in CODEC_NAMES:
+            try:
+                json_codec = make_codec(name)
+            except ValueError:
+                continue        # orjson is not installed.
+            self.assertEqual(json_codec.loads(json_codec.dumps_trn(trn)), json.loads(expected))
+            self.assertEqual(json_codec.loads(expected.encode()), json.loads(expected))
+
+        # Additional attributes are written, too.
+        trn.account = "abc"
+        self.assertEqual(json.loads(make_codec('json').dumps_trn(trn))['account'], "abc")
+        del trn.account
+
+        with self.assertRaises(ValueError):
+            make_codec('xml')
+
+
+    def testCompressedFiles(self):
+        """
+        Test reading and writing of compressed JSONL files.
+        """
+        suffixes = ['.gz'] + (['.zst'] if zstandard is not None else [])
+        for suffix in suffixes:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                filename = os.path.join(tmp_dir, "test.jsonl" + suffix)
+                with open_jsonl(filename, 'w') as fh:
+                    self.jsonl_file1._write(fh)
+
+                jsonl_file = JsonlFile(filename)
+                self.assertEqual(len(jsonl_file.trns_sets), 2)
+                trn = jsonl_file.trns_sets[0].trns[1]
+                self.assertEqual(trn.columns, self.trn_1a2.columns)
+
+                trn.set_remark("compressed")
+                jsonl_file.save()
+                jsonl_file = JsonlFile(filename, lazy=True)
+                self.assertEqual(jsonl_file.trns_sets[0].trns[1].get_field('remark'), "compressed")
+
+                with self.assertRaises(ValueError):
+                    JsonlReader(filename)
+
+
+    def testReload(self):
+        """
+        Test the incremental reloading of changed files.
+        """
+        for lazy in (False, True):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                filename = os.path.join(tmp_dir, "test.jsonl")
+                with open_jsonl(filename, 'w') as fh:
+                    self.jsonl_file1._write(fh)
+
+                finman_data = FinmanData((filename,), lazy=lazy)
+                self.assertFalse(finman_data.jsonl_files[0].is_changed_on_disk())
+                self.assertEqual(finman_data.reload_changed(), {})
+                sets = finman_data.jsonl_files[0].trns_sets
+                trns_a = list(sets[0].trns)
+                trns_a[1].set_remark("unsaved")
+
+                # Edit the first set in the file: change one line and insert
+                # an empty line (which moves the second set).
+                with open(filename) as fh:
+                    lines = fh.readlines()
+                line_idx = int(trns_a[0]._id) - 1
+                lines[line_idx] = lines[line_idx].replace('"remark": ""', '"remark": "external"')
+                lines.insert(2, "\n")
+                with open(filename, 'w') as fh:
+                    fh.writelines(lines)
+                self.assertTrue(finman_data.jsonl_files[0].is_changed_on_disk())
+                with self.assertRaises(ValueError):
+                    finman_data.save()
+                self.assertTrue(finman_data.is_modified())
+
+                results = finman_data.reload_changed()
+                self.assertEqual(results[filename],
+                                 ReloadResult(sets_kept=1, sets_reloaded=1, trns_kept=len(trns_a) - 1,
+                                              trns_new=1, trns_removed=1, conflicts=[]))
+                self.assertFalse(finman_data.jsonl_files[0].is_changed_on_disk())
+                new_sets = finman_data.jsonl_files[0].trns_sets
+                self.assertIsNot(new_sets[0], sets[0])
+                self.assertIs(new_sets[1], sets[1])
+                self.assertIsNot(new_sets[0].trns[0], trns_a[0])
+                self.assertEqual(new_sets[0].trns[0].get_field('remark'), "external")
+                self.assertIs(new_sets[0].trns[1], trns_a[1])
+                self.assertEqual(finman_data.rollups.check(finman_data.jsonl_files), [])
+
+                # The IDs are the line numbers again.
+                with open(filename) as fh:
+                    lines = fh.readlines()
+                for trns_set in new_sets:
+                    for trn in trns_set.trns:
+                        self.assertEqual(json.loads(lines[int(trn._id) - 1])['columns'],
+                                         trn.columns)
+
+                # Conflicts with unsaved edits.
+                line_idx = int(trns_a[1]._id) - 1
+                lines[line_idx] = lines[line_idx].replace('"remark": "abc"', '"remark": "external"')
+                with open(filename, 'w') as fh:
+                    fh.writelines(lines)
+                results = finman_data.reload_changed()
+                self.assertEqual(results[filename].conflicts,
+                                 [f"{trns_a[1]._id}: notes changed in file; unsaved edits kept"])
+                self.assertIs(finman_data.jsonl_files[0].trns_sets[0].trns[1], trns_a[1])
+                self.assertEqual(trns_a[1].notes['remark'], "unsaved")
+
+                # Saving works again after reloading.
+                self.assertEqual(finman_data.save(), 1)
+                self.assertEqual(JsonlFile(filename).trns_sets[0].trns[1].notes['remark'], "unsaved")
+
+
+    def testReloadCorrupt(self):
+        """
+        Test reloading malformed (e.g. partly written) files.
+        """
+        for lazy in (False, True):
+            for bad_line in ("garbage\n", '{"type": "TrnsSetHeader"}\n'):
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    filename = os.path.join(tmp_dir, "test.jsonl")
+                    with open_jsonl(filename, 'w') as fh:
+                        self.jsonl_file1._write(fh)
+
+                    finman_data = FinmanData((filename,), lazy=lazy)
+                    sets = list(finman_data.jsonl_files[0].trns_sets)
+                    ids = [trn._id for trns_set in sets for trn in trns_set.trns]
+                    sets[0].trns[1].set_remark("unsaved")
+
+                    # Move all transactions by an empty line, and add a bad
+                    # line after the first transaction.
+                    with open(filename) as fh:
+                        good_lines = fh.readlines()
+                    lines = list(good_lines)
+                    lines.insert(int(ids[0]), bad_line)
+                    lines.insert(2, "\n")
+                    with open(filename, 'w') as fh:
+                        fh.writelines(lines)
+
+                    with self.assertLogs(level='WARNING') as logs:
+                        self.assertEqual(finman_data.reload_changed(), {})
+                    self.assertIn(f"Reloading {filename} failed", logs.output[0])
+                    self.assertEqual(finman_data.jsonl_files[0].trns_sets, sets)
+                    self.assertEqual([trn._id for trns_set in sets for trn in trns_set.trns], ids)
+                    self.assertEqual(finman_data.rollups.check(finman_data.jsonl_files), [])
+                    self.assertTrue(finman_data.is_modified())
+
+                    # Not retried until the file changes again.
+                    with self.assertNoLogs(level='WARNING'):
+                        self.assertEqual(finman_data.reload_changed(), {})
+
+                    # Completely written.
+                    with open(filename, 'w') as fh:
+                        fh.writelines(good_lines[:2] + ["\n"] + good_lines[2:])
+                    results = finman_data.reload_changed()
+                    self.assertEqual((results[filename].trns_new, results[filename].trns_removed), (0, 0))
+                    self.assertEqual([int(trn._id) for trns_set in finman_data.jsonl_files[0].trns_sets
+                                                   for trn in trns_set.trns],
+                                     [int(trn_id) + 1 for trn_id in ids])
+                    self.assertEqual(finman_data.jsonl_files[0].trns_sets[0].trns[1].notes['remark'],
+                                     "unsaved")
+                    self.assertEqual(finman_data.rollups.check(finman_data.jsonl_files), [])
+
+
+    def testFileWatcher(self):
+        """
+        Test the detection of changed files.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "test.txt")
+            with open(filename, 'w') as fh:
+                fh.write("1")
+            watcher = FileWatcher([filename], interval=60)
+            watcher.poll()
+            self.assertEqual(watcher.get_changed(), set())
+
+            with open(filename, 'w') as fh:
+                fh.write("12")
+            watcher.poll()
+            self.assertEqual(watcher.get_changed(), {filename})
+            self.assertEqual(watcher.get_changed(), set())
+
+            os.remove(filename)
+            watcher.poll()
+            self.assertEqual(watcher.get_changed(), {filename})
+            watcher.stop()
+
+
+    def testStringPool(self):
+        """
+        Test the pooling of strings of transactions.
+        """
+        trn_1b1 = self.trns_set_1b.trns[0]
+        self.assertIs(list(self.trn_1a1.columns)[2], list(trn_1b1.columns)[2])
+        self.assertIs(self.trn_1a2.notes['cat'], trn_1b1.notes['cat'])
+        self.assertIs(self.finman_data.string_pool.get("Transfer 1b-1"),
+                      trn_1b1.columns['details'])
+        self.assertIsNone(self.finman_data.string_pool.get("Transfer 1b-9"))
+
+        self.assertTrue(self.finman_data.is_pooled_field('details'))
+        self.assertTrue(self.finman_data.is_pooled_field('cat'))
+        self.assertFalse(self.finman_data.is_pooled_field('value'))
+        self.assertFalse(self.finman_data.is_pooled_field('remark'))
+
+        # New categories are pooled.
+        self.trn_1a2.set_cat("".join(("trans", "fers")))
+        self.assertIs(self.trn_1a2.notes['cat'], self.trn_1a1.notes['cat'])
+
+        finman_data = FinmanData((self.jsonl_filename1,), pool_strings=False)
+        self.assertFalse(finman_data.is_pooled_field('details'))
+
+
+    def testBackgroundLoading(self):
+        """
+        Test the loading of files in background.
+        """
+        finman_data = FinmanData((self.jsonl_filename1, self.jsonl_filename2), background=True)
+        self.assertTrue(finman_data.wait_loaded())
+        self.assertFalse(finman_data.is_loading())
+        self.assertEqual(finman_data.num_files_loaded, 2)
+        self.assertEqual(len(finman_data.jsonl_files), 2)
+        self.assertEqual(finman_data.known_field_names, self.finman_data.known_field_names)
+        self.assertEqual(finman_data.rollups.month_totals,
+                         self.finman_data.rollups.month_totals)
+
+        # Errors during loading are raised when waiting.
+        finman_data = FinmanData(("nonexisting.jsonl",), background=True)
+        with self.assertRaises(OSError):
+            finman_data.wait_loaded()
+        self.assertEqual(len(finman_data.jsonl_files), 0)
+
+
     def testFileSave(self):
         """
         Test the saving of JSONL files.
         """
-        # TBD
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "test.jsonl")
+            with open_jsonl(filename, 'w') as fh:
+                self.jsonl_file1._write(fh)
+
+            jsonl_file = JsonlFile(filename)
+            self.assertFalse(jsonl_file.save())
+
+            jsonl_file.trns_sets[0].trns[1].set_remark("saved")
+            self.assertTrue(jsonl_file.save())
+            self.assertFalse(jsonl_file.is_modified())
+            self.assertEqual(os.listdir(tmp_dir), ["test.jsonl"])      # no temporary file left
+            jsonl_file = JsonlFile(filename)
+            self.assertEqual(jsonl_file.trns_sets[0].trns[1].notes['remark'], "saved")
+
+            # On errors, the file remains unchanged and the transactions modified.
+            jsonl_file.trns_sets[0].trns[1].set_remark("not saved")
+            jsonl_file.trns_sets[0].trns[1].notes['unserializable'] = object()
+            with self.assertRaises(TypeError):
+                jsonl_file.save()
+            self.assertTrue(jsonl_file.is_modified())
+            self.assertEqual(os.listdir(tmp_dir), ["test.jsonl"])
+            self.assertEqual(JsonlFile(filename).trns_sets[0].trns[1].notes['remark'], "saved")
+
+
+    def testAutosave(self):
+        """
+        Test the saving of modified files in background.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "test.jsonl")
+            with open_jsonl(filename, 'w') as fh:
+                self.jsonl_file1._write(fh)
+
+            finman_data = FinmanData((filename,))
+            finman_data.start_autosave(delay=60)
+            trns = finman_data.jsonl_files[0].trns_sets[0].trns
+            trns[0].set_remark("first")
+            trns[1].set_remark("second")
+            trns[1].set_cat("autosaved")
+            self.assertEqual(finman_data.edit_seq, 3)
+            self.assertEqual(finman_data.autosaver.get_num_pending_edits(), 3)
+
+            # The edits are coalesced into one save.
+            autosaver = finman_data.autosaver
+            finman_data.stop_autosave()
+            self.assertIsNone(finman_data.autosaver)
+            self.assertEqual((autosaver.num_saves, autosaver.num_files_saved,
+                              autosaver.num_edits_saved), (1, 1, 3))
+            self.assertFalse(finman_data.is_modified())
+            trns = JsonlFile(filename).trns_sets[0].trns
+            self.assertEqual(trns[0].notes['remark'], "first")
+            self.assertEqual(trns[1].notes['cat'], "autosaved")
+
+            # Saving after the delay.
+            finman_data.start_autosave(delay=0.01)
+            finman_data.jsonl_files[0].trns_sets[0].trns[0].set_remark("later")
+            for _ in range(100):
+                if finman_data.autosaver.num_saves > 0:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(finman_data.autosaver.num_saves, 1)
+            self.assertEqual(JsonlFile(filename).trns_sets[0].trns[0].notes['remark'], "later")
+            finman_data.stop_autosave(flush=False)
+
+            # Flushing saves pending edits; saving in background continues,
+            # also after a failed save.
+            finman_data.start_autosave(delay=60)
+            autosaver = finman_data.autosaver
+            finman_data.jsonl_files[0].trns_sets[0].trns[0].set_remark("flushed")
+            with unittest.mock.patch.object(finman_data, 'save', side_effect=OSError("disk full")):
+                with self.assertLogs(level=logging.WARNING):
+                    finman_data.flush_autosave()
+            self.assertIsInstance(autosaver.last_error, OSError)
+            self.assertTrue(finman_data.is_modified())
+            self.assertIs(finman_data.autosaver, autosaver)
+            self.assertTrue(autosaver._thread.is_alive())
+            finman_data.jsonl_files[0].trns_sets[0].trns[1].set_remark("flushed")
+            finman_data.flush_autosave()
+            self.assertFalse(finman_data.is_modified())
+            self.assertEqual(JsonlFile(filename).trns_sets[0].trns[0].notes['remark'], "flushed")
+            finman_data.stop_autosave()
+
+
+    def testBulkEdit(self):
+        """
+        Test the editing of many transactions at once: set_cats(),
+        set_remarks().
+        """
+        finman_data = self.finman_data
+        rollups = finman_data.rollups
+        trns = self.trns_set_1a.trns + self.trns_set_1b.trns
+        finman_data.selection_cache.put('key', trns, {'cat'})
+        finman_data.stats.get('cat')
+
+        # Only changed transactions count; the aggregates are updated once.
+        num_changed = finman_data.set_cats([(self.trn_1a1, "transfers"),
+                                            (self.trn_1a2, "xyz"),
+                                            (trns[2], "xyz"),
+                                            (trns[3], "abc")], cat_auto=True)
+        self.assertEqual(num_changed, 3)
+        self.assertEqual(finman_data.edit_seq, 1)
+        self.assertFalse(self.trn_1a1.is_modified())
+        self.assertTrue(self.trn_1a2.is_modified())
+        self.assertEqual(self.trn_1a2.get_field("cat_auto"), True)
+        self.assertEqual(rollups.cat_totals["xyz"], [20078 + trns[2].value_cents(), 2])
+        self.assertEqual(rollups.check(finman_data.jsonl_files), [])
+        self.assertEqual(len(finman_data.selection_cache), 0)
+
+        # The statistics are updated, not determined again.
+        stats = finman_data.stats._stats['cat']
+        stats_expected = DataStats(finman_data).get('cat')
+        self.assertEqual((stats.count, stats.num_distinct, stats.mcv),
+                         (stats_expected.count, stats_expected.num_distinct, stats_expected.mcv))
+
+        # Moving transactions between categories in both directions.
+        finman_data.set_cats([(self.trn_1a2, "abc"), (trns[3], "xyz")])
+        self.assertEqual(rollups.check(finman_data.jsonl_files), [])
+        self.assertEqual(finman_data.set_cats([]), 0)
+        self.assertEqual(finman_data.edit_seq, 2)
+
+        # Remarks; the autosaver counts each transaction.
+        finman_data.start_autosave(delay=60)
+        self.assertEqual(finman_data.set_remarks((trn, "bulk") for trn in trns), len(trns))
+        self.assertEqual(finman_data.autosaver.get_num_pending_edits(), len(trns))
+        self.assertEqual({trn.get_field("remark") for trn in trns}, {"bulk"})
+        self.assertEqual(finman_data.set_remarks((trn, "bulk") for trn in trns), 0)
+        self.assertEqual(finman_data.edit_seq, 3)
+        finman_data.stop_autosave(flush=False)
+
+
+    def testBulkEditWhileSaving(self):
+        """
+        Test that editing many transactions does not wait for a save in
+        progress, and that the edits are saved subsequently.
+        """
+        write = JsonlFile._write
+        for lazy in (False, True):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                filename = os.path.join(tmp_dir, "test.jsonl")
+                with open_jsonl(filename, 'w') as fh:
+                    self.jsonl_file1._write(fh)
+                finman_data = FinmanData((filename,), lazy=lazy)
+                trns = [trn for trns_set in finman_data.jsonl_files[0].trns_sets
+                            for trn in trns_set.trns]
+                trns[0].set_remark("saved")
+
+                writing = threading.Event()
+                resume = threading.Event()
+                def slow_write(jsonl_file, fh):
+                    writing.set()
+                    resume.wait(10)
+                    write(jsonl_file, fh)
+
+                with unittest.mock.patch.object(JsonlFile, '_write', slow_write):
+                    saver = threading.Thread(target=finman_data.save)
+                    saver.start()
+                    self.assertTrue(writing.wait(10))
+                    self.assertEqual(finman_data.set_cats((trn, "bulk") for trn in trns), len(trns))
+                    self.assertEqual(finman_data.set_remarks((trn, "bulk") for trn in trns), len(trns))
+                    self.assertTrue(saver.is_alive())
+                    resume.set()
+                    saver.join()
+
+                # The edits made while writing remain to be saved.
+                self.assertTrue(all(trn.is_modified() for trn in trns))
+                self.assertEqual(finman_data.save(), 1)
+                self.assertEqual({(trn.get_field("cat"), trn.get_field("remark"))
+                                  for trns_set in JsonlFile(filename).trns_sets
+                                      for trn in trns_set.trns},
+                                 {("bulk", "bulk")})
 
 
     def testFinmanDataFieldAccess(self):
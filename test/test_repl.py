@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+Tests of file repl.py.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import unittest
+
+from test_base import TestWithSampleJsonFiles
+from finmanlib.datafile import FinmanData, JsonlFile, open_jsonl
+from finmanlib.repl import FinmanREPL
+
+
+
+class TestFinmanREPL(TestWithSampleJsonFiles):
+    """
+    Test class FinmanREPL by running single commands.
+    """
+
+    def setUp(self):
+        """
+        Preparation for each test: copy a JSONL file, and run a REPL on it.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "test.jsonl")
+        with open_jsonl(self.filename, 'w') as fh:
+            FinmanData((self.jsonl_filename1,)).jsonl_files[0]._write(fh)
+
+        args = argparse.Namespace(jsonl=[self.filename], cat=None, trace_mem=False, lazy=False,
+                                  background=False, autosave=None, watch=False,
+                                  cache_entries=16, workers=1)
+        self.repl = FinmanREPL(args)
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def run_cmd(self, cmd: str, arg: str = "") -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertFalse(self.repl.run_cmd(cmd, arg))
+        return out.getvalue()
+
+
+    def testSaveChangedFile(self):
+        """
+        Test saving after the file has been changed on disk: the REPL asks
+        for reloading and keeps the unsaved edits.
+        """
+        trn = self.repl.finman_data.jsonl_files[0].trns_sets[0].trns[0]
+        trn.set_remark("unsaved")
+        with open(self.filename, 'a') as fh:
+            fh.write("\n")
+
+        output = self.run_cmd('save')
+        self.assertIn("has been changed on disk", output)
+        self.assertIn("'reload'", output)
+        self.assertTrue(self.repl.finman_data.is_modified())
+
+        self.run_cmd('reload')
+        self.run_cmd('save')
+        self.assertFalse(self.repl.finman_data.is_modified())
+        self.assertEqual(JsonlFile(self.filename).trns_sets[0].trns[0].notes['remark'], "unsaved")
+
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    unittest.main()
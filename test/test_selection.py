@@ -7,10 +7,15 @@ Tests of file selection.py.
 import decimal
 import io
 import logging
+import re
 import textwrap
 import unittest
+import unittest.mock
 
 from test_base import TestWithSampleJsonFiles
+from finmanlib.cache import SelectionCache
+from finmanlib.parallel import split_range
+from finmanlib.stats import DataStats, FieldStats
 from finmanlib.selection import *
 
 
@@ -103,6 +108,91 @@ class TestFinmanData(TestWithSampleJsonFiles):
         check("3,5-9,6-11,14-", [[3,3], [5,11], [14,18]])
 
 
+    def testTrnsView(self):
+        """
+        Test class TrnsView and Selection.get_subset().
+        """
+        sel = Selection(self.finman_data)
+        trns = sel.trns
+
+        def check(subset_str: Optional[str], idxs_expected: List[int]):
+            view = sel.get_subset(subset_str)
+            trns_expected = [trns[idx] for idx in idxs_expected]
+            self.assertEqual(len(view), len(trns_expected))
+            self.assertEqual(list(view), trns_expected)
+            self.assertEqual([view[pos] for pos in range(len(view))], trns_expected)
+            self.assertEqual(view[::-1], trns_expected[::-1])
+            if trns_expected:
+                self.assertIs(view[-1], trns_expected[-1])
+            with self.assertRaises(IndexError):
+                view[len(view)]
+
+        num_trns = len(trns)
+        self.assertGreaterEqual(num_trns, 4)
+        check(None,                 list(range(num_trns)))
+        check("2",                  [1])
+        check("1-2,4-",             [0, 1] + list(range(3, num_trns)))
+        check(f"3-{num_trns + 5}",  list(range(2, num_trns)))
+        check("0-1",                [0])
+        check(f"{num_trns + 1}-",   [])
+        check("",                   [])
+
+        # No copy: changes of the selection are visible in the view.
+        sel = Selection(self.finman_data, trns=list(trns))
+        trns = sel.trns
+        view = sel.get_subset("1")
+        trns[0] = trns[1]
+        self.assertIs(view[0], trns[1])
+
+
+    def testSelectionIdx(self):
+        """
+        Test the positions of transactions within selections (COL_IDX).
+        """
+        sel = Selection(self.finman_data, "", "value")
+        trns = sel.trns
+        self.assertGreaterEqual(len(trns), 4)
+        self.assertNotIn(COL_IDX, vars(trns[0]))
+
+        # Positions within the selection itself.
+        self.assertEqual([sel.get_idx(trn) for trn in trns], list(range(1, len(trns) + 1)))
+        self.assertEqual(sel.get_field(trns[2], COL_IDX), "3")
+        sel_rev = Selection(self.finman_data, trns=trns[::-1])
+        self.assertEqual(sel_rev.get_field(trns[2], COL_IDX), str(len(trns) - 2))
+        self.assertIsNone(Selection(self.finman_data, trns=trns[:1]).get_idx(trns[1]))
+
+        out = io.StringIO()
+        sel_rev.print_trns_details("1", fh=out)
+        self.assertIn("# 1\n", out.getvalue())
+        self.assertIn(f"{'_id:':<28}{trns[-1]._id}\n", out.getvalue())
+
+        # Field and filters resolve against the active selection.
+        self.assertIsNone(trns[0].get_field(COL_IDX))
+        self.assertEqual(Selection(self.finman_data, "_idx<=2").trns, [])
+        self.finman_data.active_selection = sel
+        self.assertEqual(trns[1].get_field(COL_IDX), "2")
+        self.assertEqual(set(Selection(self.finman_data, "_idx<=2").trns), set(trns[:2]))
+        self.assertEqual(set(Selection(self.finman_data, "_idx=2..3").trns), set(trns[1:3]))
+        self.finman_data.active_selection = sel_rev
+        self.assertEqual(Selection(self.finman_data, "_idx=1").trns, [trns[-1]])
+
+
+    def testSelectionEdit(self):
+        """
+        Test the editing of a selection or a subset thereof as one edit.
+        """
+        sel = Selection(self.finman_data, "", "value")
+        cats = [trn.get_field("cat") for trn in sel.trns[:4]]
+        self.assertEqual(sel.set_cat("bulk", "2-3", cat_auto=True), 2)
+        self.assertEqual([trn.get_field("cat") for trn in sel.trns[:4]],
+                         [cats[0], "bulk", "bulk", cats[3]])
+        self.assertEqual(Selection(self.finman_data, "cat=bulk").trns, sel.trns[1:3])
+        self.assertEqual(sel.set_remark("all"), len(sel.trns))
+        self.assertEqual(sel.set_remark("all", "1-"), 0)
+        self.assertEqual(self.finman_data.edit_seq, 2)
+        self.assertEqual(self.finman_data.rollups.check(self.finman_data.jsonl_files), [])
+
+
     def testTrnFilter(self):
         """
         TBD
@@ -176,6 +266,11 @@ class TestFinmanData(TestWithSampleJsonFiles):
         check("_id=~abc",           [])
         check("_idx=~abc",          [])
         check("value=~abc",         [])
+        check("value~/1/",          [])
+
+        # Values not convertible to numerical format are ignored.
+        check("_id=abc",            [])
+        check("value>abc",          [])
 
 
         #
@@ -191,6 +286,383 @@ class TestFinmanData(TestWithSampleJsonFiles):
 
 
 
+    def testTrnFilterRegexRange(self):
+        """
+        Test the operators 'regex' and 'between'.
+        """
+        FC = TrnFilter.FilterCond
+        Dec = decimal.Decimal
+
+        def check(filter_str: str, filter_conds: List[FC]):
+            trn_filter = TrnFilter(self.finman_data, filter_str)
+            self.assertEqual(trn_filter.filter_conds, filter_conds)
+
+        def check_match(filter_str: str, details_expected: List[str]):
+            sel = Selection(self.finman_data, filter_str)
+            self.assertEqual([trn.get_field("details") for trn in sel.trns], details_expected)
+
+        # Regular expressions, with flags; operator characters within '/.../'
+        # are part of the expression.
+        check("det~/^a.c$/",        [FC("details", "regex", re.compile("^a.c$"))])
+        check("det~/a|b(c)/i",      [FC("details", "regex", re.compile("a|b(c)", re.I))])
+        check("det~/a\\/b/",        [FC("details", "regex", re.compile("a/b"))])
+        check("det ~ abc",          [FC("details", "regex", re.compile("abc"))])
+        check("det~/[/",            [])
+        check("det~/a/q",           [])
+
+        # Compiled expressions are shared between filters.
+        self.assertIs(TrnFilter(self.finman_data, "det~/x+/i").filter_conds[0].value,
+                      TrnFilter(self.finman_data, "det~/x+/i").filter_conds[0].value)
+
+        check_match("det~/1[ab]-[23]$/",            ["Transfer 1a-2", "Transfer 1a-3"])
+        check_match("det~/TRANSFER 2-1[12]/i",      ["Transfer 2-11", "Transfer 2-12"])
+        check_match("det~/transfer/",               [])
+        check_match("det~/2-(11|22)/,det=~1b",      ["Transfer 1b-1", "Transfer 2-11",
+                                                     "Transfer 2-22"])
+
+        # Ranges (inclusive); only on numerical fields and dates.
+        check("val=100..200.5",     [FC("value", "between", (Dec("100"), Dec("200.5")))])
+        check("date=1972-07..1972-08-31",
+                                    [FC("date", "between", ("1972-07", "1972-08-31"))])
+        check("_id=..3",            [FC("_id", "<=", 3)])
+        check("_id=3..",            [FC("_id", ">=", 3)])
+        check("det=a..b",           [FC("details", "=", "a..b")])
+        check("val=..",             [])
+        check("val=a..b",           [])
+
+        check_match("val=100.55..200.78",           ["Transfer 1a-1", "Transfer 1a-2",
+                                                     "Transfer 1b-1"])
+        check_match("date=1972-07-25..1973-01-11",  ["Transfer 1a-3", "Transfer 1b-1",
+                                                     "Transfer 2-11"])
+
+        # Matching of transaction sets.
+        trns_sets = [trns_set for jsonl in self.finman_data.jsonl_files
+                              for trns_set in jsonl.trns_sets]
+        trn_filter = TrnFilter(self.finman_data, "date=1972-07-01..1972-08-31")
+        self.assertEqual([trn_filter.match_set(trns_set) for trns_set in trns_sets],
+                         [True, True, False])
+        trn_filter = TrnFilter(self.finman_data, "val=0..100")
+        self.assertEqual([trn_filter.match_set(trns_set) for trns_set in trns_sets],
+                         [False, False, True])
+
+
+
+    def testTrnFilterExpr(self):
+        """
+        Test filter expressions with the operators OR, NOT and grouping.
+        """
+        FC = TrnFilter.FilterCond
+        FE = TrnFilter.FilterExpr
+        a = FC("details", "=", "a")
+        b = FC("details", "=", "b")
+        c = FC("details", "=", "c")
+
+        def check(filter_str: str, expr_expected):
+            self.assertEqual(TrnFilter(self.finman_data, filter_str).expr, expr_expected)
+
+        # Operators and precedence.
+        check("det=a",                  a)
+        check("det=a|det=b",            FE('and', (a, b)))
+        check("det=a,det=b",            FE('or', (a, b)))
+        check("det=a,det=b|det=c",      FE('or', (a, FE('and', (b, c)))))
+        check("(det=a,det=b)|det=c",    FE('and', (FE('or', (a, b)), c)))
+        check("!det=a|det=b",           FE('and', (FE('not', (a,)), b)))
+        check("!(det=a|det=b)",         FE('not', (FE('and', (a, b)),)))
+        check("!!det=a",                a)
+
+        # Nested nodes of the same operator are merged; ignored conditions
+        # are left out.
+        check("det=a,(det=b,det=c)",    FE('or', (a, b, c)))
+        check("det=a|xx=1",             a)
+        check("!xx=1",                  None)
+
+        # Operator characters within quoted values and balanced parentheses
+        # within values.
+        check("det='a, b'",             FC("details", "=", "a, b"))
+        check("det='a|b',det=c",        FE('or', (FC("details", "=", "a|b"), c)))
+        check("det=f(x)",               FC("details", "=", "f(x)"))
+        check("(det=f(x))",             FC("details", "=", "f(x)"))
+        check("det=a!",                 FC("details", "=", "a!"))
+
+        # Commas are operators only if a condition on a known field follows.
+        check("det=Dr. Evil, Inc.",     FC("details", "=", "Dr. Evil, Inc."))
+        check("det=a, b=1",             FC("details", "=", "a, b=1"))
+        check("det=a, det=b",           FE('or', (a, b)))
+        check("det=a,!(det=b)",         FE('or', (a, FE('not', (b,)))))
+        self.assertEqual([trn.get_field("details") for trn in
+                          Selection(self.finman_data, "det=~1a-1, suffix,det=~1b").trns],
+                         ["Transfer 1b-1"])
+
+        # Matching.
+        def check_match(filter_str: str, details_expected: List[str]):
+            sel = Selection(self.finman_data, filter_str)
+            self.assertEqual([trn.get_field("details") for trn in sel.trns], details_expected)
+
+        check_match("det=~1a-1,det=~2-2",           ["Transfer 1a-1", "Transfer 2-20",
+                                                     "Transfer 2-21", "Transfer 2-22"])
+        check_match("date<1973-01-12,!date<1973-01-21",
+                                                    ["Transfer 1a-1", "Transfer 1a-2",
+                                                     "Transfer 1a-3", "Transfer 1b-1",
+                                                     "Transfer 2-11", "Transfer 2-21",
+                                                     "Transfer 2-22"])
+        check_match("!(date>=1972-07-15,val<100),det=~2-12",
+                                                    ["Transfer 1a-1", "Transfer 2-12"])
+        check_match("det=Nobody,val>200",           ["Transfer 1a-2", "Transfer 1a-3"])
+        check_match("!det=~transfer",               [])
+
+        # Matching of transaction sets.
+        trns_sets = [trns_set for jsonl in self.finman_data.jsonl_files
+                              for trns_set in jsonl.trns_sets]
+        trn_filter = TrnFilter(self.finman_data, "date<1972-08-01,value=11")
+        self.assertEqual([trn_filter.match_set(trns_set) for trns_set in trns_sets],
+                         [True, False, True])
+        trn_filter = TrnFilter(self.finman_data, "!date<1972-08-01|!details=~1b")
+        self.assertEqual([trn_filter.match_set(trns_set) for trns_set in trns_sets],
+                         [False, None, None])
+
+        # Combination of filter strings by OR.
+        trn_filter = TrnFilter.any_of(self.finman_data, ["det=a|det=b", "det=c"])
+        self.assertEqual(trn_filter.expr, FE('or', (FE('and', (a, b)), c)))
+        self.assertTrue(TrnFilter.any_of(self.finman_data, ["det=a", ""]).match(None))
+        self.assertFalse(TrnFilter.any_of(self.finman_data, []).can_match())
+        self.assertFalse(TrnFilter.any_of(self.finman_data, ["det=Nobody"]).can_match())
+
+        # Cache keys do not depend on the order of operands, but on the operators.
+        def cache_key(filter_str: str):
+            return TrnFilter(self.finman_data, filter_str).get_cache_key([])
+
+        self.assertEqual(cache_key("det=a,det=b"), cache_key("det=b,det=a,det=a"))
+        self.assertNotEqual(cache_key("det=a,det=b"), cache_key("det=a|det=b"))
+
+
+
+    def testTrnFilterMatchSet(self):
+        """
+        Test the matching of whole transaction sets by TrnFilter.match_set().
+        """
+        trns_sets = [trns_set for jsonl in self.finman_data.jsonl_files
+                              for trns_set in jsonl.trns_sets]
+
+        def check(filter_str: str, results_expected: List[Optional[bool]]):
+            trn_filter = TrnFilter(self.finman_data, filter_str)
+            self.assertEqual([trn_filter.match_set(trns_set) for trns_set in trns_sets],
+                             results_expected)
+
+        rng = trns_sets[0].get_field_range("value")
+        self.assertEqual((rng.min, rng.max, rng.count), (10078, 30078, 3))
+
+        check("",                           [True,  True,  True])
+        check("date>=1973-01-01",           [False, False, True])
+        check("date<1972-08-01",            [True,  False, False])
+        check("date>=1972-07-15",           [None,  True,  True])
+        check("date=1972-08-05",            [False, True,  False])
+        check("value>150",                  [None,  False, False])
+        check("value=11",                   [False, False, True])
+        check("details=~1a",                [None,  None,  None])
+        check("date<1973-01-15|value=11",   [False, False, None])
+
+        # No transaction can match pooled fields with values not in the pool.
+        check("details=Nobody",             [False, False, False])
+        self.assertFalse(TrnFilter(self.finman_data, "details=Nobody").can_match())
+        self.assertTrue(TrnFilter(self.finman_data, "details=Transfer 1b-1").can_match())
+        self.assertTrue(TrnFilter(self.finman_data, "remark=Nobody").can_match())
+
+        # Selections do not depend on matching of sets.
+        sel = Selection(self.finman_data, "date>=1972-07-15|date<1973-01-13")
+        self.assertEqual([trn.get_field("details") for trn in sel.trns],
+                         ["Transfer 1a-2", "Transfer 1a-3", "Transfer 1b-1",
+                          "Transfer 2-11", "Transfer 2-12"])
+
+
+
+    def testSelectionCache(self):
+        """
+        Test the caching of selection results.
+        """
+        cache = self.finman_data.selection_cache
+        sel1 = Selection(self.finman_data, "date>=1972-07-15|details=~transfer", "value")
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 1, 1))
+
+        # Equivalent conditions are found in the cache.
+        sel2 = Selection(self.finman_data, "det=~Transfer|date>=1972-07-15|date>=1972-07-15", "val")
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 1, 1))
+        self.assertIs(sel2.trns, sel1.trns)
+        Selection(self.finman_data, "details=~transfer|date>=1972-07-15", "")
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+
+        # Selections depending on volatile fields are not cached.
+        Selection(self.finman_data, "_cat_alt=x")
+        Selection(self.finman_data, "", "_is_mod")
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+
+        # Edits invalidate the entries depending on the modified fields only.
+        sel = Selection(self.finman_data, "cat=transfers")
+        self.assertEqual(len(sel.trns), 1)
+        Selection(self.finman_data, "", "cat")
+        self.assertEqual(len(cache), 4)
+        sel.trns[0].set_cat("newcat")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(Selection(self.finman_data, "cat=transfers").trns), 0)
+        self.assertEqual(len(Selection(self.finman_data, "cat=newcat").trns), 1)
+        sel.trns[0].set_remark("new remark")
+        self.assertEqual(len(cache), 4)
+
+        # The cache is bounded by the number of entries and transactions.
+        cache = SelectionCache(max_entries=2, max_trns=5)
+        cache.put('a', [1, 2], ['x'])
+        cache.put('b', [3, 4], ['y'])
+        cache.get('a')
+        cache.put('c', [5], ['z'])
+        self.assertEqual(list(cache._entries), ['a', 'c'])
+        cache.put('d', [6, 7, 8, 9], ['z'])
+        self.assertEqual((list(cache._entries), cache.num_trns), (['c', 'd'], 5))
+        cache.put('e', [1, 2, 3, 4, 5, 6], ['z'])
+        self.assertIsNone(cache.get('e'))
+        cache.invalidate({'z'})
+        self.assertEqual((len(cache), cache.num_trns), (0, 0))
+
+
+    def testFieldStats(self):
+        """
+        Test the field statistics and their use for ordering conditions and
+        for index lookups.
+        """
+        # Estimates.
+        stats = FieldStats("f", ["a"] * 6 + ["b"] * 3 + ["c"], num_trns=12)
+        self.assertEqual((stats.count, stats.num_distinct), (10, 3))
+        self.assertEqual(stats.estimate_eq("a"), 0.5)
+        self.assertEqual(stats.estimate_eq("x"), 0.0)
+        self.assertAlmostEqual(stats.estimate_sample(lambda v: v != "a"), 4 / 12, delta=0.05)
+
+        stats = FieldStats("f", list(range(1000)), num_trns=1000)
+        self.assertAlmostEqual(stats.estimate_range(lo=500), 0.5, delta=0.02)
+        self.assertAlmostEqual(stats.estimate_range(100, 199), 0.1, delta=0.02)
+        self.assertEqual(stats.estimate_range(hi=0, hi_incl=False), 0.0)
+        self.assertEqual(stats.estimate_range(lo=1000), 0.0)
+        self.assertIsNone(stats.estimate_range(lo="a"))
+
+        # Updated counts; values more common than the least common of the
+        # most common values replace it.
+        stats = FieldStats("f", list(range(FieldStats.NUM_MCV)) * 2 + [100], num_trns=33)
+        stats.update({0: -2, 100: 2, 101: 1, None: 1})
+        self.assertEqual((stats.count, stats.num_distinct), (34, FieldStats.NUM_MCV + 1))
+        self.assertEqual((0 in stats.mcv, stats.mcv[100], 101 in stats.mcv), (False, 3, False))
+        stats.update({100: -3})
+        self.assertEqual((stats.count, stats.num_distinct, 100 in stats.mcv),
+                         (31, FieldStats.NUM_MCV, False))
+
+        # Counts of a sample of every n-th transaction are scaled.
+        stats = FieldStats("f", ["a"] * 3 + ["b"], num_trns=8, step=2)
+        self.assertEqual((stats.count, stats.mcv), (8, {"a": 6, "b": 2}))
+
+        # Statistics of the sample data, collected while loading.
+        data_stats = self.finman_data.stats
+        self.assertIn("value", data_stats._stats)
+        self.assertNotIn("value", data_stats._values)
+        stats = data_stats.get("value")
+        self.assertEqual((stats.count, stats.num_distinct, stats.mcv[1100]), (16, 5, 12))
+        self.assertIsNone(data_stats.get(COL_IDX))
+        with unittest.mock.patch.object(DataStats, "SAMPLE_SIZE", 8):
+            stats = DataStats(self.finman_data).get("value")
+            self.assertEqual((stats.num_trns, stats.count), (16, 16))
+
+        # Selective conditions are evaluated first, regardless of the order
+        # given.
+        trn_filter = TrnFilter(self.finman_data, "det=~transfer|val>200")
+        self.assertEqual([plan.cond.field for plan in trn_filter.plan.operands],
+                         ["value", "details"])
+        self.assertAlmostEqual(trn_filter.plan.operands[0].selectivity, 2 / 16, delta=0.05)
+
+        # Index lookups for selective '=' conditions.
+        self.assertIsNone(TrnFilter(self.finman_data, "cat=transfers").get_index_cond())
+        with unittest.mock.patch.object(FilterPlan, "INDEX_MAX_SELECTIVITY", 0.1):
+            trn_filter = TrnFilter(self.finman_data, "cat=transfers|date<1973-01-01")
+            self.assertEqual(trn_filter.get_index_cond(), ("cat", "=", "transfers"))
+            self.assertIsNone(TrnFilter(self.finman_data, "cat=transfers,date<1973").get_index_cond())
+            self.assertEqual(trn_filter.explain(self.finman_data)[-1],
+                             "Access: index lookup (to be built): cat = 'transfers'")
+
+            sel = Selection(self.finman_data, "cat=transfers|date<1973-01-01")
+            self.assertEqual([trn.get_field("details") for trn in sel.trns], ["Transfer 1a-1"])
+            self.assertTrue(data_stats.has_index("cat"))
+
+            # Edits update statistics, indexes and projections of the
+            # modified fields.
+            stats = data_stats.get("cat")
+            data_stats.get_values("cat")
+            sel.trns[0].set_cat("newcat")
+            self.assertTrue(data_stats.has_index("cat"))
+            self.assertEqual(Selection(self.finman_data, "cat=transfers").trns, [])
+            self.assertEqual(Selection(self.finman_data, "cat=newcat").trns, sel.trns)
+            self.finman_data.set_cats((trn, "bulk") for trn in data_stats._get_all_trns()[::3])
+            data_stats_expected = DataStats(self.finman_data)
+            self.assertIs(data_stats.get("cat"), stats)
+            self.assertEqual((stats.count, stats.num_distinct, stats.mcv),
+                             (data_stats_expected.get("cat").count,
+                              data_stats_expected.get("cat").num_distinct,
+                              data_stats_expected.get("cat").mcv))
+            self.assertEqual(data_stats.get_index("cat"), data_stats_expected.get_index("cat"))
+            self.assertEqual(data_stats.get_values("cat"), data_stats_expected.get_values("cat"))
+
+        # Scans skip sets by the ranges of field values.
+        self.assertEqual(TrnFilter(self.finman_data, "date>=1973-01-15").explain(self.finman_data)[-1],
+                         "Access: scan of 12 of 16 transactions; "
+                         "transaction sets: 1 scanned, 0 taken, 2 skipped")
+
+
+    def testParallelFilter(self):
+        """
+        Test the filtering in worker processes.
+        """
+        self.assertEqual(split_range(10, 3), [range(0, 3), range(3, 6), range(6, 10)])
+        self.assertEqual(split_range(10, 3, min_chunk_size=4), [range(0, 5), range(5, 10)])
+        self.assertEqual(split_range(2, 4), [range(0, 1), range(1, 2)])
+        self.assertEqual(split_range(0, 4), [])
+
+        filter_strs = ("det=~transfer 2-1|val>=11", "det~/1[ab]-[13]/,date>=1973-01-21",
+                       "!det=~1a|det=~2-1", "det=~2|det=~1")
+        sels = [Selection(self.finman_data, filter_str).trns for filter_str in filter_strs]
+
+        finman_data = FinmanData((self.jsonl_filename1, self.jsonl_filename2),
+                                 cache_entries=0, num_workers=2, parallel_min_trns=0)
+        with unittest.mock.patch.object(Selection, "_scan_parallel",
+                                        wraps=Selection._scan_parallel) as scan_parallel:
+            for filter_str, trns_expected in zip(filter_strs, sels):
+                sel = Selection(finman_data, filter_str)
+                self.assertEqual([trn.get_field("details") for trn in sel.trns],
+                                 [trn.get_field("details") for trn in trns_expected])
+            self.assertEqual(scan_parallel.call_count, len(filter_strs))
+
+            # Cheap filters are not evaluated in worker processes.
+            Selection(finman_data, "date>=1972-07-15")
+            self.assertEqual(scan_parallel.call_count, len(filter_strs))
+
+
+    def testAggregation(self):
+        """
+        Test class Aggregation, including its output via
+        Selection.print_aggregation().
+        """
+        agg = Aggregation(self.finman_data, "month",
+                          Selection(self.finman_data).trns)
+        self.assertEqual(agg.group_fields, ["month"])
+        self.assertEqual(agg.groups, {
+            ("1972-07",): [60234, 3, 10078, 30078],
+            ("1972-08",): [10055, 1, 10055, 10055],
+            ("1973-01",): [13200, 12, 1100, 1100],
+        })
+
+        agg = Aggregation(self.finman_data, "cat|year", Selection(self.finman_data).trns)
+        self.assertEqual(agg.group_fields, ["cat", "year"])
+        self.assertEqual(set(agg.groups), {("transfers", "1972"), ("", "1972"), ("", "1973")})
+
+        sel = Selection(self.finman_data, "date<1973-01-15")
+        out = io.StringIO()
+        sel.print_aggregation("cat:1|month", output_width=100, fh=out)
+        self.assertEqual(out.getvalue(), textwrap.dedent(OUTPUT_AGGREGATION[1:]))
+
+
+
 OUTPUT_1 = """
      # │ date       │ details       │   value │ cat       │ remark
     ───┼────────────┼───────────────┼─────────┼───────────┼───────
@@ -215,6 +687,18 @@ OUTPUT_1 = """
 """
 
 
+OUTPUT_AGGREGATION = """
+    cat:1     │ month   │     sum │ count │     min │     max │     avg
+    ──────────┼─────────┼─────────┼───────┼─────────┼─────────┼────────
+              │ 1972-07 │ +501.56 │     2 │ +200.78 │ +300.78 │ +250.78
+              │ 1972-08 │ +100.55 │     1 │ +100.55 │ +100.55 │ +100.55
+              │ 1973-01 │  +44.00 │     4 │  +11.00 │  +11.00 │  +11.00
+    transfers │ 1972-07 │ +100.78 │     1 │ +100.78 │ +100.78 │ +100.78
+    ──────────┼─────────┼─────────┼───────┼─────────┼─────────┼────────
+    Σ         │         │ +746.89 │     8 │  +11.00 │ +300.78 │  +93.36
+"""
+
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)